@@ -25,7 +25,12 @@
 from __future__ import absolute_import, division, print_function
 
 from inspire_dojson import common  # noqa: F401
-from inspire_dojson.api import marcxml2record, record2marcxml  # noqa: F401
+from inspire_dojson.api import (  # noqa: F401
+    marcxml2record,
+    record2marcxml,
+    record2marcxml_delta,
+)
 from inspire_dojson.errors import DoJsonError  # noqa: F401
+from inspire_dojson.preload import warmup  # noqa: F401
 
 __version__ = "63.2.33"
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""asyncio API for converting MARCXML records.
+
+The conversions run on a thread or process pool, so that they don't block
+the event loop. At most ``window`` conversions are submitted to the pool at
+any time; further calls wait for a slot, and a stream doesn't read ahead
+more than ``window`` records.
+
+The workers don't need a Flask application: the configuration values used
+by the rules are sent along with every record, and each worker runs the
+conversion in the context of an application of its own with that
+configuration.
+
+This module needs Python 3.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import asyncio
+import threading
+import weakref
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from inspire_dojson.api import marcxml2record
+from inspire_dojson.utils.app import freeze_config, get_app, get_current_config
+
+DEFAULT_WINDOW = 16
+
+
+class AsyncConverter(object):
+    """Convert MARCXML records from coroutines.
+
+    Args:
+        executor(Union[str, Executor]): ``'thread'`` or ``'process'`` to
+            create a pool of this kind, or an existing executor.
+        max_workers(int): the size of the pool created by the converter.
+        window(int): the maximum number of conversions submitted to the
+            pool at the same time.
+        config(dict): the configuration values used by the rules. Defaults
+            to the ones of the current Flask application, if any, read
+            again for every conversion.
+    """
+
+    def __init__(
+        self, executor='thread', max_workers=None, window=DEFAULT_WINDOW, config=None
+    ):
+        if isinstance(executor, Executor):
+            self._executor = executor
+            self._owns_executor = False
+        elif executor in ('thread', 'process'):
+            self._executor = None
+            self._owns_executor = True
+        else:
+            raise ValueError(u'Unknown executor: {!r}'.format(executor))
+        self.kind = executor
+        self.max_workers = max_workers
+        self.window = window
+        self.config = None if config is None else freeze_config(config)
+        self._semaphores = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self):
+        with self._lock:
+            if self._executor is None:
+                if self.kind == 'process':
+                    self._executor = ProcessPoolExecutor(self.max_workers)
+                else:
+                    self._executor = ThreadPoolExecutor(self.max_workers)
+            return self._executor
+
+    async def convert(self, marcxml, **kwargs):
+        """Convert a MARCXML string to a JSON record.
+
+        Takes the same keyword arguments as ``marcxml2record``; with a
+        process pool they must be picklable. If the coroutine is cancelled
+        before the conversion started, it never runs; a running conversion
+        is left to finish, but keeps its slot of the window until then.
+        """
+        config = self.config
+        if config is None:
+            config = get_current_config()
+
+        loop = asyncio.get_running_loop()
+        semaphore = self._get_semaphore(loop)
+        await semaphore.acquire()
+        try:
+            future = self.executor.submit(_convert, config, marcxml, kwargs)
+        except BaseException:
+            semaphore.release()
+            raise
+        future.add_done_callback(lambda _: _release_from_thread(loop, semaphore))
+
+        return await asyncio.wrap_future(future)
+
+    async def convert_stream(self, marcxmls, **kwargs):
+        """Convert MARCXML strings, yielding the records in the same order.
+
+        Reads ahead at most ``window`` strings. Stops at the first failing
+        conversion, raising its error. Conversions not started yet are
+        cancelled when the stream stops or is closed early.
+
+        Args:
+            marcxmls(Union[AsyncIterable[str], Iterable[str]]): strings
+                containing MARCXML.
+        """
+        pending = deque()
+        try:
+            async for marcxml in _aiter(marcxmls):
+                if len(pending) >= self.window:
+                    yield await pending.popleft()
+                pending.append(asyncio.ensure_future(self.convert(marcxml, **kwargs)))
+            while pending:
+                yield await pending.popleft()
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    def close(self, wait=True):
+        """Shut down the pool, if it was created by the converter."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None and self._owns_executor:
+            executor.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _get_semaphore(self, loop):
+        with self._lock:
+            if loop not in self._semaphores:
+                self._semaphores[loop] = asyncio.Semaphore(self.window)
+            return self._semaphores[loop]
+
+
+_default_converter = None
+_default_converter_lock = threading.Lock()
+
+
+def get_default_converter():
+    """Return the converter used by ``convert`` and ``convert_stream``."""
+    global _default_converter
+    with _default_converter_lock:
+        if _default_converter is None:
+            _default_converter = AsyncConverter()
+        return _default_converter
+
+
+async def convert(marcxml, **kwargs):
+    """Convert a MARCXML string to a JSON record with the default converter."""
+    return await get_default_converter().convert(marcxml, **kwargs)
+
+
+async def convert_stream(marcxmls, **kwargs):
+    """Convert MARCXML strings with the default converter."""
+    async for record in get_default_converter().convert_stream(marcxmls, **kwargs):
+        yield record
+
+
+def _convert(config, marcxml, kwargs):
+    with get_app(config).app_context():
+        return marcxml2record(marcxml, **kwargs)
+
+
+def _release_from_thread(loop, semaphore):
+    try:
+        loop.call_soon_threadsafe(semaphore.release)
+    except RuntimeError:  # the loop is closed: nothing waits for the slot
+        pass
+
+
+async def _aiter(iterable):
+    if hasattr(iterable, '__aiter__'):
+        async for item in iterable:
+            yield item
+    else:
+        for item in iterable:
+            yield item
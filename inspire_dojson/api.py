@@ -20,13 +20,25 @@
 # granted to it by virtue of its status as an Intergovernmental Organization
 # or submit itself to any jurisdiction.
 
-"""INSPIRE DoJSON API."""
+"""INSPIRE DoJSON API.
+
+The conversion functions can be called from many threads at once, for
+example from a thread pool. The state they share is either read-only once
+loaded, like the rule indexes, the schemas and the language profiles, which
+are loaded under a lock, or updated under a lock, like the caches and the
+metrics. Every thread needs an application context, which the rules read
+their configuration from: functions submitted to a pool can be wrapped with
+``inspire_dojson.utils.app.bind_app_context``.
+
+Registering new rules while converting records is not supported.
+"""
 
 from __future__ import absolute_import, division, print_function
 
 import os
 import re
 from itertools import chain
+from timeit import default_timer
 
 from dojson.contrib.marc21.utils import create_record
 from inspire_utils.helpers import force_list
@@ -37,14 +49,18 @@ from six import iteritems, text_type, unichr
 from six.moves import urllib
 
 from inspire_dojson.cds import cds2hep_marc
+from inspire_dojson.compact import CompactRecord, create_compact_record
 from inspire_dojson.conferences import conferences
 from inspire_dojson.data import data
-from inspire_dojson.errors import NotSupportedError
+from inspire_dojson.errors import DoJsonError, NotSupportedError
 from inspire_dojson.experiments import experiments
 from inspire_dojson.hep import hep, hep2marc
 from inspire_dojson.hepnames import hepnames, hepnames2marc
 from inspire_dojson.institutions import institutions
 from inspire_dojson.journals import journals
+from inspire_dojson.limits import ConversionLimits
+from inspire_dojson.metrics import METRICS
+from inspire_dojson.model import RedoPlan
 from inspire_dojson.utils import create_record_from_dict, force_single_element
 
 try:
@@ -62,8 +78,32 @@ CONTROLFIELD = E.controlfield
 DATAFIELD = E.datafield
 SUBFIELD = E.subfield
 
-
-def marcxml2record(marcxml):
+NO_LIMITS = ConversionLimits()
+
+TOMBSTONE_KEYS = frozenset(
+    ['$schema', 'control_number', 'deleted_records', 'new_record']
+)
+
+COLLECTION_MODELS = {
+    'conferences': conferences,
+    'data': data,
+    'experiments': experiments,
+    'hep': hep,
+    'hepnames': hepnames,
+    'institutions': institutions,
+    'journals': journals,
+}
+
+
+def marcxml2record(
+    marcxml,
+    limits=None,
+    rule_errors=None,
+    compact=False,
+    interner=None,
+    verifier=None,
+    tombstone_deleted=False,
+):
     """Convert a MARCXML string to a JSON record.
 
     Tries to guess which set of rules to use by inspecting the contents
@@ -72,45 +112,194 @@ def marcxml2record(marcxml):
     belong to the Literature collection but don't have ``980__a:HEP``.
 
     Args:
-        marcxml(str): a string containing MARCXML.
+        marcxml(str): a string containing MARCXML, or a record already
+            parsed by lxml.
+        limits(ConversionLimits): optional size and time limits; when one
+            of them is exceeded a ``LimitExceededError`` is raised.
+        rule_errors(list): if given, rules raising a ``DoJsonError`` are
+            skipped and the errors are appended to this list, producing a
+            partial record instead of aborting the conversion.
+        compact(bool): if set, parse the MARCXML into a ``CompactRecord``,
+            which takes less memory for records with many fields.
+        interner(StringInterner): if given, used to share recurring
+            strings in the output and, with ``compact``, in the parsed MARC.
+            Sharing one across a batch shares strings between records.
+        verifier(RoundTripVerifier): if given, a sample of the records is
+            converted back to MARCXML in the background and compared with
+            the original fields.
+        tombstone_deleted(bool): if set, records that the rules of their
+            collection mark as ``deleted`` are converted to a tombstone, with
+            only the ``$schema``, ``control_number``, ``deleted``,
+            ``deleted_records`` and ``new_record`` keys, skipping all the
+            other rules and filters.
 
     Returns:
         dict: a JSON record converted from the string.
 
     """
-    marcjson = create_record(marcxml, keep_singletons=False)
-    collections = _get_collections(marcjson)
+    start = default_timer()
+    try:
+        marcjson = _parse_marcxml(marcxml, compact, interner)
+        if limits is None:
+            limits = NO_LIMITS
+        limits.check_blob(marcjson)
+
+        collection = _select_collection(_get_collections(marcjson))
+
+        if collection == 'jobs':
+            raise NotSupportedError("Jobs are not supported any more")
+        kwargs = {}
+        if rule_errors is not None:
+            kwargs['exception_handlers'] = {DoJsonError: _append_to(rule_errors)}
+
+        with limits.budget():
+            model = COLLECTION_MODELS[collection]
+            if tombstone_deleted and _is_deleted(model, marcjson):
+                record = _create_tombstone(model, marcjson, **kwargs)
+            else:
+                record = model.do(marcjson, **kwargs)
+    except Exception as exc:
+        METRICS.observe_error('marcxml2record', exc)
+        raise
+
+    if interner is not None:
+        interner.intern_values(record)
+
+    METRICS.observe_conversion('marcxml2record', collection, default_timer() - start)
+
+    if verifier is not None:
+        verifier.submit(marcxml, record)
 
-    if 'conferences' in collections:
-        return conferences.do(marcjson)
-    elif 'data' in collections:
-        return data.do(marcjson)
-    elif 'experiment' in collections:
-        return experiments.do(marcjson)
-    elif 'hepnames' in collections:
-        return hepnames.do(marcjson)
-    elif 'institution' in collections:
-        return institutions.do(marcjson)
-    elif 'journals' in collections or 'journalsnew' in collections:
-        return journals.do(marcjson)
-    elif 'job' in collections or 'jobhidden' in collections:
-        raise NotSupportedError("Jobs are not supported any more")
-    return hep.do(marcjson)
+    return record
 
 
 def record2marcxml_etree(record):
     """Convert a JSON record to a MARCXML element tree."""
+    marcjson = _get_reverse_model(record).do(record)
+
+    return _marcjson2etree(marcjson)
+
+
+def record2marcxml(record):
+    """Convert a JSON record to a MARCXML string.
+
+    Deduces which set of rules to use by parsing the ``$schema`` key, as
+    it unequivocally determines which kind of record we have.
+
+    Args:
+        record(dict): a JSON record.
+
+    Returns:
+        str: a MARCXML string converted from the record.
+
+    """
+    start = default_timer()
+    try:
+        record_tree = record2marcxml_etree(record)
+        marcxml = tostring(record_tree, encoding='utf8', pretty_print=True)
+    except Exception as exc:
+        METRICS.observe_error('record2marcxml', exc)
+        raise
+
+    METRICS.observe_conversion(
+        'record2marcxml', _get_schema_name(record), default_timer() - start
+    )
+
+    return marcxml
+
+
+def record2marcxml_delta(old_record, new_record):
+    """Convert the changes between two versions of a JSON record to MARCXML.
+
+    Only the rules for the top-level keys that changed are run, along with
+    the rules producing other fields with the same MARC tags, so that every
+    emitted tag is complete and can replace the same tag of the legacy
+    record, as in the correct mode of bibupload. Tags whose fields did not
+    change are left out, the control number is always emitted, and each tag
+    that no longer has any field is emitted as one empty datafield.
+
+    Args:
+        old_record(dict): the JSON record before the changes.
+        new_record(dict): the JSON record after the changes.
+
+    Returns:
+        str: a MARCXML string with the changed tags of ``new_record``.
+
+    """
+    model = _get_reverse_model(new_record)
+
+    schemas_match = _get_schema_name(old_record) == _get_schema_name(new_record)
+    if schemas_match:
+        changed_keys = {
+            key
+            for key in set(old_record) | set(new_record)
+            if old_record.get(key) != new_record.get(key)
+        }
+    else:
+        changed_keys = set(old_record) | set(new_record)
+
+    marc_keys = set(chain.from_iterable(model.get_writes().values()))
+    keys = {'001'}
+    while True:
+        plan = model.plan(changed_keys, keys=keys)
+        tags = {_parse_key(key)[0] for key in plan.keys}
+        keys = {key for key in marc_keys if _parse_key(key)[0] in tags}
+        if keys <= plan.keys:
+            break
+
+    old_marcjson = model.do_partial(old_record, plan) if schemas_match else {}
+    new_marcjson = model.do_partial(new_record, plan)
+
+    old_tags = _group_by_tag(old_marcjson)
+    new_tags = _group_by_tag(new_marcjson)
+    marcjson = {}
+    for tag in set(old_tags) | set(new_tags):
+        if tag in new_tags and (tag == '001' or new_tags[tag] != old_tags.get(tag)):
+            marcjson.update(new_tags[tag])
+        elif tag not in new_tags:
+            key, _ = old_tags[tag][0]
+            if not _is_controlfield(*_parse_key(key)):
+                marcjson[key] = [{}]
+
+    return tostring(_marcjson2etree(marcjson), encoding='utf8', pretty_print=True)
+
+
+def cds_marcxml2record(marcxml, compact=False):
+    start = default_timer()
+    try:
+        marcjson = _parse_marcxml(marcxml, compact)
+        hep_marcjson = cds2hep_marc.do(marcjson)
+
+        if compact:
+            record = hep.do(CompactRecord.from_dict(hep_marcjson))
+        else:
+            record = hep.do(create_record_from_dict(hep_marcjson))
+    except Exception as exc:
+        METRICS.observe_error('cds_marcxml2record', exc)
+        raise
+
+    METRICS.observe_conversion('cds_marcxml2record', 'cds', default_timer() - start)
+
+    return record
+
+
+def _parse_marcxml(marcxml, compact, interner=None):
+    if compact:
+        return create_compact_record(marcxml, interner=interner)
+    return create_record(marcxml, keep_singletons=False)
+
+
+def _get_reverse_model(record):
     schema_name = _get_schema_name(record)
 
     if schema_name == 'hep':
-        marcjson = hep2marc.do(record)
+        return hep2marc
     elif schema_name == 'authors':
-        marcjson = hepnames2marc.do(record)
-    else:
-        raise NotSupportedError(
-            u'JSON -> MARC rules missing for "{}"'.format(schema_name)
-        )
+        return hepnames2marc
+    raise NotSupportedError(u'JSON -> MARC rules missing for "{}"'.format(schema_name))
 
+
+def _marcjson2etree(marcjson):
     record = RECORD()
 
     for key, values in sorted(iteritems(marcjson)):
@@ -137,36 +326,108 @@ def record2marcxml_etree(record):
     return record
 
 
-def record2marcxml(record):
-    """Convert a JSON record to a MARCXML string.
+def _group_by_tag(marcjson):
+    tags = {}
+    for key, values in sorted(iteritems(marcjson)):
+        tags.setdefault(_parse_key(key)[0], []).append((key, values))
 
-    Deduces which set of rules to use by parsing the ``$schema`` key, as
-    it unequivocally determines which kind of record we have.
+    return tags
 
-    Args:
-        record(dict): a JSON record.
 
-    Returns:
-        str: a MARCXML string converted from the record.
+def _get_collections(marcjson):
+    collections = chain.from_iterable(
+        [force_list(el) for el in force_list(get_value(marcjson, '980__.a'))]
+    )
+    normalized_collections = [el.lower() for el in collections]
+
+    return normalized_collections
+
 
+def _is_deleted(model, marcjson):
+    """Whether a full conversion of ``marcjson`` would be ``deleted``.
+
+    Runs only the rules of ``model`` writing the ``deleted`` key, ignoring
+    their errors, which the conversion that follows reports.
     """
-    record_tree = record2marcxml_etree(record)
-    return tostring(record_tree, encoding='utf8', pretty_print=True)
+    rules = {
+        name
+        for name, written in iteritems(model.get_writes())
+        if 'deleted' in written
+    }
+    plan = RedoPlan(rules, [], {'deleted'})
+    result = model.do_partial(
+        marcjson, plan, exception_handlers={DoJsonError: _ignore_error}
+    )
 
+    return result.get('deleted') is True
 
-def cds_marcxml2record(marcxml):
-    marcjson = create_record(marcxml, keep_singletons=False)
 
-    return hep.do(create_record_from_dict(cds2hep_marc.do(marcjson)))
+def _create_tombstone(model, marcjson, **kwargs):
+    """Convert only the keys of ``TOMBSTONE_KEYS`` of a deleted record.
 
+    Runs the rules writing these keys, the filter adding the schema and
+    the cleaning filters, as ``redo`` would.
+    """
+    rules = {
+        name
+        for name, written in iteritems(model.get_writes())
+        if written & TOMBSTONE_KEYS
+    }
+    filters = [
+        filter_
+        for filter_ in model.filters
+        if hasattr(filter_, 'dependencies')
+        and (filter_.dependencies.per_key or '$schema' in filter_.dependencies.outputs)
+    ]
+    plan = RedoPlan(rules, filters, TOMBSTONE_KEYS)
+    result = model.do_partial(marcjson, plan, **kwargs)
+
+    record = {key: value for key, value in iteritems(result) if key in TOMBSTONE_KEYS}
+    record['deleted'] = True
 
-def _get_collections(marcjson):
-    collections = chain.from_iterable(
-        [force_list(el) for el in force_list(get_value(marcjson, '980__.a'))]
-    )
-    normalized_collections = [el.lower() for el in collections]
+    return record
 
-    return normalized_collections
+
+def _select_collection(collections):
+    """Choose the set of rules to use from the normalized ``980__a`` values.
+
+    This is the single place where the routing decision is made, so that
+    :func:`marcxml2record` and :mod:`inspire_dojson.router` never diverge.
+
+    Args:
+        collections(List[str]): lowercased values of ``980__a``.
+
+    Returns:
+        str: a key of ``COLLECTION_MODELS``, or ``'jobs'`` for the records
+        that are not supported any more.
+    """
+    if 'conferences' in collections:
+        return 'conferences'
+    elif 'data' in collections:
+        return 'data'
+    elif 'experiment' in collections:
+        return 'experiments'
+    elif 'hepnames' in collections:
+        return 'hepnames'
+    elif 'institution' in collections:
+        return 'institutions'
+    elif 'journals' in collections or 'journalsnew' in collections:
+        return 'journals'
+    elif 'job' in collections or 'jobhidden' in collections:
+        return 'jobs'
+    return 'hep'
+
+
+def _ignore_error(exc, output, key, value):
+    pass
+
+
+def _append_to(errors):
+    def _handler(exc, output, key, value):
+        METRICS.observe_error('marcxml2record', exc)
+        errors.append(exc)
+
+    return _handler
 
 
 def _get_schema_name(record):
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Batch conversion API."""
+
+from __future__ import absolute_import, division, print_function
+
+import json
+from collections import Counter, namedtuple
+
+from six import binary_type, iteritems, text_type
+
+from inspire_dojson.api import marcxml2record
+from inspire_dojson.dump_index import RE_CONTROL_NUMBER
+from inspire_dojson.errors import DoJsonError, LimitExceededError
+from inspire_dojson.metrics import METRICS
+
+BatchResult = namedtuple('BatchResult', ['record', 'error', 'rule_errors'])
+
+
+class JsonLinesDeadLetterSink(object):
+    """Dead-letter sink writing one JSON line per failed conversion.
+
+    Each line contains the position of the record in the batch, its control
+    number when it can be found, the error type and message, the rule name,
+    MARC key and offending value when the error comes from a rule, and the
+    original MARCXML so that the record can be replayed.
+
+    Args:
+        stream: a text file object to write to.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.failed = 0
+        self.partial = 0
+        self.by_error = Counter()
+        self.by_rule = Counter()
+
+    def write(self, index, marcxml, exc, partial=False):
+        if partial:
+            self.partial += 1
+        else:
+            self.failed += 1
+        self.by_error[type(exc).__name__] += 1
+        rule = getattr(exc, 'rule', None)
+        if rule is not None:
+            self.by_rule[rule] += 1
+
+        line = {
+            'index': index,
+            'control_number': _get_control_number(marcxml),
+            'partial': partial,
+            'error': type(exc).__name__,
+            'message': exc.args[0] if exc.args else text_type(exc),
+            'rule': rule,
+            'key': getattr(exc, 'key', None),
+            'value': _to_json(exc.value) if isinstance(exc, DoJsonError) else None,
+            'marcxml': _to_text(marcxml),
+        }
+        self.stream.write(json.dumps(line, sort_keys=True) + u'\n')
+
+    def summary(self):
+        """Return counts of the failures written so far."""
+        return {
+            'failed': self.failed,
+            'partial': self.partial,
+            'by_error': dict(self.by_error),
+            'by_rule': dict(self.by_rule),
+        }
+
+
+def marcxml2records(
+    marcxmls,
+    limits=None,
+    dead_letters=None,
+    skip_failing_rules=False,
+    compact=False,
+    interner=None,
+    verifier=None,
+    tombstone_deleted=False,
+):
+    """Convert many MARCXML strings to JSON records.
+
+    Records exceeding ``limits`` do not stop the batch: they are yielded
+    as a result carrying the ``LimitExceededError`` instead of a record.
+    When a ``dead_letters`` sink is given, any other conversion error is
+    handled in the same way and also written to the sink, so that one bad
+    record never aborts the batch.
+
+    Args:
+        marcxmls(Iterable[str]): strings containing MARCXML.
+        limits(ConversionLimits): optional per-record limits.
+        dead_letters(JsonLinesDeadLetterSink): optional sink for failures.
+        skip_failing_rules(bool): if set, a failing rule is skipped instead
+            of aborting its record, which is then yielded partially
+            converted along with the ``rule_errors``. Requires
+            ``dead_letters``.
+        compact(bool): if set, parse the records into ``CompactRecord``.
+        interner(StringInterner): if given, recurring strings are shared
+            between all the records of the batch.
+        verifier(RoundTripVerifier): if given, a sample of the records is
+            verified by converting them back to MARCXML.
+        tombstone_deleted(bool): if set, deleted records are converted to
+            tombstones, as in ``marcxml2record``.
+
+    Yields:
+        BatchResult: one result per input, in the same order.
+    """
+    if skip_failing_rules and dead_letters is None:
+        raise ValueError('skip_failing_rules requires a dead_letters sink')
+
+    for index, marcxml in enumerate(marcxmls):
+        rule_errors = [] if skip_failing_rules else None
+        try:
+            record = marcxml2record(
+                marcxml,
+                limits=limits,
+                rule_errors=rule_errors,
+                compact=compact,
+                interner=interner,
+                verifier=verifier,
+                tombstone_deleted=tombstone_deleted,
+            )
+        except LimitExceededError as exc:
+            METRICS.observe_batch_record('limited')
+            if dead_letters is not None:
+                dead_letters.write(index, marcxml, exc)
+            yield BatchResult(None, exc, [])
+        except Exception as exc:
+            METRICS.observe_batch_record('failed')
+            if dead_letters is None:
+                raise
+            dead_letters.write(index, marcxml, exc)
+            yield BatchResult(None, exc, [])
+        else:
+            METRICS.observe_batch_record('partial' if rule_errors else 'converted')
+            for exc in rule_errors or []:
+                dead_letters.write(index, marcxml, exc, partial=True)
+            yield BatchResult(record, None, rule_errors or [])
+
+
+def _get_control_number(marcxml):
+    if isinstance(marcxml, text_type):
+        marcxml = marcxml.encode('utf-8')
+    match = RE_CONTROL_NUMBER.search(marcxml)
+    if match:
+        return int(match.group(1))
+
+
+def _to_text(marcxml):
+    if isinstance(marcxml, binary_type):
+        return marcxml.decode('utf-8', 'replace')
+    return marcxml
+
+
+def _to_json(value):
+    if isinstance(value, dict):
+        return {
+            key: _to_json(val) for key, val in iteritems(value) if key != '__order__'
+        }
+    elif isinstance(value, (list, tuple)):
+        return [_to_json(val) for val in value]
+    elif value is None or isinstance(value, (bool, int, float, text_type)):
+        return value
+    return text_type(value)
@@ -0,0 +1,453 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+
+"""Micro-benchmarks of the rules and filters on the test fixtures.
+
+``extract_fixtures`` reads the test modules without running them, and
+finds the MARCXML snippets and JSON records passed to the ``do`` method of
+a model, like ``hep.do(create_record(snippet))``. ``run_benchmarks``
+converts each of them once, recording the arguments of every rule and
+filter applied, then times each rule and filter alone on these arguments,
+after a warm-up, in ``repeat`` samples of ``number`` calls.
+
+The report is a JSON file with sorted keys, meant to be compared with the
+one of another commit::
+
+    $ inspire-dojson-benchmark tests/test_hep_bd*.py -o after.json \\
+        --compare before.json
+
+This module needs Python 3.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import argparse
+import ast
+import copy
+import gc
+import glob
+import io
+import json
+import os
+import statistics
+import sys
+from collections import OrderedDict, namedtuple
+from importlib import import_module
+from timeit import default_timer
+
+from dojson.contrib.marc21.utils import create_record
+from flask import Flask
+from six import iteritems, string_types
+
+from inspire_dojson.profiling import tracking
+
+DEFAULT_PATHS = ('tests/test_*.py',)
+DEFAULT_WARMUP = 3
+DEFAULT_REPEAT = 7
+DEFAULT_NUMBER = 10
+DEFAULT_THRESHOLD = 0.2
+DEFAULT_MIN_SECONDS = 1e-6
+DEFAULT_CONFIG = {
+    'LEGACY_BASE_URL': 'http://inspirehep.net',
+    'SERVER_NAME': 'localhost:5000',
+}
+
+MODELS = OrderedDict(
+    [
+        ('hep', 'inspire_dojson.hep'),
+        ('hep2marc', 'inspire_dojson.hep'),
+        ('hepnames', 'inspire_dojson.hepnames'),
+        ('hepnames2marc', 'inspire_dojson.hepnames'),
+        ('conferences', 'inspire_dojson.conferences'),
+        ('experiments', 'inspire_dojson.experiments'),
+        ('institutions', 'inspire_dojson.institutions'),
+        ('journals', 'inspire_dojson.journals'),
+        ('data', 'inspire_dojson.data'),
+        ('cds2hep_marc', 'inspire_dojson.cds'),
+    ]
+)
+
+Fixture = namedtuple('Fixture', ['source', 'models', 'data'])
+BenchmarkResult = namedtuple(
+    'BenchmarkResult', ['model', 'kind', 'name', 'source', 'calls', 'seconds']
+)
+
+
+class _Recorder(object):
+    def __init__(self):
+        self.calls = OrderedDict()
+
+    def measure(self, kind, name, func, *args):
+        self.calls.setdefault((kind, name), []).append(
+            (func, copy.deepcopy(args))
+        )
+        return func(*args)
+
+
+def get_model(name):
+    """Return the model called ``name`` in ``MODELS``."""
+    return getattr(import_module(MODELS[name]), name)
+
+
+def extract_fixtures(path):
+    """Return the fixtures converted by the tests of a module.
+
+    Only the literal strings and dicts assigned in a test function, and
+    converted in the same function by a model of ``MODELS``, are found. A
+    JSON record obtained by converting such a snippet, as in round-trip
+    tests, is recomputed from the snippet.
+
+    Returns:
+        List[Fixture]: with a ``source`` like ``module.py::test_name``, the
+        ``models`` converting the ``data`` in turn, the benchmarked one
+        last.
+    """
+    with io.open(path, encoding='utf-8') as stream:
+        tree = ast.parse(stream.read(), path)
+
+    fixtures = []
+    for node in tree.body:
+        if isinstance(node, ast.FunctionDef) and node.name.startswith('test'):
+            found = _extract_from_function(node)
+            for index, (models, data) in enumerate(found):
+                source = u'{}::{}'.format(os.path.basename(path), node.name)
+                if len(found) > 1:
+                    source = u'{}[{}]'.format(source, index)
+                fixtures.append(Fixture(source, models, data))
+
+    return fixtures
+
+
+def _extract_from_function(function):
+    assignments = {}
+    calls = []
+    for node in ast.walk(function):
+        if isinstance(node, ast.Assign):
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    assignments.setdefault(target.id, []).append(node)
+        elif _is_model_call(node):
+            calls.append(node)
+
+    found = []
+    for call in sorted(calls, key=lambda call: (call.lineno, call.col_offset)):
+        resolved = _resolve_call(call, assignments)
+        if resolved is not None and resolved not in found:
+            found.append(resolved)
+
+    return found
+
+
+def _is_model_call(node):
+    return (
+        isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Attribute)
+        and node.func.attr == 'do'
+        and isinstance(node.func.value, ast.Name)
+        and node.func.value.id in MODELS
+        and len(node.args) == 1
+    )
+
+
+def _resolve_call(call, assignments, depth=0):
+    argument = call.args[0]
+    if (
+        isinstance(argument, ast.Call)
+        and isinstance(argument.func, ast.Name)
+        and argument.func.id == 'create_record'
+        and argument.args
+    ):
+        argument = argument.args[0]
+    if not isinstance(argument, ast.Name) or depth > 2:
+        return None
+
+    previous = [
+        node
+        for node in assignments.get(argument.id, ())
+        if node.lineno < call.lineno
+    ]
+    if not previous:
+        return None
+
+    value = previous[-1].value
+    if _is_model_call(value):
+        resolved = _resolve_call(value, assignments, depth + 1)
+        if resolved is None:
+            return None
+        models, data = resolved
+        return models + (call.func.value.id,), data
+
+    try:
+        data = ast.literal_eval(value)
+    except ValueError:
+        return None
+    if not isinstance(data, (string_types, dict)):
+        return None
+
+    return (call.func.value.id,), data
+
+
+def record_calls(fixture):
+    """Convert a fixture, returning the arguments of each rule and filter.
+
+    Returns:
+        Dict[Tuple[str, str], List[Tuple[callable, tuple]]]: the functions
+        called, with a copy of their arguments, by kind and name. Only the
+        calls made by the last model of the fixture are returned. A failing
+        conversion returns the calls made until it failed, and none if the
+        previous models fail.
+    """
+    data = fixture.data
+    if isinstance(data, string_types):
+        data = create_record(data)
+
+    try:
+        for name in fixture.models[:-1]:
+            data = get_model(name).do(data)
+    except Exception:
+        return OrderedDict()
+
+    recorder = _Recorder()
+    with tracking(recorder):
+        try:
+            get_model(fixture.models[-1]).do(data)
+        except Exception:
+            pass
+
+    return recorder.calls
+
+
+def time_calls(
+    calls, warmup=DEFAULT_WARMUP, repeat=DEFAULT_REPEAT, number=DEFAULT_NUMBER
+):
+    """Time calls to the same rule or filter.
+
+    Each call is made on its own copy of the arguments, not timed. Errors
+    raised by the calls are ignored.
+
+    Returns:
+        List[float]: ``repeat`` samples of the mean time of the ``calls``,
+        all together, over ``number`` runs.
+    """
+    def run_once():
+        seconds = 0.0
+        for func, args in calls:
+            args = copy.deepcopy(args)
+            start = default_timer()
+            try:
+                func(*args)
+            except Exception:
+                pass
+            seconds += default_timer() - start
+        return seconds
+
+    for _ in range(warmup):
+        run_once()
+
+    samples = []
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            samples.append(sum(run_once() for _ in range(number)) / number)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    return samples
+
+
+def run_benchmarks(
+    fixtures,
+    warmup=DEFAULT_WARMUP,
+    repeat=DEFAULT_REPEAT,
+    number=DEFAULT_NUMBER,
+    models=None,
+):
+    """Time every rule and filter applied to each fixture.
+
+    Args:
+        fixtures(Iterable[Fixture]): see ``extract_fixtures``.
+        warmup(int): how many untimed runs precede the samples.
+        repeat(int): how many samples are taken.
+        number(int): how many runs each sample is the mean of.
+        models(Iterable[str]): if given, only the fixtures benchmarking
+            these models are run.
+
+    Returns:
+        List[BenchmarkResult]: one per rule or filter and fixture.
+    """
+    results = []
+    for fixture in fixtures:
+        model = fixture.models[-1]
+        if models is not None and model not in models:
+            continue
+        for (kind, name), calls in iteritems(record_calls(fixture)):
+            results.append(
+                BenchmarkResult(
+                    model,
+                    kind,
+                    name,
+                    fixture.source,
+                    len(calls),
+                    time_calls(calls, warmup, repeat, number),
+                )
+            )
+
+    return results
+
+
+def summarize(seconds):
+    """Return the statistics of samples as a dict."""
+    return {
+        'min': min(seconds),
+        'median': statistics.median(seconds),
+        'mean': statistics.mean(seconds),
+        'stdev': statistics.stdev(seconds) if len(seconds) > 1 else 0.0,
+    }
+
+
+def make_report(results, **settings):
+    """Return the JSON report of benchmark results.
+
+    The ``fixtures`` of the report have the statistics of each rule and
+    filter on each fixture; their ``rules`` and ``filters`` have the sum
+    over all fixtures of each statistic but the standard deviation.
+    """
+    report = {'settings': settings, 'rules': {}, 'filters': {}, 'fixtures': {}}
+    for result in results:
+        stats = dict(summarize(result.seconds), calls=result.calls)
+        report['fixtures'].setdefault(result.model, {}).setdefault(
+            result.kind, {}
+        ).setdefault(result.name, {})[result.source] = stats
+
+        total = (
+            report[result.kind]
+            .setdefault(result.model, {})
+            .setdefault(
+                result.name,
+                {'calls': 0, 'fixtures': 0, 'min': 0.0, 'median': 0.0, 'mean': 0.0},
+            )
+        )
+        total['fixtures'] += 1
+        for key in ('calls', 'min', 'median', 'mean'):
+            total[key] += stats[key]
+
+    return report
+
+
+def compare_reports(
+    before, after, threshold=DEFAULT_THRESHOLD, min_seconds=DEFAULT_MIN_SECONDS
+):
+    """Return the rules and filters whose total minimum time changed.
+
+    The minimum is compared, as in ``timeit``, since the other statistics
+    mostly measure the noise of the machine.
+
+    Args:
+        threshold(float): the relative change below which times are
+            considered equal.
+        min_seconds(float): rules and filters taking less than this in both
+            reports are ignored, as their times are mostly noise.
+
+    Returns:
+        List[Tuple[str, str, str, float, float]]: the kind, model, name,
+        and minimum seconds before and after, from the highest ratio to the
+        lowest.
+    """
+    changes = []
+    for kind in ('rules', 'filters'):
+        for model, totals in iteritems(after.get(kind, {})):
+            for name, total in iteritems(totals):
+                previous = before.get(kind, {}).get(model, {}).get(name)
+                if previous is None:
+                    continue
+                old, new = previous['min'], total['min']
+                if max(old, new) < min_seconds:
+                    continue
+                if abs(new - old) > threshold * old:
+                    changes.append((kind, model, name, old, new))
+
+    return sorted(
+        changes,
+        key=lambda change: (-change[4] / change[3] if change[3] else 0, change[:3]),
+    )
+
+
+def format_change(change):
+    kind, model, name, old, new = change
+    return u'{:>7} {} {} "{}": {:.2f}us -> {:.2f}us'.format(
+        u'{:+.0%}'.format(new / old - 1) if old else u'new',
+        model,
+        kind[:-1],
+        name,
+        old * 1e6,
+        new * 1e6,
+    )
+
+
+def main(argv=None):
+    """Command line entry point to benchmark the rules."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('paths', nargs='*', default=DEFAULT_PATHS)
+    parser.add_argument('-o', '--output', default='-')
+    parser.add_argument('--compare')
+    parser.add_argument('--models', nargs='+', choices=list(MODELS))
+    parser.add_argument('--warmup', type=int, default=DEFAULT_WARMUP)
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT)
+    parser.add_argument('--number', type=int, default=DEFAULT_NUMBER)
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    paths = sorted(set(path for pattern in args.paths for path in glob.glob(pattern)))
+    fixtures = [fixture for path in paths for fixture in extract_fixtures(path)]
+
+    app = Flask(__name__)
+    app.config.update(DEFAULT_CONFIG)
+    with app.app_context():
+        results = run_benchmarks(
+            fixtures, args.warmup, args.repeat, args.number, args.models
+        )
+
+    report = make_report(
+        results, warmup=args.warmup, repeat=args.repeat, number=args.number
+    )
+    text = json.dumps(report, indent=2, sort_keys=True) + u'\n'
+    if args.output == '-':
+        sys.stdout.write(text)
+    else:
+        with io.open(args.output, 'w', encoding='utf-8') as stream:
+            stream.write(text)
+
+    if args.compare:
+        with io.open(args.compare, encoding='utf-8') as stream:
+            before = json.load(stream)
+        changes = compare_reports(before, report, args.threshold)
+        for change in changes:
+            print(format_change(change), file=sys.stderr)
+
+    return 0
+
+
+if __name__ == '__main__':  # pragma: no cover
+    sys.exit(main())
@@ -29,9 +29,14 @@ from itertools import chain
 from inspire_utils.helpers import force_list
 from inspire_utils.record import get_value
 
-from inspire_dojson.model import FilterOverdo, clean_record
+from inspire_dojson.model import FilterOverdo, clean_record, depends_on
 
 
+@depends_on(
+    inputs=['035__', '595__'],
+    outputs=['035__', '595__'],
+    blob_keys=['001', '980__'],
+)
 def add_control_number(record, blob):
     if '001' not in blob:
         return record
@@ -58,6 +63,7 @@ def add_control_number(record, blob):
     return record
 
 
+@depends_on(inputs=['980__'], outputs=['980__'])
 def add_collections(record, blob):
     def _add_collection(value):
         record.setdefault('980__', []).append({'a': value})
@@ -68,6 +74,9 @@ def add_collections(record, blob):
     return record
 
 
+@depends_on(
+    inputs=['041__'], outputs=['041__'], blob_keys=['041__'], skip_if_absent=True
+)
 def remove_english_language(record, blob):
     if '041__' not in record:
         return record
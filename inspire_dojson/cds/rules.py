@@ -32,13 +32,13 @@ import pycountry
 import rfc3987
 import six
 from dojson import utils
-from idutils import is_arxiv
 from inspire_utils.helpers import force_list
 from inspire_utils.name import normalize_name
 from six.moves import urllib
 
 from inspire_dojson.cds.model import cds2hep_marc
 from inspire_dojson.utils import force_single_element, quote_url
+from inspire_dojson.utils.identifiers import is_arxiv
 
 CATEGORIES = {
     'Accelerators and Storage Rings': 'Accelerators',
@@ -154,7 +154,12 @@ def external_sytem_identifiers(self, key, value):
     return vanilla_dict(value)
 
 
-@cds2hep_marc.over('037__', '^037..', '^088..')
+@cds2hep_marc.over(
+    '037__',
+    '^037..',
+    '^088..',
+    side_effects=('500__', '595__', '980__'),
+)
 def secondary_report_numbers(self, key, value):
     """Populate the ``037`` MARC field.
 
@@ -284,7 +289,7 @@ def first_author(self, key, value):
     return _converted_author(value)
 
 
-@cds2hep_marc.over('700__', '^700..')
+@cds2hep_marc.over('700__', '^700..', side_effects=('701__',))
 def nonfirst_authors(self, key, value):
     """Populate ``700`` MARC field.
 
@@ -437,7 +442,7 @@ def publication_info(self, key, value):
     return vanilla_dict(value)
 
 
-@cds2hep_marc.over('8564_', '^8564.')
+@cds2hep_marc.over('8564_', '^8564.', side_effects=('FFT__',))
 def urls(self, key, value):
     """Populate the ``8564`` MARC field.
 
@@ -594,13 +594,25 @@ def control_number(endpoint):
     return _control_number
 
 
-conferences.over('control_number', '^001')(control_number('conferences'))
-data.over('control_number', '^001')(control_number('data'))
-experiments.over('control_number', '^001')(control_number('experiments'))
-hep.over('control_number', '^001')(control_number('literature'))
-hepnames.over('control_number', '^001')(control_number('authors'))
-institutions.over('control_number', '^001')(control_number('institutions'))
-journals.over('control_number', '^001')(control_number('journals'))
+conferences.over('control_number', '^001', side_effects=('self',))(
+    control_number('conferences')
+)
+data.over('control_number', '^001', side_effects=('self',))(control_number('data'))
+experiments.over('control_number', '^001', side_effects=('self',))(
+    control_number('experiments')
+)
+hep.over('control_number', '^001', side_effects=('self',))(
+    control_number('literature')
+)
+hepnames.over('control_number', '^001', side_effects=('self',))(
+    control_number('authors')
+)
+institutions.over('control_number', '^001', side_effects=('self',))(
+    control_number('institutions')
+)
+journals.over('control_number', '^001', side_effects=('self',))(
+    control_number('journals')
+)
 
 
 @hep2marc.over('001', '^control_number$')
@@ -918,19 +930,29 @@ def external_system_identifiers(endpoint):
     return _external_system_identifiers
 
 
-conferences.over('external_system_identifiers', '^970..')(
+conferences.over(
+    'external_system_identifiers', '^970..', side_effects=('new_record',)
+)(
     external_system_identifiers('conferences')
 )
-experiments.over('external_system_identifiers', '^970..')(
+experiments.over(
+    'external_system_identifiers', '^970..', side_effects=('new_record',)
+)(
     external_system_identifiers('experiments')
 )
-hep.over('external_system_identifiers', '^970..')(
+hep.over(
+    'external_system_identifiers', '^970..', side_effects=('new_record',)
+)(
     external_system_identifiers('literature')
 )
-institutions.over('external_system_identifiers', '^970..')(
+institutions.over(
+    'external_system_identifiers', '^970..', side_effects=('new_record',)
+)(
     external_system_identifiers('institutions')
 )
-journals.over('external_system_identifiers', '^970..')(
+journals.over(
+    'external_system_identifiers', '^970..', side_effects=('new_record',)
+)(
     external_system_identifiers('journals')
 )
 
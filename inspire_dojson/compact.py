@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Compact representation of parsed MARC records.
+
+``create_record`` from DoJSON builds a ``GroupableOrderedDict`` for the
+record and for each of its fields, each holding an ordered dict, one tuple
+per key and an ``__order__`` tuple. For records with thousands of authors
+or references this is larger than the converted record.
+
+The classes below store a record or a field as two tuples, of keys and of
+values in their original order, with interned keys. They behave like a
+``GroupableOrderedDict`` created with ``keep_singletons=False`` for the
+accesses made by the rules: getting a key returns its only value or a
+tuple of all its values, and ``iteritems(repeated=True)`` gives all
+values in their original order. They can't be modified.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+from io import StringIO
+
+from lxml import etree
+from six import binary_type, iteritems, text_type
+from six.moves import intern
+
+
+def _intern(key):
+    try:
+        return intern(key)
+    except TypeError:  # unicode keys can't be interned on Python 2
+        return key
+
+
+class _CompactMapping(dict):
+    """Immutable multi-valued mapping stored as two tuples.
+
+    Subclasses ``dict`` only so that ``isinstance`` checks made by helpers
+    like ``get_value`` keep working: the underlying ``dict`` stays empty.
+    """
+
+    __slots__ = ('_keys', '_values')
+
+    def __init__(self, items=()):
+        keys = []
+        values = []
+        for key, value in items:
+            keys.append(_intern(key))
+            values.append(value)
+        self._keys = tuple(keys)
+        self._values = tuple(values)
+
+    def __getitem__(self, key):
+        values = tuple(
+            value for other, value in zip(self._keys, self._values) if other == key
+        )
+        if not values:
+            raise KeyError(key)
+        elif len(values) == 1:
+            return values[0]
+        return values
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def __iter__(self):
+        seen = set()
+        for key in self._keys:
+            if key not in seen:
+                seen.add(key)
+                yield key
+
+    def __len__(self):
+        return len(set(self._keys))
+
+    def __eq__(self, other):
+        if isinstance(other, _CompactMapping):
+            return self._keys == other._keys and self._values == other._values
+        return dict(self.items()) == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return '{}({!r})'.format(
+            type(self).__name__, list(zip(self._keys, self._values))
+        )
+
+    def __reduce__(self):
+        return type(self), (list(zip(self._keys, self._values)),)
+
+    def __setitem__(self, *args, **kwargs):
+        raise TypeError(
+            '{} object does not support item assignment'.format(type(self).__name__)
+        )
+
+    def __delitem__(self, *args, **kwargs):
+        raise TypeError(
+            '{} object does not support item deletion'.format(type(self).__name__)
+        )
+
+    def keys(self, repeated=False):
+        if repeated:
+            return list(self._keys)
+        return list(self)
+
+    def values(self):
+        return [self[key] for key in self]
+
+    def items(self):
+        return [(key, self[key]) for key in self]
+
+    def iteritems(self, with_order=False, repeated=False):
+        """Iterate like ``GroupableOrderedDict.iteritems``."""
+        if with_order:
+            yield '__order__', self._keys
+        if repeated:
+            for item in zip(self._keys, self._values):
+                yield item
+        else:
+            for key in self:
+                yield key, self[key]
+
+
+class CompactField(_CompactMapping):
+    """The subfields of a MARC datafield, by code."""
+
+    __slots__ = ()
+
+
+class CompactRecord(_CompactMapping):
+    """The fields of a MARC record, by key."""
+
+    __slots__ = ()
+
+    @classmethod
+    def from_dict(cls, dictionary):
+        """Create a record from a dict, like ``create_record_from_dict``."""
+        items = []
+        for key, value in iteritems(dictionary):
+            if isinstance(value, (list, tuple)):
+                items.extend((key, element) for element in value)
+            else:
+                items.append((key, value))
+        return cls(items)
+
+
+class RepeatedItems(object):
+    """Adapter making ``Overdo.do`` see every field of a ``CompactRecord``.
+
+    ``Overdo.do`` only iterates over repeated fields one by one for a
+    ``GroupableOrderedDict``, and calls ``items()`` on any other blob.
+    """
+
+    __slots__ = ('record',)
+
+    def __init__(self, record):
+        self.record = record
+
+    def items(self):
+        return self.record.iteritems(repeated=True)
+
+
+def create_compact_record(marcxml, keep_singletons=False, interner=None):
+    """Parse a MARCXML string into a ``CompactRecord``.
+
+    Equivalent to DoJSON's ``create_record``: the leader and the
+    controlfields come first, then the datafields, blank and ``#``
+    indicators become ``_`` and subfield codes are lowercased.
+
+    Args:
+        marcxml(Union[str, bytes, etree._Element]): a string containing
+            MARCXML, or a record already parsed by lxml.
+        keep_singletons(bool): if set, keep empty controlfields and
+            subfields, and datafields without subfields.
+        interner(StringInterner): if given, used to share the values of
+            recurring subfields.
+
+    Returns:
+        CompactRecord: the parsed record.
+    """
+    if isinstance(marcxml, binary_type):
+        marcxml = marcxml.decode('utf-8')
+
+    if isinstance(marcxml, text_type):
+        parser = etree.XMLParser(recover=True)
+        tree = etree.parse(StringIO(marcxml), parser)
+    else:
+        tree = marcxml
+
+    fields = []
+    for leader in tree.iter(tag='{*}leader'):
+        fields.append(('leader', leader.text or ''))
+
+    for controlfield in tree.iter(tag='{*}controlfield'):
+        text = controlfield.text or ''
+        if text or keep_singletons:
+            fields.append((controlfield.attrib.get('tag', '!'), text))
+
+    for datafield in tree.iter(tag='{*}datafield'):
+        subfields = []
+        for subfield in datafield.iter(tag='{*}subfield'):
+            text = subfield.text or ''
+            if interner is not None:
+                text = interner(text)
+            if text or keep_singletons:
+                subfields.append((subfield.attrib.get('code', '!').lower(), text))
+        if subfields or keep_singletons:
+            fields.append((_get_key(datafield), CompactField(subfields)))
+
+    return CompactRecord(fields)
+
+
+def _get_key(datafield):
+    return u'{}{}{}'.format(
+        datafield.attrib.get('tag', '!'),
+        _normalize_indicator(datafield.attrib.get('ind1', '!')),
+        _normalize_indicator(datafield.attrib.get('ind2', '!')),
+    )
+
+
+def _normalize_indicator(indicator):
+    if indicator in ('', '#'):
+        return '_'
+    return indicator.replace(' ', '_')
@@ -29,9 +29,11 @@ from inspire_dojson.model import (
     add_collection,
     add_schema,
     clean_record,
+    depends_on,
 )
 
 
+@depends_on(inputs=['series'], outputs=['series'], skip_if_absent=True)
 def remove_lone_series_number(record, blob):
     def _valid(series):
         return series.get('name')
@@ -41,6 +43,11 @@ def remove_lone_series_number(record, blob):
     return record
 
 
+@depends_on(
+    inputs=['addresses', '_location'],
+    outputs=['addresses', '_location'],
+    skip_if_absent=True,
+)
 def combine_addresses_and_location(record, blob):
     if not record.get('addresses') or not record.get('_location'):
         return record
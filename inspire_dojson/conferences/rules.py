@@ -29,25 +29,10 @@ from inspire_utils.helpers import force_list, maybe_float, maybe_int
 
 from inspire_dojson.conferences.model import conferences
 from inspire_dojson.utils import force_single_element
+from inspire_dojson.utils.dates import trim_date
 from inspire_dojson.utils.geo import parse_conference_address
 
 
-def _trim_date(date):
-    if len(date) == 8:
-        date = '-'.join([date[:4], date[4:6], date[6:8]])
-
-    try:
-        year, month, day = map(int, date.split('-'))
-    except ValueError:
-        return date
-
-    if year and month and day:
-        return '%d-%02d-%02d' % (year, month, day)
-    elif year and month:
-        return '%d-%02d' % (year, month)
-    return '%d' % year
-
-
 @conferences.over('_location', '^034..')
 def _location(self, key, value):
     latitude = maybe_float(value.get('f'))
@@ -60,14 +45,18 @@ def _location(self, key, value):
         }
 
 
-@conferences.over('acronyms', '^111..')
+@conferences.over(
+    'acronyms',
+    '^111..',
+    side_effects=('addresses', 'closing_date', 'cnum', 'opening_date', 'titles'),
+)
 @utils.flatten
 @utils.for_each_value
 def acronyms(self, key, value):
     if 'x' in value:
-        self['opening_date'] = _trim_date(value['x'])
+        self['opening_date'] = trim_date(value['x'])
     if 'y' in value:
-        self['closing_date'] = _trim_date(value['y'])
+        self['closing_date'] = trim_date(value['y'])
 
     self['cnum'] = value.get('g')
 
@@ -92,7 +81,7 @@ def acronyms(self, key, value):
     return force_list(value.get('e'))
 
 
-@conferences.over('contact_details', '^270..')
+@conferences.over('contact_details', '^270..', side_effects=('addresses',))
 def contact_details(self, key, value):
     if value.get('b'):
         self.setdefault('addresses', [])
@@ -178,7 +167,7 @@ def alternative_titles(self, key, value):
     return result
 
 
-@conferences.over('core', '^980..')
+@conferences.over('core', '^980..', side_effects=('deleted',))
 def core(self, key, value):
     """Populate the ``core`` key.
 
@@ -0,0 +1,270 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Byte-offset index over MARCXML dumps.
+
+Allows to convert single records of a large MARCXML dump by control number
+without scanning the whole file. The index is a flat binary file made of a
+small header followed by fixed-size ``(recid, offset, length)`` entries
+sorted by recid, so that lookups are a binary search over a memory map.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import argparse
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+
+from flask import Flask
+
+from inspire_dojson.api import marcxml2record
+
+INDEX_MAGIC = b'IDJI'
+INDEX_VERSION = 1
+INDEX_HEADER = struct.Struct('<4sII')
+INDEX_ENTRY = struct.Struct('<QQQ')
+
+RE_RECORD = re.compile(
+    br'<((?:[\w.-]+:)?)record\b[^>]*?(?:/>|>.*?</\1record\s*>)', re.DOTALL
+)
+RE_CONTROL_NUMBER = re.compile(
+    br'<(?:[\w.-]+:)?controlfield\s+tag=["\']001["\']\s*>\s*(\d+)\s*<'
+)
+RE_ROOT = re.compile(br'<(?![?!])[^>]*>')
+RE_NAMESPACE = re.compile(br'\sxmlns:([\w.-]+)\s*=\s*(?:"[^"]*"|\'[^\']*\')')
+RE_PREFIXED_RECORD = re.compile(br'<([\w.-]+):record\b[^>]*>')
+
+
+def iter_record_offsets(dump):
+    """Yield ``(recid, offset, length)`` for every record of a dump.
+
+    Records without a ``001`` control number are skipped.
+
+    Args:
+        dump: a bytes-like object (usually a memory map) containing MARCXML.
+    """
+    for match in RE_RECORD.finditer(dump):
+        control_number = RE_CONTROL_NUMBER.search(match.group())
+        if control_number:
+            offset = match.start()
+            yield int(control_number.group(1)), offset, match.end() - offset
+
+
+def build_index(dump_path, index_path):
+    """Build the byte-offset index of a MARCXML dump.
+
+    If the same recid appears more than once in the dump, the last
+    occurrence wins, as later records supersede earlier ones.
+
+    Args:
+        dump_path(str): path of the MARCXML dump.
+        index_path(str): path where to write the index.
+
+    Returns:
+        int: the number of records in the index.
+    """
+    entries = {}
+    with open(dump_path, 'rb') as dump_file:
+        dump = _mmap_file(dump_file)
+        try:
+            for recid, offset, length in iter_record_offsets(dump):
+                entries[recid] = (offset, length)
+        finally:
+            _close(dump)
+
+    with open(index_path, 'wb') as index_file:
+        index_file.write(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, len(entries)))
+        for recid in sorted(entries):
+            index_file.write(INDEX_ENTRY.pack(recid, *entries[recid]))
+
+    return len(entries)
+
+
+class MarcXmlDumpReader(object):
+    """Random access to the records of an indexed MARCXML dump.
+
+    Both the dump and the index are memory-mapped, so only the pages
+    holding the requested records are ever read from disk.
+
+    Example:
+        >>> with MarcXmlDumpReader('dump.xml', 'dump.idx') as reader:
+        ...     record = reader.get_record(1234)
+    """
+
+    def __init__(self, dump_path, index_path):
+        self._dump_file = open(dump_path, 'rb')  # noqa: SIM115
+        self._index_file = open(index_path, 'rb')  # noqa: SIM115
+        self._dump = _mmap_file(self._dump_file)
+        self._index = _mmap_file(self._index_file)
+
+        if len(self._index) < INDEX_HEADER.size:
+            magic, version, self._size = None, None, 0
+        else:
+            magic, version, self._size = INDEX_HEADER.unpack_from(self._index, 0)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            self.close()
+            raise ValueError(u'"{}" is not a valid dump index'.format(index_path))
+
+        root = RE_ROOT.search(self._dump)
+        self._namespaces = {
+            match.group(1): match.group()
+            for match in RE_NAMESPACE.finditer(root.group() if root else b'')
+        }
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, recid):
+        return self._lookup(recid) is not None
+
+    def close(self):
+        for resource in (self._dump, self._index, self._dump_file, self._index_file):
+            _close(resource)
+        self._dump = self._index = None
+
+    def recids(self):
+        """Iterate over the indexed recids in ascending order."""
+        for position in range(self._size):
+            yield self._entry(position)[0]
+
+    def get_marcxml(self, recid):
+        """Return the raw MARCXML of a record as bytes.
+
+        A record whose namespace prefix is declared on the root element of
+        the dump gets the declaration, so that it can be parsed on its own.
+
+        Raises:
+            KeyError: if the recid is not in the index.
+        """
+        entry = self._lookup(recid)
+        if entry is None:
+            raise KeyError(recid)
+        _, offset, length = entry
+        return self._slice(offset, length)
+
+    def get_record(self, recid):
+        """Convert a record of the dump through ``marcxml2record``."""
+        return marcxml2record(self.get_marcxml(recid))
+
+    def iter_records(self, recids):
+        """Yield ``(recid, record)`` for the requested recids.
+
+        Records are read in offset order to keep disk access sequential.
+        Recids missing from the index are skipped.
+        """
+        entries = [self._lookup(recid) for recid in set(recids)]
+        for recid, offset, length in sorted(
+            (entry for entry in entries if entry), key=lambda entry: entry[1]
+        ):
+            yield recid, marcxml2record(self._slice(offset, length))
+
+    def _slice(self, offset, length):
+        marcxml = self._dump[offset : offset + length]
+        start = RE_PREFIXED_RECORD.match(marcxml)
+        if start is None:
+            return marcxml
+
+        prefix = start.group(1)
+        declaration = self._namespaces.get(prefix)
+        if declaration is None or b'xmlns:' + prefix in start.group():
+            return marcxml
+
+        end_of_name = len(prefix) + len(b'<:record')
+        return marcxml[:end_of_name] + declaration + marcxml[end_of_name:]
+
+    def _entry(self, position):
+        return INDEX_ENTRY.unpack_from(
+            self._index, INDEX_HEADER.size + position * INDEX_ENTRY.size
+        )
+
+    def _lookup(self, recid):
+        recid = int(recid)
+        low, high = 0, self._size
+        while low < high:
+            middle = (low + high) // 2
+            entry = self._entry(middle)
+            if entry[0] < recid:
+                low = middle + 1
+            elif entry[0] > recid:
+                high = middle
+            else:
+                return entry
+        return None
+
+
+def _close(resource):
+    if resource is not None and hasattr(resource, 'close'):
+        resource.close()
+
+
+def _mmap_file(file_):
+    if not os.fstat(file_.fileno()).st_size:
+        return b''  # empty files can't be mapped
+    return mmap.mmap(file_.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def main(argv=None):
+    """Command line entry point to build an index and convert records."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest='command')
+
+    build = subparsers.add_parser('build', help='index a MARCXML dump')
+    build.add_argument('dump')
+    build.add_argument('index')
+
+    convert = subparsers.add_parser(
+        'convert', help='convert records of an indexed dump to JSON lines'
+    )
+    convert.add_argument('dump')
+    convert.add_argument('index')
+    convert.add_argument('recids', nargs='+', type=int)
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        size = build_index(args.dump, args.index)
+        print(u'Indexed {} records'.format(size))
+    elif args.command == 'convert':
+        with Flask(__name__).app_context(), MarcXmlDumpReader(
+            args.dump, args.index
+        ) as reader:
+            for _, record in reader.iter_records(args.recids):
+                sys.stdout.write(json.dumps(record, sort_keys=True) + '\n')
+    else:
+        parser.print_usage()
+        return 2
+
+    return 0
+
+
+if __name__ == '__main__':  # pragma: no cover
+    sys.exit(main())
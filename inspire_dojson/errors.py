@@ -29,7 +29,21 @@ from six import python_2_unicode_compatible, text_type
 
 @python_2_unicode_compatible
 class DoJsonError(Exception):
-    """Error during DoJSON processing."""
+    """Error during DoJSON processing.
+
+    The name of the failing rule and the key of the field it was applied to
+    are available as ``rule`` and ``key`` when the error comes from a rule.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.rule = kwargs.pop('rule', None)
+        self.key = kwargs.pop('key', None)
+        super(DoJsonError, self).__init__(*args, **kwargs)
+
+    @property
+    def value(self):
+        """The value of the field the failing rule was applied to."""
+        return self.args[2] if len(self.args) > 2 else None
 
     def __str__(self):
         message = self.args[0]
@@ -47,3 +61,29 @@ class DoJsonError(Exception):
 
 class NotSupportedError(NotImplementedError):
     pass
+
+
+class LimitExceededError(Exception):
+    """A record exceeded one of the configured conversion limits.
+
+    The name of the limit that fired is available as ``limit``.
+    """
+
+    def __init__(self, limit, message):
+        super(LimitExceededError, self).__init__(message)
+        self.limit = limit
+
+
+class ReconversionMismatchError(Exception):
+    """An incremental re-conversion differs from the full conversion.
+
+    The keys of the record whose values differ are available as ``keys``.
+    """
+
+    def __init__(self, keys):
+        super(ReconversionMismatchError, self).__init__(
+            u'Incremental re-conversion differs on keys: {}'.format(
+                u', '.join(sorted(keys))
+            )
+        )
+        self.keys = keys
@@ -29,9 +29,11 @@ from inspire_dojson.model import (
     add_collection,
     add_schema,
     clean_record,
+    depends_on,
 )
 
 
+@depends_on(inputs=['project_type'], outputs=['project_type'])
 def add_project_type(record, blob):
     if not record.get('project_type'):
         record['project_type'] = ['experiment']
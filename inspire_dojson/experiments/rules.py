@@ -26,11 +26,11 @@ from __future__ import absolute_import, division, print_function
 
 from dojson import utils
 from dojson.errors import IgnoreKey
-from inspire_utils.date import normalize_date
 from inspire_utils.helpers import force_list, maybe_int
 
 from inspire_dojson.experiments.model import experiments
 from inspire_dojson.utils import force_single_element, get_record_ref
+from inspire_dojson.utils.dates import normalize_date
 
 EXPERIMENT_CATEGORIES_MAP = {
     '1': 'Collider Experiments',
@@ -99,7 +99,17 @@ EXPERIMENT_CATEGORIES_MAP = {
 }
 
 
-@experiments.over('_dates', '^046..')
+@experiments.over(
+    '_dates',
+    '^046..',
+    side_effects=(
+        'date_approved',
+        'date_cancelled',
+        'date_completed',
+        'date_proposed',
+        'date_started',
+    ),
+)
 @utils.for_each_value
 def _dates(self, key, value):
     """Don't populate any key through the return value.
@@ -122,7 +132,11 @@ def _dates(self, key, value):
     raise IgnoreKey
 
 
-@experiments.over('experiment', '^119..')
+@experiments.over(
+    'experiment',
+    '^119..',
+    side_effects=('accelerator', 'institutions', 'legacy_name'),
+)
 def experiment(self, key, values):
     """Populate the ``experiment`` key.
 
@@ -225,7 +239,7 @@ def collaboration(self, key, value):
     }
 
 
-@experiments.over('core', '^980..')
+@experiments.over('core', '^980..', side_effects=('deleted', 'project_type'))
 def core(self, key, value):
     """Populate the ``core`` key.
 
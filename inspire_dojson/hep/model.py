@@ -28,10 +28,7 @@ import itertools
 
 import six
 from inspire_schemas.builders.literature import is_citeable
-from inspire_schemas.utils import (
-    convert_old_publication_info_to_new,
-    normalize_arxiv_category,
-)
+from inspire_schemas.utils import convert_old_publication_info_to_new
 from inspire_utils.helpers import force_list
 from inspire_utils.record import get_value
 
@@ -40,9 +37,17 @@ from inspire_dojson.model import (
     add_schema,
     clean_marc,
     clean_record,
+    depends_on,
 )
+from inspire_dojson.utils.identifiers import normalize_arxiv_category
 
 
+@depends_on(
+    inputs=['arxiv_eprints'],
+    outputs=['arxiv_eprints'],
+    blob_keys=['65017'],
+    skip_if_absent=True,
+)
 def add_arxiv_categories(record, blob):
     if not record.get('arxiv_eprints') or not blob.get('65017'):
         return record
@@ -56,6 +61,9 @@ def add_arxiv_categories(record, blob):
     return record
 
 
+@depends_on(
+    inputs=['publication_info'], outputs=['publication_info'], skip_if_absent=True
+)
 def convert_publication_infos(record, blob):
     if not record.get('publication_info'):
         return record
@@ -67,6 +75,11 @@ def convert_publication_infos(record, blob):
     return record
 
 
+@depends_on(
+    inputs=['publication_info'],
+    outputs=['publication_info', 'public_notes'],
+    skip_if_absent=True,
+)
 def move_incomplete_publication_infos(record, blob):
     publication_infos = []
 
@@ -87,6 +100,7 @@ def move_incomplete_publication_infos(record, blob):
     return record
 
 
+@depends_on(inputs=['document_type'], outputs=['document_type'])
 def ensure_document_type(record, blob):
     if not record.get('document_type'):
         record['document_type'] = ['article']
@@ -94,6 +108,7 @@ def ensure_document_type(record, blob):
     return record
 
 
+@depends_on(inputs=['curated'], outputs=['curated'])
 def ensure_curated(record, blob):
     if 'curated' not in record:
         record['curated'] = True
@@ -101,6 +116,7 @@ def ensure_curated(record, blob):
     return record
 
 
+@depends_on(inputs=['500'], outputs=['500'], blob_keys=['core', 'curated'])
 def convert_curated(record, blob):
     if blob.get('curated') is False:
         a_value = '* Temporary entry *' if blob.get('core') else '* Brief entry *'
@@ -109,6 +125,7 @@ def convert_curated(record, blob):
     return record
 
 
+@depends_on(inputs=['figures'], outputs=['figures'], skip_if_absent=True)
 def ensure_ordered_figures(record, blob):
     ordered_figures_dict = {}
     unordered_figures_list = []
@@ -127,15 +144,20 @@ def ensure_ordered_figures(record, blob):
     return record
 
 
+@depends_on(
+    inputs=['documents', 'figures'],
+    outputs=['documents', 'figures'],
+    skip_if_absent=True,
+)
 def ensure_unique_documents_and_figures(record, blob):
     def duplicates(elements):
-        duplicate_keys_list = []
+        seen_keys = set()
         for index, element in enumerate(elements):
             if element:
-                if element['key'] in duplicate_keys_list:
+                if element['key'] in seen_keys:
                     yield index, element
                 else:
-                    duplicate_keys_list.append(element['key'])
+                    seen_keys.add(element['key'])
 
     for index, attachment in itertools.chain(
         duplicates(record.get('documents', [])),
@@ -146,6 +168,7 @@ def ensure_unique_documents_and_figures(record, blob):
     return record
 
 
+@depends_on(inputs=['035', 'id_dict'], outputs=['035', 'id_dict'], skip_if_absent=True)
 def write_ids(record, blob):
     result_035 = record.get('035')
     id_dict = record.get('id_dict', {})
@@ -163,6 +186,7 @@ def write_ids(record, blob):
     return record
 
 
+@depends_on(inputs=['abstracts'], outputs=['abstracts'], skip_if_absent=True)
 def reorder_abstracts(record, blob):
     abstracts = record.get('abstracts', [])
 
@@ -174,6 +198,11 @@ def reorder_abstracts(record, blob):
     return record
 
 
+@depends_on(
+    inputs=['authors', 'authors_second'],
+    outputs=['authors', 'authors_second'],
+    skip_if_absent=True,
+)
 def merge_authors(record, blob):
     authors_second = record.pop('authors_second', [])
     record.setdefault('authors', []).extend(authors_second)
@@ -181,6 +210,7 @@ def merge_authors(record, blob):
     return record
 
 
+@depends_on(inputs=['publication_info'], outputs=['citeable'], skip_if_absent=True)
 def set_citeable(record, blob):
     if is_citeable(record.get('publication_info', [])):
         record['citeable'] = True
@@ -29,14 +29,19 @@ from collections import defaultdict
 
 import pycountry
 from dojson import utils
-from idutils import is_arxiv_post_2007, is_doi, is_handle, normalize_doi
 from inspire_schemas.api import load_schema
-from inspire_schemas.utils import normalize_arxiv_category
 from inspire_utils.helpers import force_list
-from inspire_utils.isbn import normalize_isbn
 
 from inspire_dojson.hep.model import hep, hep2marc
 from inspire_dojson.utils import force_single_element
+from inspire_dojson.utils.identifiers import (
+    is_arxiv_post_2007,
+    is_doi,
+    is_handle,
+    normalize_arxiv_category,
+    normalize_doi,
+    normalize_isbn,
+)
 
 RE_LANGUAGE = re.compile(r'\/| or | and |,|=|\s+')
 
@@ -90,7 +95,7 @@ def isbns2marc(self, key, value):
     }
 
 
-@hep.over('dois', '^0247.')
+@hep.over('dois', '^0247.', side_effects=('persistent_identifiers',))
 def dois(self, key, value):
     """Populate the ``dois`` key.
 
@@ -176,7 +181,11 @@ def persistent_identifiers2marc(self, key, value):
     }
 
 
-@hep.over('texkeys', '^035..')
+@hep.over(
+    'texkeys',
+    '^035..',
+    side_effects=('_desy_bookkeeping', 'external_system_identifiers'),
+)
 def texkeys(self, key, value):
     """Populate the ``texkeys`` key.
 
@@ -273,7 +282,7 @@ def texkeys2marc(self, key, value):
     return result
 
 
-@hep2marc.over('035', '^external_system_identifiers$')
+@hep2marc.over('035', '^external_system_identifiers$', side_effects=('970', 'id_dict'))
 def external_system_identifiers2marc(self, key, value):
     """Populate the ``035`` MARC field.
 
@@ -318,7 +327,7 @@ def external_system_identifiers2marc(self, key, value):
     return result_035
 
 
-@hep.over('arxiv_eprints', '^037..')
+@hep.over('arxiv_eprints', '^037..', side_effects=('report_numbers',))
 def arxiv_eprints(self, key, value):
     """Populate the ``arxiv_eprints`` key.
 
@@ -379,7 +388,7 @@ def arxiv_eprints(self, key, value):
     return arxiv_eprints
 
 
-@hep2marc.over('037', '^arxiv_eprints$')
+@hep2marc.over('037', '^arxiv_eprints$', side_effects=('035', '65017'))
 def arxiv_eprints2marc(self, key, values):
     """Populate the ``037`` MARC field.
 
@@ -212,7 +212,7 @@ def authors_second(self, key, value):
     return _authors(key, value)
 
 
-@hep2marc.over('100', '^authors$')
+@hep2marc.over('100', '^authors$', side_effects=('700', '701'))
 def authors2marc(self, key, value):
     """Populate the ``100`` MARC field.
 
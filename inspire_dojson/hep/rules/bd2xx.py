@@ -24,15 +24,15 @@
 
 from __future__ import absolute_import, division, print_function
 
-import langdetect
 from dojson import utils
 from inspire_utils.helpers import force_list
 
 from inspire_dojson.hep.model import hep, hep2marc
-from inspire_dojson.utils import normalize_date_aggressively
+from inspire_dojson.utils import detect_language
+from inspire_dojson.utils.dates import normalize_date_aggressively
 
 
-@hep.over('titles', '^(210|245|246|247)..')
+@hep.over('titles', '^(210|245|246|247)..', side_effects=('rpp',))
 @utils.for_each_value
 def titles(self, key, value):
     """Populate the ``titles`` key.
@@ -65,7 +65,7 @@ def titles(self, key, value):
 @utils.for_each_value
 def title_translations(self, key, value):
     """Populate the ``title_translations`` key."""
-    language = langdetect.detect(value.get('a'))
+    language = detect_language(value.get('a'))
     if language:
         language = language.split("-")[0]
     return {
@@ -84,7 +84,7 @@ def rpp2marc(self, key, value):
         }
 
 
-@hep2marc.over('246', '^titles$')
+@hep2marc.over('246', '^titles$', side_effects=('245',))
 def titles2marc(self, key, values):
     """Populate the ``246`` MARC field.
 
@@ -27,16 +27,16 @@ from __future__ import absolute_import, division, print_function
 import re
 
 from dojson import utils
-from inspire_utils.date import normalize_date
 from inspire_utils.helpers import force_list, maybe_int
 
 from inspire_dojson.hep.model import hep, hep2marc
 from inspire_dojson.utils import force_single_element, get_record_ref
+from inspire_dojson.utils.dates import normalize_date
 
 IS_DEFENSE_DATE = re.compile('Presented (on )?(?P<defense_date>.*)', re.IGNORECASE)
 
 
-@hep.over('public_notes', '^500..')
+@hep.over('public_notes', '^500..', side_effects=('curated', 'thesis_info'))
 def public_notes(self, key, value):
     """Populate the ``public_notes`` key.
 
@@ -136,7 +136,7 @@ def thesis_info(self, key, value):
     return thesis_info
 
 
-@hep2marc.over('502', '^thesis_info$')
+@hep2marc.over('502', '^thesis_info$', side_effects=('500',))
 def thesis_info2marc(self, key, value):
     """Populate the ``502`` MARC field.
 
@@ -310,7 +310,7 @@ def copyright2marc(self, key, value):
     }
 
 
-@hep.over('_private_notes', '^595.[^DH]')
+@hep.over('_private_notes', '^595.[^DH]', side_effects=('_export_to',))
 def _private_notes(self, key, value):
     """Populate the ``_private_notes`` key.
 
@@ -354,7 +354,7 @@ def _private_notes(self, key, value):
     return _private_notes
 
 
-@hep2marc.over('595', '^_private_notes$')
+@hep2marc.over('595', '^_private_notes$', side_effects=('595_H',))
 @utils.for_each_value
 def _private_notes2marc(self, key, value):
     """Populate the ``595`` MARC key.
@@ -411,7 +411,7 @@ def _desy_bookkeeping(self, key, value):
     }
 
 
-@hep2marc.over('595_D', '^_desy_bookkeeping$')
+@hep2marc.over('595_D', '^_desy_bookkeeping$', side_effects=('035',))
 @utils.for_each_value
 def _desy_bookkeeping2marc(self, key, value):
     """Populate the ``595_D`` MARC field.
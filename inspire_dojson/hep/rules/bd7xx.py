@@ -28,11 +28,9 @@ from dojson import utils
 from inspire_schemas.api import load_schema
 from inspire_schemas.utils import (
     convert_new_publication_info_to_old,
-    normalize_collaboration,
     split_page_artid,
 )
 from inspire_utils.helpers import force_list, maybe_int
-from inspire_utils.isbn import normalize_isbn
 
 from inspire_dojson.hep.model import hep, hep2marc
 from inspire_dojson.utils import (
@@ -40,6 +38,7 @@ from inspire_dojson.utils import (
     get_recid_from_ref,
     get_record_ref,
 )
+from inspire_dojson.utils.identifiers import normalize_collaboration, normalize_isbn
 
 
 @hep.over('collaborations', '^710..')
@@ -134,7 +133,7 @@ def publication_info(self, key, value):
     }
 
 
-@hep2marc.over('773', '^publication_info$')
+@hep2marc.over('773', '^publication_info$', side_effects=('7731',))
 def publication_info2marc(self, key, values):
     """Populate the ``773`` MARC field.
 
@@ -215,7 +214,7 @@ def related_records_78708(self, key, value):
         }
 
 
-@hep2marc.over('78708', '^related_records$')
+@hep2marc.over('78708', '^related_records$', side_effects=('78002', '78502'))
 @utils.for_each_value
 def related_records2marc(self, key, value):
     """Populate the ``78708`` MARC field
@@ -27,11 +27,11 @@ from __future__ import absolute_import, division, print_function
 from functools import partial
 
 from dojson import utils
-from idutils import is_arxiv_post_2007
 from inspire_schemas.api import ReferenceBuilder, load_schema
 from inspire_schemas.utils import (
     build_pubnote,
     convert_new_publication_info_to_old,
+    normalize_arxiv,
 )
 from inspire_utils.dedupers import dedupe_list
 from inspire_utils.helpers import force_list, maybe_int
@@ -43,6 +43,7 @@ from inspire_dojson.utils import (
     get_recid_from_ref,
     get_record_ref,
 )
+from inspire_dojson.utils.identifiers import is_arxiv_eprint, is_arxiv_post_2007
 
 COLLECTIONS_MAP = {
     'babar-analysisdocument': 'BABAR Analysis Documents',
@@ -139,7 +140,19 @@ def record_affiliations2marc(self, key, value):
     return {'a': value.get('value')}
 
 
-@hep.over('document_type', '^980..')
+@hep.over(
+    'document_type',
+    '^980..',
+    side_effects=(
+        '_collections',
+        'citeable',
+        'core',
+        'deleted',
+        'publication_type',
+        'refereed',
+        'withdrawn',
+    ),
+)
 def document_type(self, key, value):
     """Populate the ``document_type`` key.
 
@@ -277,21 +290,34 @@ def references(self, key, value):
         record = get_record_ref(recid, 'literature')
         rb.set_record(record)
 
+    def _or_arxiv_eprint(add):
+        # ReferenceBuilder's own arXiv check grows the list of categories
+        # of inspire_schemas on every call, so arXiv identifiers never reach it.
+        def _add(el):
+            if is_arxiv_eprint(el):
+                reference = rb.obj.setdefault('reference', {})
+                reference.setdefault('arxiv_eprint', normalize_arxiv(el))
+            else:
+                add(el)
+
+        return _add
+
     rb = ReferenceBuilder()
+    add_uid = _or_arxiv_eprint(rb.add_uid)
     mapping = [
         ('0', _set_record),
-        ('a', rb.add_uid),
-        ('b', rb.add_uid),
+        ('a', add_uid),
+        ('b', add_uid),
         ('c', rb.add_collaboration),
         ('e', partial(rb.add_author, role='ed.')),
         ('h', rb.add_refextract_authors_str),
-        ('i', rb.add_uid),
+        ('i', add_uid),
         ('k', rb.set_texkey),
         ('m', rb.add_misc),
         ('o', rb.set_label),
         ('p', rb.set_publisher),
         ('q', rb.add_parent_title),
-        ('r', rb.add_report_number),
+        ('r', _or_arxiv_eprint(rb.add_report_number)),
         ('s', rb.set_pubnote),
         ('t', rb.add_title),
         ('x', rb.add_raw_reference),
@@ -303,9 +329,10 @@ def references(self, key, value):
             if el:
                 method(el)
 
+    add_url = _or_arxiv_eprint(rb.add_url)
     for el in dedupe_list(force_list(value.get('u'))):
         if el:
-            rb.add_url(el)
+            add_url(el)
 
     if _is_curated(value):
         rb.curate()
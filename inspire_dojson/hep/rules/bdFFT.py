@@ -33,51 +33,16 @@ from inspire_utils.helpers import force_list
 from inspire_dojson.hep.model import hep, hep2marc
 from inspire_dojson.utils import absolute_url, afs_url, afs_url_to_path
 
+RE_INDEX_AND_CAPTION = re.compile(r'(^\d{5})?\s*(.*)')
 
-@hep.over('documents', '^FFT[^%][^%]')
+
+@hep.over('documents', '^FFT[^%][^%]', side_effects=('figures',))
 @utils.for_each_value
 def documents(self, key, value):
     """Populate the ``documents`` key.
 
     Also populates the ``figures`` key through side effects.
     """
-
-    def _is_hidden(value):
-        return (
-            'HIDDEN' in [val.upper() for val in force_list(value.get('o'))]
-            or _get_source(value) == 'arxiv'
-            or None
-        )
-
-    def _is_figure(value):
-        return value.get('f', "").endswith(".png")
-
-    def _is_fulltext(value):
-        return value.get('d', '').lower() == 'fulltext' or None
-
-    def _get_index_and_caption(value):
-        match = re.compile(r'(^\d{5})?\s*(.*)').match(value)
-        if match:
-            return match.group(1), match.group(2)
-
-    def _get_key(value):
-        fname = value.get('n', 'document')
-        extension = value.get('f', '')
-
-        if fname.endswith(extension):
-            return fname
-        return fname + extension
-
-    def _get_source(value):
-        source = value.get('t', '')
-        if source in ('INSPIRE-PUBLIC', 'Main'):
-            source = None
-        elif source.lower() == 'arxiv':
-            return 'arxiv'
-
-        return source
-
-    figures = self.get('figures', [])
     is_context = value.get('f', '').endswith('context')
 
     if is_context:
@@ -85,7 +50,7 @@ def documents(self, key, value):
 
     if _is_figure(value):
         index, caption = _get_index_and_caption(value.get('d', ''))
-        figures.append(
+        self.setdefault('figures', []).append(
             {
                 'key': _get_key(value),
                 'caption': caption,
@@ -94,7 +59,6 @@ def documents(self, key, value):
                 'source': 'arxiv',  # XXX: we don't have any other figures on legacy
             }
         )
-        self['figures'] = figures
     else:
         return {
             'description': value.get('d') if not _is_fulltext(value) else None,
@@ -106,6 +70,47 @@ def documents(self, key, value):
         }
 
 
+def _is_hidden(value):
+    return (
+        'HIDDEN' in [val.upper() for val in force_list(value.get('o'))]
+        or _get_source(value) == 'arxiv'
+        or None
+    )
+
+
+def _is_figure(value):
+    return value.get('f', "").endswith(".png")
+
+
+def _is_fulltext(value):
+    return value.get('d', '').lower() == 'fulltext' or None
+
+
+def _get_index_and_caption(value):
+    match = RE_INDEX_AND_CAPTION.match(value)
+    if match:
+        return match.group(1), match.group(2)
+
+
+def _get_key(value):
+    fname = value.get('n', 'document')
+    extension = value.get('f', '')
+
+    if fname.endswith(extension):
+        return fname
+    return fname + extension
+
+
+def _get_source(value):
+    source = value.get('t', '')
+    if source in ('INSPIRE-PUBLIC', 'Main'):
+        source = None
+    elif source.lower() == 'arxiv':
+        return 'arxiv'
+
+    return source
+
+
 @hep2marc.over('FFT', '^documents')
 @utils.for_each_value
 def documents2marc(self, key, value):
@@ -28,11 +28,6 @@ import re
 
 from dojson import utils
 from inspire_schemas.api import load_schema
-from inspire_schemas.utils import (
-    normalize_arxiv_category,
-    valid_arxiv_categories,
-)
-from inspire_utils.date import normalize_date
 from inspire_utils.helpers import force_list, maybe_int
 from inspire_utils.name import normalize_name
 
@@ -45,6 +40,11 @@ from inspire_dojson.utils import (
     quote_url,
     unquote_url,
 )
+from inspire_dojson.utils.dates import normalize_date
+from inspire_dojson.utils.identifiers import (
+    normalize_arxiv_category,
+    valid_arxiv_categories,
+)
 
 AWARD_YEAR = re.compile(r'\(?(?P<year>\d{4})\)?')
 INSPIRE_BAI = re.compile(r'(\w+\.)+\d+')
@@ -129,7 +129,7 @@ def ids(self, key, value):
     return ids
 
 
-@hepnames2marc.over('035', '^ids$')
+@hepnames2marc.over('035', '^ids$', side_effects=('8564', '970'))
 def ids2marc(self, key, values):
     """Populate the ``035`` MARC field.
 
@@ -188,7 +188,7 @@ def ids2marc(self, key, values):
     return result
 
 
-@hepnames.over('name', '^100..')
+@hepnames.over('name', '^100..', side_effects=('birth_date', 'death_date', 'status'))
 def name(self, key, value):
     """Populate the ``name`` key.
 
@@ -227,7 +227,7 @@ def name(self, key, value):
     }
 
 
-@hepnames2marc.over('100', '^name$')
+@hepnames2marc.over('100', '^name$', side_effects=('400', '667', '880'))
 def name2marc(self, key, value):
     """Populates the ``100`` field.
 
@@ -264,7 +264,7 @@ def status2marc(self, key, value):
     return result
 
 
-@hepnames.over('positions', '^371..')
+@hepnames.over('positions', '^371..', side_effects=('email_addresses',))
 @utils.for_each_value
 def positions(self, key, value):
     """Populate the positions field.
@@ -350,7 +350,7 @@ def positions2marc(self, key, value):
     }
 
 
-@hepnames2marc.over('595', '^email_addresses$')
+@hepnames2marc.over('595', '^email_addresses$', side_effects=('371',))
 @utils.for_each_value
 def email_addresses2marc(self, key, value):
     """Populate the 595 MARCXML field.
@@ -367,7 +367,7 @@ def email_addresses2marc(self, key, value):
         return None
 
 
-@hepnames.over('email_addresses', '^595..')
+@hepnames.over('email_addresses', '^595..', side_effects=('_private_notes',))
 def email_addresses595(self, key, value):
     """Populates the ``email_addresses`` field using the 595 MARCXML field.
 
@@ -418,7 +418,7 @@ def name_variants(self, key, value):
     return name_item
 
 
-@hepnames.over('arxiv_categories', '^65017')
+@hepnames.over('arxiv_categories', '^65017', side_effects=('inspire_categories',))
 def arxiv_categories(self, key, value):
     """Populate the ``arxiv_categories`` key.
 
@@ -499,7 +499,7 @@ def inspire_categories2marc(self, key, value):
     }
 
 
-@hepnames.over('public_notes', '^667..')
+@hepnames.over('public_notes', '^667..', side_effects=('name',))
 @utils.for_each_value
 def _public_notes(self, key, value):
     if 'Formerly' in value.get('a'):
@@ -687,7 +687,7 @@ def advisors2marc(self, key, value):
     }
 
 
-@hepnames.over('urls', '^8564.')
+@hepnames.over('urls', '^8564.', side_effects=('ids',))
 @utils.for_each_value
 def urls(self, key, value):
     """Populate the ``url`` key.
@@ -739,7 +739,7 @@ def native_name(self, key, value):
     return name
 
 
-@hepnames.over('new_record', '^970..')
+@hepnames.over('new_record', '^970..', side_effects=('ids',))
 def new_record(self, key, value):
     """Populate the ``new_record`` key.
 
@@ -765,7 +765,7 @@ def new_record(self, key, value):
     return new_record
 
 
-@hepnames.over('deleted', '^980..')
+@hepnames.over('deleted', '^980..', side_effects=('stub',))
 def deleted(self, key, value):
     """Populate the ``deleted`` key.
 
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Incremental re-conversion of MARCXML records.
+
+When a new version of a record only touches a few MARC fields, the rules
+applied to the other fields produce the same output as for the previous
+version. Re-converting only runs the rules and filters that depend on the
+changed fields, as declared in the models, and keeps all other keys of the
+previous conversion.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+from collections import namedtuple
+
+from dojson.contrib.marc21.utils import create_record
+
+from inspire_dojson.api import (
+    COLLECTION_MODELS,
+    _get_collections,
+    _select_collection,
+)
+from inspire_dojson.errors import NotSupportedError, ReconversionMismatchError
+
+Reconversion = namedtuple('Reconversion', ['record', 'marcjson', 'plan'])
+
+
+def get_changed_keys(previous_marcjson, marcjson):
+    """Return the MARC keys whose fields differ between two parsed records.
+
+    Returns:
+        Set[str]: the changed keys, or ``None`` when the fields of the
+        unchanged keys don't appear in the same order in both records.
+    """
+    keys = (set(previous_marcjson) | set(marcjson)) - {'__order__'}
+    changed = {
+        key for key in keys if previous_marcjson.get(key) != marcjson.get(key)
+    }
+
+    previous_order = [
+        key for key in previous_marcjson.keys(repeated=True) if key not in changed
+    ]
+    order = [key for key in marcjson.keys(repeated=True) if key not in changed]
+    if previous_order != order:
+        return None
+
+    return changed
+
+
+def reconvert(previous_marcjson, previous_record, marcxml, parity=False):
+    """Convert a new version of a record, reusing the previous conversion.
+
+    Falls back to a full conversion when the record moved to another
+    collection, when its fields were reordered, or when its model can't
+    tell which filters depend on the changed fields.
+
+    Args:
+        previous_marcjson(GroupableOrderedDict): the parsed MARC of the
+            previous version, as returned by ``create_record``.
+        previous_record(dict): the conversion of the previous version. It
+            is not modified, but the result shares its unchanged values.
+        marcxml(str): the MARCXML of the new version.
+        parity(bool): if set, also run the full conversion and raise
+            ``ReconversionMismatchError`` if the results differ.
+
+    Returns:
+        Reconversion: the new record, its parsed MARC to pass as
+        ``previous_marcjson`` next time, and the ``RedoPlan`` that was run,
+        or ``None`` if the record was fully converted.
+    """
+    marcjson = create_record(marcxml, keep_singletons=False)
+
+    collection = _select_collection(_get_collections(marcjson))
+    if collection == 'jobs':
+        raise NotSupportedError("Jobs are not supported any more")
+    model = COLLECTION_MODELS[collection]
+
+    plan = None
+    previous_collection = _select_collection(_get_collections(previous_marcjson))
+    if previous_collection == collection:
+        changed_keys = get_changed_keys(previous_marcjson, marcjson)
+        if changed_keys is not None:
+            plan = model.plan(changed_keys)
+
+    if plan is None:
+        return Reconversion(model.do(marcjson), marcjson, None)
+
+    record = model.redo(marcjson, previous_record, plan)
+
+    if parity:
+        expected = model.do(marcjson)
+        if record != expected:
+            raise ReconversionMismatchError(
+                {
+                    key
+                    for key in set(record) | set(expected)
+                    if record.get(key) != expected.get(key)
+                }
+            )
+
+    return Reconversion(record, marcjson, plan)
@@ -61,7 +61,11 @@ def external_system_identifiers(self, key, value):
     }
 
 
-@institutions.over('ICN', '^110..')
+@institutions.over(
+    'ICN',
+    '^110..',
+    side_effects=('institution_hierarchy', 'legacy_ICN', 'related_records'),
+)
 def ICN(self, key, value):
     def _split_acronym(value):
         try:
@@ -161,7 +165,7 @@ def institution_type(self, key, value):
     return INSTITUTION_TYPE_MAP.get(a_value, 'Other')
 
 
-@institutions.over('name_variants', '^410..')
+@institutions.over('name_variants', '^410..', side_effects=('extra_words',))
 def name_variants(self, key, value):
     valid_sources = ['ADS', 'INSPIRE']
 
@@ -223,7 +227,7 @@ def historical_data(self, key, value):
     return force_list(value.get('a'))
 
 
-@institutions.over('deleted', '^980..')
+@institutions.over('deleted', '^980..', side_effects=('core', 'inactive'))
 def deleted(self, key, value):
     deleted = self.get('deleted')
     core = self.get('core')
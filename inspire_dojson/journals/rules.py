@@ -26,11 +26,11 @@ from __future__ import absolute_import, division, print_function
 
 from dojson import utils
 from idutils import normalize_issn
-from inspire_utils.date import normalize_date
 from inspire_utils.helpers import force_list, maybe_int
 
 from inspire_dojson.journals.model import journals
 from inspire_dojson.utils import get_record_ref
+from inspire_dojson.utils.dates import normalize_date
 
 
 @journals.over('issns', '^022..')
@@ -174,7 +174,7 @@ def public_notes_680(self, key, value):
         }
 
 
-@journals.over('proceedings', '^690..')
+@journals.over('proceedings', '^690..', side_effects=('refereed',))
 def proceedings(self, key, value):
     """Populate the ``proceedings`` key.
 
@@ -199,7 +199,7 @@ def proceedings(self, key, value):
     return proceedings
 
 
-@journals.over('short_title', '^711..')
+@journals.over('short_title', '^711..', side_effects=('title_variants',))
 def short_title(self, key, value):
     """Populate the ``short_title`` key.
 
@@ -225,7 +225,7 @@ def title_variants(self, key, value):
     return value.get('a')
 
 
-@journals.over('deleted', '^980..')
+@journals.over('deleted', '^980..', side_effects=('book_series',))
 def deleted(self, key, value):
     """Populate the ``deleted`` key.
 
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Lazy conversion of MARCXML records."""
+
+from __future__ import absolute_import, division, print_function
+
+from itertools import chain
+
+from dojson.contrib.marc21.utils import create_record
+from six.moves.collections_abc import Mapping
+
+from inspire_dojson.api import (
+    COLLECTION_MODELS,
+    _get_collections,
+    _select_collection,
+)
+from inspire_dojson.errors import NotSupportedError
+
+
+class LazyRecord(Mapping):
+    """A read-only view of a record converting each key on first access.
+
+    Accessing a key runs only the rules and filters it depends on, as
+    declared in the model, and caches every key they compute. Filters that
+    move values between keys, like ``merge_authors``, make the keys they
+    touch be computed together. Iterating over the view or taking its
+    length converts the whole record.
+
+    Errors of the rules are raised by the first access needing them.
+
+    Args:
+        model(FilterOverdo): the model of the collection of the record.
+        marcjson(GroupableOrderedDict): the parsed MARC of the record.
+    """
+
+    def __init__(self, model, marcjson):
+        self.model = model
+        self.marcjson = marcjson
+        self._values = {}
+        self._loaded = set()
+
+    def __getitem__(self, key):
+        if key not in self._loaded:
+            self._load({key})
+        return self._values[key]
+
+    def __iter__(self):
+        return iter(self.materialize())
+
+    def __len__(self):
+        return len(self.materialize())
+
+    def __repr__(self):
+        return '<LazyRecord of {} keys loaded>'.format(len(self._values))
+
+    def materialize(self):
+        """Return the whole record as a ``dict``.
+
+        The result is equal to the output of ``marcxml2record``, and shares
+        the values already accessed through the view.
+        """
+        keys = set(chain.from_iterable(self.model.get_writes().values()))
+        for filter_ in self.model.filters:
+            dependencies = getattr(filter_, 'dependencies', None)
+            if dependencies is not None:
+                keys |= dependencies.outputs
+        if keys - self._loaded:
+            self._load(keys - self._loaded)
+
+        return dict(self._values)
+
+    def _load(self, keys):
+        plan = self.model.plan(set(), keys=keys)
+        if plan is None:
+            result = self.model.do(self.marcjson)
+            computed = set(result) | keys
+        else:
+            result = self.model.do_partial(self.marcjson, plan)
+            computed = plan.keys
+
+        for key in computed - self._loaded:
+            if key in result:
+                self._values[key] = result[key]
+        self._loaded |= computed
+
+
+def lazy_marcxml2record(marcxml):
+    """Convert a MARCXML string to a lazily converted JSON record.
+
+    The collection of the record is determined immediately, so that
+    unsupported records raise here, but the fields are only converted when
+    accessed. Use ``LazyRecord.materialize`` to get a plain ``dict``.
+
+    Args:
+        marcxml(str): a string containing MARCXML.
+
+    Returns:
+        LazyRecord: a read-only mapping converting keys on first access.
+    """
+    marcjson = create_record(marcxml, keep_singletons=False)
+    collection = _select_collection(_get_collections(marcjson))
+    if collection == 'jobs':
+        raise NotSupportedError("Jobs are not supported any more")
+
+    return LazyRecord(COLLECTION_MODELS[collection], marcjson)
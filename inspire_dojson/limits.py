@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Per-record guard rails against pathological inputs.
+
+Size limits are checked on the parsed MARC blob before any rule runs. The
+time budget is cooperative: it is checked before every rule invocation and
+every filter, so a record is aborted at most one rule after its budget is
+spent.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from dojson.utils import GroupableOrderedDict
+from six import iteritems, string_types
+
+from inspire_dojson.errors import LimitExceededError
+
+MAX_FIELDS = 'max_fields'
+MAX_SUBFIELD_LENGTH = 'max_subfield_length'
+TIME_BUDGET = 'time_budget'
+
+_counters = Counter()
+_counters_lock = threading.Lock()
+_state = threading.local()
+
+
+class ConversionLimits(object):
+    """Limits applied to the conversion of a single record.
+
+    Every limit is optional; ``None`` disables it.
+
+    Args:
+        max_fields(int): maximum number of MARC fields in a record.
+        max_subfield_length(int): maximum length of a single subfield value.
+        time_budget(float): maximum wall-clock seconds spent converting.
+    """
+
+    def __init__(self, max_fields=None, max_subfield_length=None, time_budget=None):
+        self.max_fields = max_fields
+        self.max_subfield_length = max_subfield_length
+        self.time_budget = time_budget
+
+    def check_blob(self, blob):
+        """Raise ``LimitExceededError`` if the parsed blob is too large."""
+        if self.max_fields is None and self.max_subfield_length is None:
+            return
+
+        fields = _iter_fields(blob)
+        if self.max_fields is not None:
+            fields = list(fields)
+            if len(fields) > self.max_fields:
+                _fire(
+                    MAX_FIELDS,
+                    u'Record has {} fields, more than the limit of {}'.format(
+                        len(fields), self.max_fields
+                    ),
+                )
+
+        if self.max_subfield_length is not None:
+            for key, value in fields:
+                for code, subfield in _iter_subfields(value):
+                    if len(subfield) > self.max_subfield_length:
+                        _fire(
+                            MAX_SUBFIELD_LENGTH,
+                            u'Subfield "{}{}" has {} characters, more than the '
+                            u'limit of {}'.format(
+                                key, code, len(subfield), self.max_subfield_length
+                            ),
+                        )
+
+    @contextmanager
+    def budget(self):
+        """Enforce the time budget on the conversions run in this block."""
+        if self.time_budget is None:
+            yield
+            return
+
+        previous = getattr(_state, 'deadline', None)
+        deadline = time.time() + self.time_budget
+        _state.deadline = deadline if previous is None else min(previous, deadline)
+        try:
+            yield
+        finally:
+            _state.deadline = previous
+
+
+def check_deadline():
+    """Raise ``LimitExceededError`` if the current time budget is spent."""
+    deadline = getattr(_state, 'deadline', None)
+    if deadline is not None and time.time() > deadline:
+        _fire(TIME_BUDGET, u'Record conversion exceeded its time budget')
+
+
+def get_limit_counters():
+    """Return how many times each limit fired since the last reset."""
+    with _counters_lock:
+        return dict(_counters)
+
+
+def reset_limit_counters():
+    with _counters_lock:
+        _counters.clear()
+
+
+def _fire(limit, message):
+    with _counters_lock:
+        _counters[limit] += 1
+    raise LimitExceededError(limit, message)
+
+
+def _iter_fields(blob):
+    if isinstance(blob, GroupableOrderedDict):
+        items = blob.iteritems(with_order=False, repeated=True)
+    else:
+        items = iteritems(blob)
+
+    for key, value in items:
+        if key == '__order__':
+            continue
+        for element in value if isinstance(value, (list, tuple)) else [value]:
+            yield key, element
+
+
+def _iter_subfields(value):
+    if isinstance(value, string_types):
+        yield '', value
+        return
+
+    for code, subfields in _iter_fields(value):
+        if isinstance(subfields, string_types):
+            yield code, subfields
@@ -0,0 +1,330 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Metrics of the conversions run in this process.
+
+The conversion functions, the filters and the batch API update the
+``METRICS`` registry as they run: every update is a few additions under a
+lock, so the registry is always on. It can be read as a dict with
+``get_metrics`` or in the Prometheus text format with
+``export_prometheus``, for example to be written periodically to the
+directory of the textfile collector of the node exporter.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import io
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+
+from six import iteritems
+
+from inspire_dojson.utils.cache import get_cache_stats
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+
+class Histogram(object):
+    """Counts of observations by upper bound, with their sum."""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        index = bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative_counts(self):
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            yield bound, total
+
+    def to_dict(self):
+        return {
+            'buckets': dict(self.cumulative_counts()),
+            'sum': self.sum,
+            'count': self.count,
+        }
+
+
+class MetricsRegistry(object):
+    """Counters and latency histograms of conversions.
+
+    Args:
+        buckets(Tuple[float]): the upper bounds, in seconds, of the
+            buckets of the latency histograms.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._started = time.time()
+            self._latencies = {}
+            self._errors = Counter()
+            self._filter_calls = Counter()
+            self._filter_seconds = Counter()
+            self._batch_records = Counter()
+
+    def observe_conversion(self, function, collection, seconds):
+        """Count a successful conversion and its duration."""
+        with self._lock:
+            key = (function, collection)
+            if key not in self._latencies:
+                self._latencies[key] = Histogram(self.buckets)
+            self._latencies[key].observe(seconds)
+
+    def observe_error(self, function, exc):
+        """Count an error, by the name of the rule raising it if any."""
+        with self._lock:
+            self._errors[
+                (function, getattr(exc, 'rule', None) or '', type(exc).__name__)
+            ] += 1
+
+    def observe_filter(self, name, seconds):
+        with self._lock:
+            self._filter_calls[name] += 1
+            self._filter_seconds[name] += seconds
+
+    def observe_batch_record(self, status):
+        """Count a record of a batch, by status."""
+        with self._lock:
+            self._batch_records[status] += 1
+
+    def drain(self):
+        """Return the counters recorded so far and reset them.
+
+        The result can be pickled and passed to ``merge``, to gather in one
+        registry the metrics of the conversions run in worker processes.
+        """
+        with self._lock:
+            state = (
+                {
+                    key: (histogram.counts, histogram.sum, histogram.count)
+                    for key, histogram in iteritems(self._latencies)
+                },
+                self._errors,
+                self._filter_calls,
+                self._filter_seconds,
+                self._batch_records,
+            )
+            self._latencies = {}
+            self._errors = Counter()
+            self._filter_calls = Counter()
+            self._filter_seconds = Counter()
+            self._batch_records = Counter()
+        return state
+
+    def merge(self, state):
+        """Add the counters returned by ``drain`` to this registry."""
+        latencies, errors, filter_calls, filter_seconds, batch_records = state
+        with self._lock:
+            for key, (counts, sum_, count) in iteritems(latencies):
+                if key not in self._latencies:
+                    self._latencies[key] = Histogram(self.buckets)
+                histogram = self._latencies[key]
+                histogram.counts = [a + b for a, b in zip(histogram.counts, counts)]
+                histogram.sum += sum_
+                histogram.count += count
+            self._errors.update(errors)
+            self._filter_calls.update(filter_calls)
+            self._filter_seconds.update(filter_seconds)
+            self._batch_records.update(batch_records)
+
+    def snapshot(self):
+        """Return all metrics as a dict.
+
+        ``rate`` is the number of conversions per second since the registry
+        was created or reset.
+        """
+        with self._lock:
+            uptime = time.time() - self._started
+            conversions = sum(
+                histogram.count for histogram in self._latencies.values()
+            )
+            latencies = {}
+            for (function, collection), histogram in iteritems(self._latencies):
+                latencies.setdefault(function, {})[collection] = histogram.to_dict()
+            return {
+                'uptime': uptime,
+                'conversions': conversions,
+                'rate': conversions / uptime if uptime else 0.0,
+                'latencies': latencies,
+                'errors': [
+                    {'function': function, 'rule': rule, 'error': error, 'count': count}
+                    for (function, rule, error), count in sorted(
+                        iteritems(self._errors)
+                    )
+                ],
+                'filters': {
+                    name: {
+                        'calls': calls,
+                        'seconds': self._filter_seconds[name],
+                    }
+                    for name, calls in iteritems(self._filter_calls)
+                },
+                'batch_records': dict(self._batch_records),
+                'caches': get_cache_stats(),
+            }
+
+    def to_prometheus(self):
+        """Return all metrics in the Prometheus text format."""
+        lines = []
+        with self._lock:
+            _add_header(
+                lines,
+                'conversion_seconds',
+                'histogram',
+                'Duration of successful conversions.',
+            )
+            for (function, collection), histogram in sorted(
+                iteritems(self._latencies)
+            ):
+                labels = {'function': function, 'collection': collection}
+                for bound, count in histogram.cumulative_counts():
+                    _add_sample(
+                        lines,
+                        'conversion_seconds_bucket',
+                        dict(labels, le=_format_value(bound)),
+                        count,
+                    )
+                _add_sample(
+                    lines,
+                    'conversion_seconds_bucket',
+                    dict(labels, le='+Inf'),
+                    histogram.count,
+                )
+                _add_sample(lines, 'conversion_seconds_sum', labels, histogram.sum)
+                _add_sample(lines, 'conversion_seconds_count', labels, histogram.count)
+
+            _add_header(
+                lines, 'errors_total', 'counter', 'Conversion errors, by rule.'
+            )
+            for (function, rule, error), count in sorted(iteritems(self._errors)):
+                _add_sample(
+                    lines,
+                    'errors_total',
+                    {'function': function, 'rule': rule, 'error': error},
+                    count,
+                )
+
+            _add_header(
+                lines, 'filter_seconds', 'summary', 'Time spent in the filters.'
+            )
+            for name, calls in sorted(iteritems(self._filter_calls)):
+                labels = {'filter': name}
+                _add_sample(
+                    lines, 'filter_seconds_sum', labels, self._filter_seconds[name]
+                )
+                _add_sample(lines, 'filter_seconds_count', labels, calls)
+
+            _add_header(
+                lines,
+                'batch_records_total',
+                'counter',
+                'Records of batch conversions, by status.',
+            )
+            for status, count in sorted(iteritems(self._batch_records)):
+                _add_sample(lines, 'batch_records_total', {'status': status}, count)
+
+        cache_stats = sorted(iteritems(get_cache_stats()))
+        for metric, stat, kind, help_ in (
+            ('cache_hits_total', 'hits', 'counter', 'Cache hits.'),
+            ('cache_misses_total', 'misses', 'counter', 'Cache misses.'),
+            ('cache_hit_ratio', 'hit_rate', 'gauge', 'Ratio of cache hits.'),
+            ('cache_size', 'size', 'gauge', 'Number of cached results.'),
+        ):
+            _add_header(lines, metric, kind, help_)
+            for name, stats in cache_stats:
+                _add_sample(lines, metric, {'cache': name}, stats[stat])
+
+        return u''.join(lines)
+
+
+def _add_header(lines, name, kind, help_):
+    lines.append(u'# HELP inspire_dojson_{} {}\n'.format(name, help_))
+    lines.append(u'# TYPE inspire_dojson_{} {}\n'.format(name, kind))
+
+
+def _add_sample(lines, name, labels, value):
+    lines.append(
+        u'inspire_dojson_{}{{{}}} {}\n'.format(
+            name,
+            u','.join(
+                u'{}="{}"'.format(label, _escape(label_value))
+                for label, label_value in sorted(iteritems(labels))
+            ),
+            _format_value(value),
+        )
+    )
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+METRICS = MetricsRegistry()
+
+
+def get_metrics():
+    """Return a snapshot of the metrics of this process as a dict."""
+    return METRICS.snapshot()
+
+
+def export_prometheus(path=None):
+    """Return the metrics in the Prometheus text format.
+
+    Args:
+        path(str): if given, also write them to this file, atomically, so
+            that a collector never reads a partial file.
+    """
+    text = METRICS.to_prometheus()
+    if path is not None:
+        tmp_path = u'{}.{}.tmp'.format(path, os.getpid())
+        with io.open(tmp_path, 'w', encoding='utf-8') as stream:
+            stream.write(text)
+        os.rename(tmp_path, path)
+
+    return text
+
+
+def reset_metrics():
+    METRICS.reset()
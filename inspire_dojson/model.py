@@ -24,47 +24,245 @@
 
 Allows for a list of filters to be passed during instantiation,
 which are applied in succession to the result of the DoJSON rules.
+
+Rules and filters can declare which keys of the result they write and
+read, which allows a result to be updated by only re-running the rules
+and filters affected by a change of the input, and filters which change
+nothing when their inputs are missing to be skipped.
 """
 
 from __future__ import absolute_import, division, print_function
 
+import threading
+from collections import namedtuple
 from functools import wraps
+from itertools import chain
+from timeit import default_timer
 
-from dojson import Overdo
-from dojson.errors import IgnoreKey
-from six import raise_from
+from dojson import Overdo, utils
+from dojson.contrib.marc21.utils import GroupableOrderedDict
+from dojson.errors import IgnoreItem, IgnoreKey
+from six import iteritems, raise_from
 
+from inspire_dojson.compact import CompactRecord, RepeatedItems
 from inspire_dojson.errors import DoJsonError
+from inspire_dojson.limits import check_deadline
+from inspire_dojson.metrics import METRICS
+from inspire_dojson.profiling import get_filter_name, track
 from inspire_dojson.utils import dedupe_all_lists, strip_empty_values
 
+FilterDependencies = namedtuple(
+    'FilterDependencies',
+    ['inputs', 'outputs', 'blob_keys', 'per_key', 'skip_if_absent'],
+)
+
+RedoPlan = namedtuple('RedoPlan', ['rules', 'filters', 'keys'])
+
 
 class FilterOverdo(Overdo):
     def __init__(self, filters=None, *args, **kwargs):
         super(FilterOverdo, self).__init__(*args, **kwargs)
         self.filters = filters or []
+        self.side_effects = {}
+        self._build_lock = threading.Lock()
 
-    def do(self, blob, **kwargs):
-        result = super(FilterOverdo, self).do(blob, **kwargs)
+    def build(self):
+        """Build the index of the rules, unless it is already built.
 
-        for filter_ in self.filters:
-            result = filter_(result, blob)
+        Registering a rule discards the index, so an index is always up to
+        date. Conversions started at the same time in many threads build it
+        only once.
+        """
+        with self._build_lock:
+            if self.index is None:
+                super(FilterOverdo, self).build()
 
-        return result
+    def do(self, blob, filters_run=None, **kwargs):
+        """Apply the rules to ``blob``, then the filters to the result.
+
+        Args:
+            blob: the record to convert.
+            filters_run(list): if given, the names of the filters which were
+                applied, and not skipped, are appended to it.
+        """
+        result = self._apply_rules(blob, **kwargs)
+
+        return self._apply_filters(self.filters, result, blob, filters_run)
+
+    def over(self, name, *source_tags, **kwargs):
+        """Register a rule populating the ``name`` key.
+
+        Rules that also write other keys of the result must list them in
+        ``side_effects``, otherwise ``redo`` can't know about them.
+        """
+        side_effects = kwargs.pop('side_effects', ())
+        self.side_effects.setdefault(name, set()).update(side_effects)
 
-    def over(self, name, *source_tags):
         def decorator(creator):
-            return super(FilterOverdo, self).over(name, *source_tags)(
+            return super(FilterOverdo, self).over(name, *source_tags, **kwargs)(
                 self._wrap_exception(creator, name)
             )
 
         return decorator
 
+    def get_writes(self):
+        """Return the keys of the result written by each rule, by name."""
+        writes = {}
+        for _, (name, _) in self.rules:
+            writes[name] = {name} | self.side_effects.get(name, set())
+
+        return writes
+
+    def plan(self, changed_keys, keys=()):
+        """Compute what has to run again after ``changed_keys`` changed.
+
+        Starting from the rules applied to the changed keys of the blob and
+        from the filters reading them, adds every rule and filter sharing a
+        key of the result with something that runs again, until nothing
+        changes. Filters cleaning each key independently always run again.
+
+        Args:
+            changed_keys(Set[str]): the keys of the blob whose value changed.
+            keys(Iterable[str]): keys of the result to recompute anyway.
+
+        Returns:
+            RedoPlan: the names of the rules and the filters to run again,
+            and the keys of the result they recompute, or ``None`` when some
+            filter doesn't declare its dependencies.
+        """
+        if not all(hasattr(filter_, 'dependencies') for filter_ in self.filters):
+            return None
+        if self.index is None:
+            self.build()
+
+        writes = self.get_writes()
+
+        keys = set(keys)
+        for key in changed_keys:
+            match = self.index.query(key)
+            if match:
+                keys |= writes[match[0]]
+        for filter_ in self.filters:
+            if filter_.dependencies.blob_keys & changed_keys:
+                keys |= filter_.dependencies.inputs | filter_.dependencies.outputs
+
+        rules = set()
+        while True:
+            size = len(keys)
+            for name, written in iteritems(writes):
+                if written & keys:
+                    rules.add(name)
+                    keys |= written
+            for filter_ in self.filters:
+                used = filter_.dependencies.inputs | filter_.dependencies.outputs
+                if used & keys:
+                    keys |= used
+            if len(keys) == size:
+                break
+
+        filters = [
+            filter_
+            for filter_ in self.filters
+            if filter_.dependencies.per_key
+            or (filter_.dependencies.inputs | filter_.dependencies.outputs) & keys
+        ]
+
+        return RedoPlan(rules, filters, keys)
+
+    def do_partial(self, blob, plan, **kwargs):
+        """Compute only the keys of the result recomputed by ``plan``."""
+        if self.index is None:
+            self.build()
+
+        def _is_planned(key):
+            match = self.index.query(key)
+            return match and match[0] in plan.rules
+
+        if isinstance(blob, (GroupableOrderedDict, CompactRecord)):
+            fields = type(blob)(
+                [
+                    (key, value)
+                    for key, value in blob.iteritems(repeated=True)
+                    if _is_planned(key)
+                ]
+            )
+        else:
+            fields = {key: value for key, value in iteritems(blob) if _is_planned(key)}
+
+        result = self._apply_rules(fields, **kwargs)
+
+        # Cleaning filters turn an empty result into ``None``.
+        return self._apply_filters(plan.filters, result, blob) or {}
+
+    def redo(self, blob, previous, plan, **kwargs):
+        """Update the result ``previous`` for the new ``blob``.
+
+        Only the rules and filters in ``plan`` are run: the keys they
+        recompute are replaced, all other keys are taken from ``previous``
+        without copying them. ``previous`` itself is not modified.
+        """
+        result = self.do_partial(blob, plan, **kwargs)
+
+        merged = {
+            key: value for key, value in iteritems(previous) if key not in plan.keys
+        }
+        merged.update(result)
+
+        return merged
+
+    def _apply_rules(self, blob, **kwargs):
+        if isinstance(blob, CompactRecord):
+            blob = RepeatedItems(blob)
+        return super(FilterOverdo, self).do(blob, **kwargs)
+
+    @classmethod
+    def _apply_filters(cls, filters, result, blob, filters_run=None):
+        """Apply ``filters`` in succession, skipping the ones with no inputs.
+
+        The keys of the result are listed once, then extended with the
+        declared outputs of every filter applied, rather than listed again
+        before each filter. Keys removed by a filter are still counted as
+        present, which can only make a filter run when it could be skipped.
+        """
+        present = set(result or ())
+        for filter_ in filters:
+            dependencies = getattr(filter_, 'dependencies', None)
+            if (
+                dependencies is not None
+                and dependencies.skip_if_absent
+                and present.isdisjoint(dependencies.inputs)
+            ):
+                continue
+
+            result = cls._apply_filter(filter_, result, blob)
+            if filters_run is not None:
+                filters_run.append(get_filter_name(filter_))
+            if dependencies is None:
+                present = set(result or ())
+            else:
+                present |= dependencies.outputs
+
+        return result
+
+    @staticmethod
+    def _apply_filter(filter_, result, blob):
+        check_deadline()
+        name = get_filter_name(filter_)
+        start = default_timer()
+        try:
+            return track('filters', name, filter_, result, blob)
+        finally:
+            METRICS.observe_filter(name, default_timer() - start)
+
     @staticmethod
     def _wrap_exception(rule, name):
+        body = _fuse_decorators(rule)
+
         @wraps(rule)
         def func(self, key, value):
+            check_deadline()
             try:
-                return rule(self, key, value)
+                return track('rules', name, body, self, key, value)
             except Exception as exc:
                 if type(exc) is IgnoreKey:
                     raise exc
@@ -75,6 +273,8 @@ class FilterOverdo(Overdo):
                         ),
                         exc.args,
                         value,
+                        rule=name,
+                        key=key,
                     ),
                     exc,
                 )
@@ -82,7 +282,105 @@ class FilterOverdo(Overdo):
         return func
 
 
+def _fuse_decorators(rule):
+    """Replace DoJSON's ``flatten`` and ``for_each_value`` with one function.
+
+    Most rules are decorated with ``for_each_value``, and many also with
+    ``flatten``, each adding a call and a list per field. The returned
+    function behaves like ``rule``, including for ``IgnoreItem``, but calls
+    the undecorated rule directly. Other decorators are left alone.
+    """
+    decorators = []
+    inner = rule
+    while getattr(inner, '__code__', None) in _DECORATOR_CODES:
+        decorators.append(_DECORATOR_CODES[inner.__code__])
+        inner = getattr(inner, '__wrapped__', None)
+        if inner is None:  # not set by functools.wraps on Python 2
+            return rule
+
+    if decorators == ['for_each_value']:
+
+        def for_each_value(self, key, values):
+            if not isinstance(values, (list, tuple, set)):
+                values = [values]
+
+            parsed_values = []
+            for value in values:
+                try:
+                    parsed_values.append(inner(self, key, value))
+                except IgnoreItem:
+                    continue
+
+            return parsed_values
+
+        return for_each_value
+    elif decorators == ['flatten', 'for_each_value']:
+
+        def flatten_each_value(self, key, values):
+            if not isinstance(values, (list, tuple, set)):
+                values = [values]
+
+            parsed_values = []
+            for value in values:
+                try:
+                    parsed_values.append(inner(self, key, value))
+                except IgnoreItem:
+                    continue
+
+            return list(chain.from_iterable(parsed_values))
+
+        return flatten_each_value
+    elif decorators == ['flatten']:
+
+        def flatten(self, key, values):
+            return list(chain.from_iterable(inner(self, key, values)))
+
+        return flatten
+
+    return rule
+
+
+def _noop_rule(self, key, value):
+    pass
+
+
+_DECORATOR_CODES = {
+    utils.flatten(_noop_rule).__code__: 'flatten',
+    utils.for_each_value(_noop_rule).__code__: 'for_each_value',
+}
+
+
+def depends_on(
+    inputs=(), outputs=(), blob_keys=(), per_key=False, skip_if_absent=False
+):
+    """Declare which keys a filter reads and writes.
+
+    Args:
+        inputs(Iterable[str]): keys of the result read by the filter.
+        outputs(Iterable[str]): keys of the result written by the filter.
+        blob_keys(Iterable[str]): keys of the blob read by the filter.
+        per_key(bool): whether the filter transforms each key of the result
+            independently of the others, in which case it is always run.
+        skip_if_absent(bool): whether the filter changes nothing, except
+            for empty values removed later by a cleaning filter, when none
+            of its ``inputs`` is in the result, in which case it is skipped.
+    """
+
+    def decorator(filter_):
+        filter_.dependencies = FilterDependencies(
+            frozenset(inputs),
+            frozenset(outputs),
+            frozenset(blob_keys),
+            per_key,
+            skip_if_absent,
+        )
+        return filter_
+
+    return decorator
+
+
 def add_schema(schema):
+    @depends_on(outputs=['$schema'])
     def _add_schema(record, blob):
         record['$schema'] = schema
         return record
@@ -91,6 +389,7 @@ def add_schema(schema):
 
 
 def add_collection(name):
+    @depends_on(outputs=['_collections'])
     def _add_collection(record, blob):
         record['_collections'] = [name]
         return record
@@ -98,11 +397,13 @@ def add_collection(name):
     return _add_collection
 
 
+@depends_on(per_key=True)
 def clean_marc(record, blob):
     return strip_empty_values(record)
 
 
 def clean_record(exclude_keys=()):
+    @depends_on(per_key=True)
     def _clean_record(record, blob):
         return dedupe_all_lists(strip_empty_values(record), exclude_keys=exclude_keys)
 
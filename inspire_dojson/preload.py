@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Eager initialization of the resources used during conversion.
+
+Schemas, language profiles, country databases, identifier regexes and the
+rule indexes are otherwise loaded lazily by the first record that needs
+them. Loading them in the parent of a pre-fork server lets every worker
+share them copy-on-write.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import gc
+import time
+from collections import OrderedDict
+
+import idutils
+import pycountry
+from inspire_schemas.api import load_schema
+from inspire_utils.date import normalize_date
+
+from inspire_dojson.api import COLLECTION_MODELS
+from inspire_dojson.cds import cds2hep_marc
+from inspire_dojson.hep import hep2marc
+from inspire_dojson.hepnames import hepnames2marc
+from inspire_dojson.utils import load_language_profiles
+
+COLLECTION_SCHEMAS = {
+    'conferences': ['conferences'],
+    'data': ['data'],
+    'experiments': ['experiments'],
+    'hep': ['hep', 'elements/material'],
+    'hepnames': ['authors'],
+    'institutions': ['institutions'],
+    'journals': ['journals'],
+}
+
+REVERSE_MODELS = {
+    'hep': [hep2marc, cds2hep_marc],
+    'hepnames': [hepnames2marc],
+}
+
+
+def warmup(collections=None, freeze=False):
+    """Eagerly load everything the conversion of ``collections`` needs.
+
+    Args:
+        collections(Iterable[str]): keys of ``COLLECTION_MODELS`` to prepare
+            for. Defaults to all of them.
+        freeze(bool): if set, move all the objects created so far to the
+            permanent generation of the garbage collector (where supported),
+            so that collections in forked workers don't touch their pages.
+
+    Returns:
+        OrderedDict: the seconds spent in each step, by step name.
+    """
+    if collections is None:
+        collections = sorted(COLLECTION_MODELS)
+    unknown = set(collections) - set(COLLECTION_MODELS)
+    if unknown:
+        raise ValueError(
+            u'Unknown collections: {}'.format(u', '.join(sorted(unknown)))
+        )
+
+    schemas = ['elements/inspire_field']
+    models = []
+    for collection in collections:
+        schemas.extend(COLLECTION_SCHEMAS[collection])
+        models.append(COLLECTION_MODELS[collection])
+        models.extend(REVERSE_MODELS.get(collection, []))
+
+    steps = [
+        ('schemas', lambda: [load_schema(name) for name in schemas]),
+        ('rule_indexes', lambda: [model.build() for model in models]),
+        ('dates', lambda: normalize_date('1970-01-01')),
+        ('identifiers', _warmup_identifiers),
+    ]
+    if 'hep' in collections:
+        steps.extend(
+            [
+                ('langdetect', load_language_profiles),
+                ('pycountry', _warmup_pycountry),
+            ]
+        )
+
+    timings = OrderedDict()
+    for name, step in steps:
+        start = time.time()
+        step()
+        timings[name] = time.time() - start
+
+    if freeze and hasattr(gc, 'freeze'):
+        gc.collect()
+        gc.freeze()
+
+    return timings
+
+
+def _warmup_identifiers():
+    doi = '10.1016/0029-5582(61)90469-2'
+    idutils.is_doi(doi)
+    idutils.normalize_doi(doi)
+    idutils.is_handle('hdl:2027/mdp.39015059216981')
+    idutils.is_arxiv('hep-th/9711200')
+    idutils.is_arxiv_post_2007('1707.05770')
+    idutils.normalize_issn('0029-5582')
+
+
+def _warmup_pycountry():
+    pycountry.languages.get(alpha_2='en')
+    pycountry.countries.get(alpha_2='CH')
@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Memory profiling of conversions.
+
+``MemoryProfiler.run`` traces with ``tracemalloc`` the memory allocated by
+one conversion, and by every rule and filter it applies. Each rule and
+filter reports through ``track``, which costs a thread-local lookup when
+nothing is being profiled. Other profilers can receive these reports with
+``tracking``.
+
+For every run, the peak is the highest memory in use above the memory in
+use before it started, and the net is what is still in use after it
+returned, including the result. ``MemoryProfiler`` needs Python 3.9 or
+later; ``track`` and ``tracking`` work everywhere.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import threading
+from contextlib import contextmanager
+
+from inspire_dojson.errors import NotSupportedError
+
+try:
+    import tracemalloc
+except ImportError:  # Python 2
+    tracemalloc = None
+
+_state = threading.local()
+
+
+class AllocationStats(object):
+    """Allocations of all the calls to one rule or filter in a record."""
+
+    __slots__ = ('calls', 'net', 'peak')
+
+    def __init__(self):
+        self.calls = 0
+        self.net = 0
+        self.peak = 0
+
+    def add(self, net, peak):
+        self.calls += 1
+        self.net += net
+        self.peak = max(self.peak, peak)
+
+    def __repr__(self):
+        return 'AllocationStats(calls={}, net={}, peak={})'.format(
+            self.calls, self.net, self.peak
+        )
+
+
+class RecordProfile(object):
+    """Allocations of the conversion of one record.
+
+    Attributes:
+        label(str): the name of the conversion function.
+        peak(int): the peak of memory allocated during the conversion.
+        net(int): the memory still allocated after the conversion.
+        rules(Dict[str, AllocationStats]): allocations by rule name.
+        filters(Dict[str, AllocationStats]): allocations by filter name.
+        top_sites(List[Tuple[str, int, int]]): the source lines which
+            retained the most memory, with the size and number of blocks.
+    """
+
+    def __init__(self, label):
+        self.label = label
+        self.peak = 0
+        self.net = 0
+        self.rules = {}
+        self.filters = {}
+        self.top_sites = []
+
+    def __repr__(self):
+        return 'RecordProfile({!r}, peak={}, net={})'.format(
+            self.label, self.peak, self.net
+        )
+
+
+class MemoryProfiler(object):
+    """Collect the allocations of conversions run through it.
+
+    Args:
+        top(int): how many allocation sites to keep for each record. Finding
+            them requires a snapshot of all traced memory before and after
+            the conversion, so ``0`` makes profiling much faster.
+        frames(int): how many frames ``tracemalloc`` stores per allocation
+            when it isn't tracing yet.
+
+    Raises:
+        NotSupportedError: if ``tracemalloc`` can't reset its peak.
+    """
+
+    def __init__(self, top=10, frames=1):
+        if not hasattr(tracemalloc, 'reset_peak'):
+            raise NotSupportedError(u'Memory profiling needs Python 3.9 or later')
+        self.top = top
+        self.frames = frames
+        self.records = []
+        self._current = None
+        self._peak = 0
+
+    def run(self, convert, *args, **kwargs):
+        """Call ``convert(*args, **kwargs)`` while profiling it.
+
+        The ``RecordProfile`` is appended to ``records`` even if the
+        conversion raises.
+
+        Returns:
+            the result of the conversion.
+        """
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start(self.frames)
+
+        profile = RecordProfile(getattr(convert, '__name__', repr(convert)))
+        self._current = profile
+
+        before_snapshot = self._take_snapshot()
+        tracemalloc.reset_peak()
+        before, self._peak = tracemalloc.get_traced_memory()
+        try:
+            with tracking(self):
+                return convert(*args, **kwargs)
+        finally:
+            after, peak = tracemalloc.get_traced_memory()
+            profile.peak = max(self._peak, peak) - before
+            profile.net = after - before
+            if before_snapshot is not None:
+                profile.top_sites = self._get_top_sites(before_snapshot)
+
+            self._current = None
+            self.records.append(profile)
+            if started:
+                tracemalloc.stop()
+
+    def measure(self, kind, name, func, *args):
+        before, peak = tracemalloc.get_traced_memory()
+        self._peak = max(self._peak, peak)
+        tracemalloc.reset_peak()
+        try:
+            return func(*args)
+        finally:
+            after, peak = tracemalloc.get_traced_memory()
+            self._peak = max(self._peak, peak)
+            stats = getattr(self._current, kind)
+            if name not in stats:
+                stats[name] = AllocationStats()
+            stats[name].add(after - before, peak - before)
+
+    def _take_snapshot(self):
+        if not self.top:
+            return None
+        return tracemalloc.take_snapshot().filter_traces(
+            [
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, __file__),
+            ]
+        )
+
+    def _get_top_sites(self, before_snapshot):
+        differences = self._take_snapshot().compare_to(before_snapshot, 'lineno')
+        return [
+            (str(difference.traceback[0]), difference.size_diff, difference.count_diff)
+            for difference in differences[: self.top]
+            if difference.size_diff > 0
+        ]
+
+
+@contextmanager
+def tracking(profiler):
+    """Send the rules and filters applied in this thread to ``profiler``.
+
+    Every call goes through ``profiler.measure(kind, name, func, *args)``,
+    which must return ``func(*args)``.
+    """
+    previous = getattr(_state, 'profiler', None)
+    _state.profiler = profiler
+    try:
+        yield profiler
+    finally:
+        _state.profiler = previous
+
+
+def track(kind, name, func, *args):
+    """Call ``func(*args)``, profiling it if a profiler runs in this thread.
+
+    Args:
+        kind(str): either ``'rules'`` or ``'filters'``.
+        name(str): the name of the rule or of the filter.
+    """
+    profiler = getattr(_state, 'profiler', None)
+    if profiler is None:
+        return func(*args)
+    return profiler.measure(kind, name, func, *args)
+
+
+def get_filter_name(filter_):
+    return getattr(filter_, '__name__', repr(filter_))
+
+
+def assert_allocation_budgets(profile, peak=None, net=None, rules=None, filters=None):
+    """Assert that a conversion stayed within its memory budgets.
+
+    Meant to be used in tests, to catch memory regressions.
+
+    Args:
+        profile(RecordProfile): the profile of the conversion.
+        peak(int): the maximum peak of the whole conversion, in bytes.
+        net(int): the maximum memory retained by the whole conversion.
+        rules(Dict[str, int]): the maximum peak of a single call to each rule.
+        filters(Dict[str, int]): the maximum peak of each filter.
+
+    Raises:
+        AssertionError: listing every budget that was exceeded, and the
+        top allocation sites of the conversion.
+    """
+    exceeded = []
+    if peak is not None and profile.peak > peak:
+        exceeded.append(u'peak: {} > {}'.format(profile.peak, peak))
+    if net is not None and profile.net > net:
+        exceeded.append(u'net: {} > {}'.format(profile.net, net))
+    for kind, budgets in (('rules', rules), ('filters', filters)):
+        stats = getattr(profile, kind)
+        for name, budget in sorted((budgets or {}).items()):
+            if name in stats and stats[name].peak > budget:
+                exceeded.append(
+                    u'{} "{}": {} > {}'.format(kind, name, stats[name].peak, budget)
+                )
+
+    if exceeded:
+        sites = [
+            u'  {}: {} bytes in {} blocks'.format(*site) for site in profile.top_sites
+        ]
+        raise AssertionError(
+            u'\n'.join(
+                [u'Allocation budgets exceeded by {}:'.format(profile.label)]
+                + exceeded
+                + ([u'Top allocation sites:'] + sites if sites else [])
+            )
+        )
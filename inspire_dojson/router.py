@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Collection router for mixed MARCXML dumps.
+
+Decides which set of rules :func:`~inspire_dojson.api.marcxml2record` would
+use for a record by looking only at its ``980`` datafields, without building
+the intermediate MARC JSON or running any rule.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import io
+import os
+
+from lxml import etree
+from six import binary_type, text_type
+
+from inspire_dojson.api import _select_collection
+
+MARC21_NAMESPACE = 'http://www.loc.gov/MARC21/slim'
+BLANK_INDICATORS = ('', ' ', '#', '_')
+
+
+def get_collections_from_element(element):
+    """Return the lowercased ``980__a`` values of a parsed MARCXML element.
+
+    Mirrors what :func:`~inspire_dojson.api._get_collections` extracts from
+    the output of ``create_record``: only ``980`` datafields with blank
+    indicators are considered, and empty subfields are ignored.
+    """
+    collections = []
+    for datafield in element.iter('{*}datafield'):
+        if datafield.get('tag') != '980':
+            continue
+        if datafield.get('ind1', '!') not in BLANK_INDICATORS:
+            continue
+        if datafield.get('ind2', '!') not in BLANK_INDICATORS:
+            continue
+        for subfield in datafield.iter('{*}subfield'):
+            if subfield.get('code', '!').lower() == 'a' and subfield.text:
+                collections.append(subfield.text.lower())
+
+    return collections
+
+
+def route_marcxml(marcxml):
+    """Return the collection a MARCXML string would be converted with.
+
+    Args:
+        marcxml(str): a string containing MARCXML.
+
+    Returns:
+        str: one of the keys of ``COLLECTION_MODELS``, or ``'jobs'``.
+    """
+    if isinstance(marcxml, binary_type):
+        marcxml = marcxml.decode('utf-8')
+    parser = etree.XMLParser(recover=True)
+    tree = etree.parse(io.StringIO(text_type(marcxml)), parser)
+
+    return _select_collection(get_collections_from_element(tree))
+
+
+def iter_routed_records(source):
+    """Stream the records of a MARCXML dump along with their collection.
+
+    Records are parsed one at a time and discarded right after being
+    yielded, so memory usage does not depend on the size of the dump.
+
+    Args:
+        source: a file name or a binary file object containing MARCXML.
+
+    Yields:
+        Tuple[str, bytes]: the collection of the record and its MARCXML.
+    """
+    for _, element in etree.iterparse(source, tag='{*}record'):
+        collection = _select_collection(get_collections_from_element(element))
+        yield collection, etree.tostring(element, encoding='utf-8', with_tail=False)
+
+        element.clear()
+        while element.getprevious() is not None:
+            del element.getparent()[0]
+
+
+def split_dump(source, output_dir, skip=('jobs',)):
+    """Split a mixed MARCXML dump into one shard per collection.
+
+    Each shard is written to ``<output_dir>/<collection>.xml`` as a
+    MARCXML ``<collection>``.
+
+    Args:
+        source: a file name or a binary file object containing MARCXML.
+        output_dir(str): the directory where to write the shards.
+        skip(Container[str]): collections whose records should be dropped.
+
+    Returns:
+        dict: the number of records routed to each collection, including
+        the skipped ones.
+    """
+    counts = {}
+    shards = {}
+
+    try:
+        for collection, marcxml in iter_routed_records(source):
+            counts[collection] = counts.get(collection, 0) + 1
+            if collection in skip:
+                continue
+            if collection not in shards:
+                shard = open(  # noqa: SIM115
+                    os.path.join(output_dir, collection + '.xml'), 'wb'
+                )
+                shard.write(
+                    b'<?xml version="1.0" encoding="UTF-8"?>\n'
+                    b'<collection xmlns="' + MARC21_NAMESPACE.encode('ascii') + b'">\n'
+                )
+                shards[collection] = shard
+            shards[collection].write(marcxml + b'\n')
+    finally:
+        for shard in shards.values():
+            shard.write(b'</collection>\n')
+            shard.close()
+
+    return counts
@@ -0,0 +1,316 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+
+"""Empirical time complexity of the rules and filters.
+
+``profile_scaling`` converts synthetic records with a growing number ``N``
+of authors, references, keywords and files, timing every rule and filter
+applied. For each of them, the exponent ``k`` of ``time ~ N ** k`` is
+fitted on a log-log scale: it is about 1 for the rules and filters taking
+a time proportional to the size of the record, and about 2 for quadratic
+ones. ``assert_linear_scaling`` fails when an exponent is too high::
+
+    $ inspire-dojson-scaling --sizes 100 200 400 800
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import argparse
+import gc
+import math
+import sys
+from collections import Counter, OrderedDict, namedtuple
+from timeit import default_timer
+
+from flask import Flask
+
+from inspire_dojson.api import marcxml2record
+from inspire_dojson.profiling import tracking
+
+DEFAULT_SIZES = (50, 100, 200, 400)
+DEFAULT_MAX_EXPONENT = 1.4
+DEFAULT_MIN_SECONDS = 0.001
+
+FIELD_TEMPLATES = OrderedDict(
+    [
+        (
+            'authors',
+            '<datafield tag="700" ind1=" " ind2=" ">'
+            '<subfield code="a">Author, A. {0}</subfield>'
+            '<subfield code="u">Affiliation {1}</subfield>'
+            '<subfield code="v">Raw affiliation {1}</subfield>'
+            '<subfield code="x">{0}</subfield>'
+            '</datafield>',
+        ),
+        (
+            'references',
+            '<datafield tag="999" ind1="C" ind2="5">'
+            '<subfield code="0">{0}</subfield>'
+            '<subfield code="h">Author, A. {0}</subfield>'
+            '<subfield code="r">hep-ph/{0:07d}</subfield>'
+            '<subfield code="s">Phys.Rev.,D{0},1</subfield>'
+            '<subfield code="y">2001</subfield>'
+            '</datafield>',
+        ),
+        (
+            'keywords',
+            '<datafield tag="695" ind1=" " ind2=" ">'
+            '<subfield code="2">INSPIRE</subfield>'
+            '<subfield code="a">Keyword {0}</subfield>'
+            '</datafield>',
+        ),
+        (
+            'ffts',
+            '<datafield tag="FFT" ind1=" " ind2=" ">'
+            '<subfield code="a">'
+            '/opt/cds-invenio/var/data/files/g{1}/{0}/content.png;1'
+            '</subfield>'
+            '<subfield code="d">{0:05d} Caption {0}</subfield>'
+            '<subfield code="f">.png</subfield>'
+            '<subfield code="n">FIG{0}</subfield>'
+            '<subfield code="t">Plot</subfield>'
+            '<subfield code="v">1</subfield>'
+            '</datafield>'
+            '<datafield tag="FFT" ind1=" " ind2=" ">'
+            '<subfield code="a">'
+            '/opt/cds-invenio/var/data/files/g{1}/{0}/document.pdf;1'
+            '</subfield>'
+            '<subfield code="d">Document {0}</subfield>'
+            '<subfield code="f">.pdf</subfield>'
+            '<subfield code="n">document{0}</subfield>'
+            '<subfield code="t">INSPIRE-PUBLIC</subfield>'
+            '<subfield code="v">1</subfield>'
+            '</datafield>',
+        ),
+    ]
+)
+
+ScalingResult = namedtuple(
+    'ScalingResult', ['kind', 'name', 'sizes', 'seconds', 'exponent']
+)
+
+
+class _Timer(object):
+    def __init__(self):
+        self.seconds = Counter()
+
+    def measure(self, kind, name, func, *args):
+        start = default_timer()
+        try:
+            return func(*args)
+        finally:
+            self.seconds[(kind, name)] += default_timer() - start
+
+
+def make_record(size, fields=tuple(FIELD_TEMPLATES)):
+    """Return a synthetic MARCXML HEP record.
+
+    Args:
+        size(int): how many of each of the ``fields`` the record has.
+        fields(Iterable[str]): keys of ``FIELD_TEMPLATES``.
+    """
+    parts = [
+        '<record>',
+        '<controlfield tag="001">1</controlfield>',
+        '<datafield tag="245" ind1=" " ind2=" ">'
+        '<subfield code="a">A record of size {}</subfield>'
+        '</datafield>'.format(size),
+    ]
+    for field in fields:
+        template = FIELD_TEMPLATES[field]
+        parts.extend(template.format(index, index % 10) for index in range(1, size + 1))
+    parts.extend(
+        [
+            '<datafield tag="980" ind1=" " ind2=" ">'
+            '<subfield code="a">HEP</subfield>'
+            '</datafield>',
+            '</record>',
+        ]
+    )
+
+    return ''.join(parts)
+
+
+def fit_exponent(sizes, seconds):
+    """Return the slope of the least-squares line of ``log(seconds)``.
+
+    Returns ``None`` with fewer than two sizes or without any time.
+    """
+    points = [
+        (math.log(size), math.log(time))
+        for size, time in zip(sizes, seconds)
+        if time > 0
+    ]
+    if len(points) < 2:
+        return None
+
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    variance = sum((x - mean_x) ** 2 for x, _ in points)
+    if not variance:
+        return None
+
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / variance
+
+
+def profile_scaling(
+    sizes=DEFAULT_SIZES,
+    fields=tuple(FIELD_TEMPLATES),
+    repeat=3,
+    convert=marcxml2record,
+):
+    """Time every rule and filter on records of growing size.
+
+    The fastest of ``repeat`` conversions of each record is kept, and the
+    garbage collector is disabled while converting, as in ``timeit``, to
+    reduce the noise.
+
+    Args:
+        sizes(Iterable[int]): the sizes of the records, see ``make_record``.
+        fields(Iterable[str]): keys of ``FIELD_TEMPLATES``.
+        repeat(int): how many times each record is converted.
+        convert(callable): the conversion function, called with the MARCXML.
+
+    Returns:
+        List[ScalingResult]: one per rule and filter, plus one of ``kind``
+        ``'conversions'`` for the whole conversion, from the highest
+        exponent to the lowest.
+    """
+    sizes = sorted(sizes)
+    timings = {}
+    for size in sizes:
+        marcxml = make_record(size, fields)
+        best = {}
+        for _ in range(repeat):
+            timer = _Timer()
+            gc.collect()
+            gc_enabled = gc.isenabled()
+            gc.disable()
+            start = default_timer()
+            try:
+                with tracking(timer):
+                    convert(marcxml)
+            finally:
+                if gc_enabled:
+                    gc.enable()
+            timer.seconds[('conversions', getattr(convert, '__name__', 'convert'))] = (
+                default_timer() - start
+            )
+            for key, seconds in timer.seconds.items():
+                best[key] = min(best.get(key, seconds), seconds)
+        for key, seconds in best.items():
+            timings.setdefault(key, {})[size] = seconds
+
+    results = []
+    for (kind, name), by_size in timings.items():
+        seconds = [by_size.get(size, 0.0) for size in sizes]
+        results.append(
+            ScalingResult(kind, name, sizes, seconds, fit_exponent(sizes, seconds))
+        )
+
+    return sorted(
+        results,
+        key=lambda result: (
+            -(result.exponent if result.exponent is not None else -1),
+            result.kind,
+            result.name,
+        ),
+    )
+
+
+def assert_linear_scaling(
+    results, max_exponent=DEFAULT_MAX_EXPONENT, min_seconds=DEFAULT_MIN_SECONDS
+):
+    """Assert that no rule or filter grows faster than ``N ** max_exponent``.
+
+    Args:
+        results(List[ScalingResult]): the results of ``profile_scaling``.
+        max_exponent(float): the highest exponent allowed.
+        min_seconds(float): rules and filters taking less than this on the
+            largest record are not checked, as their times are mostly noise.
+
+    Raises:
+        AssertionError: listing every rule and filter above ``max_exponent``.
+    """
+    superlinear = [
+        result
+        for result in results
+        if result.exponent is not None
+        and result.exponent > max_exponent
+        and result.seconds[-1] >= min_seconds
+    ]
+
+    if superlinear:
+        raise AssertionError(
+            u'\n'.join(
+                [u'Superlinear scaling (exponent > {}):'.format(max_exponent)]
+                + [format_result(result) for result in superlinear]
+            )
+        )
+
+
+def format_result(result):
+    exponent = u'-' if result.exponent is None else u'{:.2f}'.format(result.exponent)
+    return u'{:>5} {} "{}": {}'.format(
+        exponent,
+        result.kind,
+        result.name,
+        u', '.join(
+            u'N={} {:.6f}s'.format(size, seconds)
+            for size, seconds in zip(result.sizes, result.seconds)
+        ),
+    )
+
+
+def main(argv=None):
+    """Command line entry point to report the scaling of the rules."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', nargs='+', type=int, default=DEFAULT_SIZES)
+    parser.add_argument(
+        '--fields',
+        nargs='+',
+        choices=list(FIELD_TEMPLATES),
+        default=list(FIELD_TEMPLATES),
+    )
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--max-exponent', type=float, default=DEFAULT_MAX_EXPONENT)
+    parser.add_argument('--min-seconds', type=float, default=DEFAULT_MIN_SECONDS)
+    args = parser.parse_args(argv)
+
+    with Flask(__name__).app_context():
+        results = profile_scaling(args.sizes, args.fields, args.repeat)
+
+    for result in results:
+        print(format_result(result))
+
+    try:
+        assert_linear_scaling(results, args.max_exponent, args.min_seconds)
+    except AssertionError as exc:
+        print(exc, file=sys.stderr)
+        return 1
+
+    return 0
+
+
+if __name__ == '__main__':  # pragma: no cover
+    sys.exit(main())
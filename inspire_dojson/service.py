@@ -0,0 +1,351 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Conversion service over HTTP.
+
+``create_app`` returns a WSGI application exposing the conversions, to be
+served by any WSGI server, for example::
+
+    $ gunicorn --threads 16 'inspire_dojson.service:create_app()'
+
+Endpoints:
+
+* ``POST /marc2json`` and ``POST /cds2json`` take a MARCXML ``<record>``,
+  returned as a JSON record, or a ``<collection>`` of them, returned as a
+  list with either a ``record`` or an ``error`` for each of them.
+* ``POST /json2marc`` takes a JSON record, returned as a MARCXML
+  ``<record>``, or a list of them, returned as a ``<collection>``.
+* ``GET /metrics`` returns the metrics in the Prometheus text format.
+
+The conversions run on a pool of workers warmed up when the application is
+created. Records received at about the same time, in one or several
+requests, are sent to the workers in batches. Each MARCXML body is parsed
+once: threads convert the parsed records, while processes are sent the
+MARCXML of each record. The pool is shut down when the process exits.
+
+This module needs Python 3.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import atexit
+import threading
+from concurrent.futures import (
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from functools import partial
+from timeit import default_timer
+
+from flask import Flask, Response, jsonify, request
+from lxml import etree
+from six.moves import queue
+
+from inspire_dojson.api import cds_marcxml2record, marcxml2record, record2marcxml
+from inspire_dojson.metrics import METRICS, export_prometheus
+from inspire_dojson.preload import warmup
+from inspire_dojson.utils.app import freeze_config, get_app
+
+DEFAULT_MAX_BATCH_SIZE = 32
+DEFAULT_MAX_WAIT = 0.002
+
+CONVERSIONS = {
+    'cds2json': cds_marcxml2record,
+    'json2marc': record2marcxml,
+    'marc2json': marcxml2record,
+}
+
+_STOP = object()
+
+
+class MicroBatcher(object):
+    """Send the conversions submitted from many threads to a pool in batches.
+
+    A batch is sent as soon as it holds ``max_batch_size`` conversions, or
+    ``max_wait`` seconds after its first conversion was submitted.
+
+    Args:
+        executor(Executor): the pool running the batches.
+        config(tuple): the configuration of the app of the workers.
+        max_batch_size(int): the maximum number of conversions in a batch.
+        max_wait(float): the maximum seconds spent waiting for a batch to
+            fill up.
+        merge_metrics(bool): whether the workers are other processes, whose
+            metrics must be sent back with their results.
+        owns_executor(bool): whether to shut down ``executor`` when the
+            batcher is closed.
+    """
+
+    def __init__(
+        self,
+        executor,
+        config=(),
+        max_batch_size=DEFAULT_MAX_BATCH_SIZE,
+        max_wait=DEFAULT_MAX_WAIT,
+        merge_metrics=False,
+        owns_executor=False,
+    ):
+        self.executor = executor
+        self.config = config
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.merge_metrics = merge_metrics
+        self.owns_executor = owns_executor
+        self._closed = False
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(
+            target=self._run, name='inspire-dojson-batcher'
+        )
+        self._thread.daemon = True
+        self._thread.start()
+
+    def submit(self, kind, payload):
+        """Queue a conversion.
+
+        Args:
+            kind(str): a key of ``CONVERSIONS``.
+            payload: the argument of the conversion.
+
+        Returns:
+            Future: resolved with ``('record', result)`` or ``('error',
+            details)``.
+
+        Raises:
+            RuntimeError: if the batcher is closed.
+        """
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError(u'The batcher is closed')
+            self._queue.put((kind, payload, future))
+        return future
+
+    def close(self):
+        """Send the queued conversions and stop batching.
+
+        The executor, if owned by the batcher, is shut down once these
+        conversions are done. Closing a closed batcher does nothing.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        self._thread.join()
+        if self.owns_executor:
+            self.executor.shutdown()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+
+            batch = [item]
+            deadline = default_timer() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - default_timer()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self._dispatch(batch)
+
+    def _dispatch(self, batch):
+        conversions = [(kind, payload) for kind, payload, _ in batch]
+        try:
+            future = self.executor.submit(
+                _convert_batch, self.config, conversions, self.merge_metrics
+            )
+        except Exception as exc:
+            for _, _, result in batch:
+                result.set_exception(exc)
+            return
+        future.add_done_callback(partial(self._resolve, batch))
+
+    def _resolve(self, batch, future):
+        try:
+            results, metrics = future.result()
+        except Exception as exc:
+            for _, _, result in batch:
+                result.set_exception(exc)
+            return
+
+        if metrics is not None:
+            METRICS.merge(metrics)
+        for (_, _, result), value in zip(batch, results):
+            result.set_result(value)
+
+
+def create_app(
+    config=None,
+    executor='thread',
+    max_workers=None,
+    max_batch_size=DEFAULT_MAX_BATCH_SIZE,
+    max_wait=DEFAULT_MAX_WAIT,
+    warm=True,
+):
+    """Create the WSGI application of the conversion service.
+
+    Args:
+        config(dict): the configuration of the application, including the
+            values used by the rules, like ``SERVER_NAME``.
+        executor(Union[str, Executor]): ``'thread'`` or ``'process'`` to
+            create a pool of this kind, or an existing executor.
+        max_workers(int): the size of the pool created by the service.
+        max_batch_size(int): the maximum number of records in a batch.
+        max_wait(float): the maximum seconds spent waiting for a batch to
+            fill up.
+        warm(bool): whether to load all the resources used by the
+            conversions before serving, in this process and in the workers.
+
+    Returns:
+        Flask: the application. The batcher is available as
+        ``app.extensions['inspire_dojson']``, and is closed when the
+        process exits.
+    """
+    app = Flask(__name__)
+    app.config.update(config or {})
+
+    if warm:
+        warmup()
+
+    if isinstance(executor, Executor):
+        pool = executor
+    elif executor == 'process':
+        pool = ProcessPoolExecutor(max_workers, initializer=warmup if warm else None)
+    elif executor == 'thread':
+        pool = ThreadPoolExecutor(max_workers)
+    else:
+        raise ValueError(u'Unknown executor: {!r}'.format(executor))
+
+    in_processes = isinstance(pool, ProcessPoolExecutor)
+    batcher = MicroBatcher(
+        pool,
+        config=freeze_config(app.config),
+        max_batch_size=max_batch_size,
+        max_wait=max_wait,
+        merge_metrics=in_processes,
+        owns_executor=pool is not executor,
+    )
+    atexit.register(batcher.close)
+    app.extensions['inspire_dojson'] = batcher
+
+    @app.route('/marc2json', methods=['POST'])
+    def marc2json():
+        return _convert_marcxml(batcher, 'marc2json', in_processes)
+
+    @app.route('/cds2json', methods=['POST'])
+    def cds2json():
+        return _convert_marcxml(batcher, 'cds2json', in_processes)
+
+    @app.route('/json2marc', methods=['POST'])
+    def json2marc():
+        records = request.get_json(silent=True)
+        if isinstance(records, dict):
+            kind, value = batcher.submit('json2marc', records).result()
+            if kind == 'error':
+                return jsonify(value), 400
+            return Response(value, mimetype='application/xml')
+        elif not isinstance(records, list):
+            return _bad_request(u'Expected a JSON record or a list of them')
+
+        results = [
+            future.result()
+            for future in [batcher.submit('json2marc', record) for record in records]
+        ]
+        errors = [
+            dict(value, index=index)
+            for index, (kind, value) in enumerate(results)
+            if kind == 'error'
+        ]
+        if errors:
+            return jsonify({'errors': errors}), 400
+
+        collection = etree.Element('collection')
+        for _, marcxml in results:
+            collection.append(etree.fromstring(marcxml))
+        return Response(
+            etree.tostring(collection, encoding='utf8', pretty_print=True),
+            mimetype='application/xml',
+        )
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        return Response(export_prometheus(), mimetype='text/plain; version=0.0.4')
+
+    return app
+
+
+def _convert_marcxml(batcher, kind, in_processes):
+    data = request.get_data()
+    try:
+        root = etree.fromstring(data)
+    except etree.XMLSyntaxError as exc:
+        return _bad_request(u'Invalid MARCXML: {}'.format(exc))
+
+    if etree.QName(root).localname == 'record':
+        result, value = batcher.submit(kind, data if in_processes else root).result()
+        if result == 'error':
+            return jsonify(value), 400
+        return jsonify(value)
+    elif etree.QName(root).localname != 'collection':
+        return _bad_request(u'Expected a <record> or a <collection>')
+
+    futures = [
+        batcher.submit(kind, etree.tostring(record) if in_processes else record)
+        for record in root.iterchildren('{*}record')
+    ]
+    return jsonify([{result: value} for result, value in (f.result() for f in futures)])
+
+
+def _bad_request(message):
+    return jsonify({'error': 'BadRequest', 'message': message}), 400
+
+
+def _convert_batch(config, conversions, drain_metrics):
+    with get_app(config).app_context():
+        results = [_convert(kind, payload) for kind, payload in conversions]
+
+    return results, METRICS.drain() if drain_metrics else None
+
+
+def _convert(kind, payload):
+    try:
+        return 'record', CONVERSIONS[kind](payload)
+    except Exception as exc:
+        return 'error', {
+            'error': type(exc).__name__,
+            'message': str(exc),
+            'rule': getattr(exc, 'rule', None),
+        }
@@ -26,17 +26,24 @@ from __future__ import absolute_import, division, print_function
 
 import os
 import re
+import threading
 
+import langdetect
 from dojson.utils import GroupableOrderedDict
 from flask import current_app
-from inspire_utils.date import normalize_date
 from inspire_utils.dedupers import dedupe_list, dedupe_list_of_dicts
 from inspire_utils.helpers import force_list, maybe_int
+from langdetect.detector_factory import init_factory
 from six import binary_type, iteritems, text_type
 from six.moves import urllib
 
+from inspire_dojson.utils.dates import normalize_date_aggressively  # noqa: F401
+
 DEFAULT_AFS_PATH = '/afs/cern.ch/project/inspire/PROD'
 
+_language_profiles_lock = threading.Lock()
+_language_profiles_loaded = threading.Event()
+
 def normalize_rank(rank):
     """Normalize a rank in order to be schema-compliant."""
     normalized_ranks = {
@@ -218,26 +225,6 @@ def dedupe_all_lists(obj, exclude_keys=()):
         return obj
 
 
-def normalize_date_aggressively(date):
-    """Normalize date, stripping date parts until a valid date is obtained."""
-
-    def _strip_last_part(date):
-        parts = date.split('-')
-        return '-'.join(parts[:-1])
-
-    fake_dates = {'0000', '9999'}
-    if date in fake_dates:
-        return None
-    try:
-        return normalize_date(date)
-    except (IndexError, TypeError, ValueError):
-        if '-' not in date:
-            raise
-        else:
-            new_date = _strip_last_part(date)
-            return normalize_date_aggressively(new_date)
-
-
 def create_record_from_dict(dictionary):
     """Create an input record for dojson from a dict."""
     return GroupableOrderedDict(iteritems(dictionary))
@@ -254,3 +241,22 @@ def unquote_url(quoted):
     if isinstance(unquoted, binary_type):
         unquoted = unquoted.decode('utf-8')
     return unquoted
+
+
+def load_language_profiles():
+    """Load the language profiles of ``langdetect``, once per process.
+
+    ``langdetect`` publishes its global factory before loading the profiles
+    into it, so a thread detecting a language while another one loads them
+    could see a partially loaded factory.
+    """
+    if not _language_profiles_loaded.is_set():
+        with _language_profiles_lock:
+            init_factory()
+            _language_profiles_loaded.set()
+
+
+def detect_language(text):
+    """Detect the language of ``text``, safely from any thread."""
+    load_language_profiles()
+    return langdetect.detect(text)
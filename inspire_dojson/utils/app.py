@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2019 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+
+"""Flask applications running conversions outside of the caller's context.
+
+The rules read a few configuration values of the current application, like
+``SERVER_NAME``. Conversions run on a pool get these values from the caller
+and run in the context of an application of their own with them.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import threading
+from functools import wraps
+
+from flask import Flask, current_app, has_app_context
+
+CONFIG_KEYS = (
+    'LABS_AFS_HTTP_SERVICE',
+    'LEGACY_AFS_PATH',
+    'LEGACY_BASE_URL',
+    'PREFERRED_URL_SCHEME',
+    'SERVER_NAME',
+)
+
+_apps = {}
+_apps_lock = threading.Lock()
+
+
+def get_app(config):
+    """Return the application for ``config``, created once per process."""
+    with _apps_lock:
+        if config not in _apps:
+            app = Flask(__name__)
+            app.config.update(config)
+            _apps[config] = app
+        return _apps[config]
+
+
+def get_current_config():
+    """Return the configuration used by the rules in the current context."""
+    if not has_app_context():
+        return ()
+    return freeze_config(current_app.config)
+
+
+def freeze_config(config):
+    """Return the values of ``CONFIG_KEYS`` in ``config`` as a hashable."""
+    return tuple(sorted((key, config[key]) for key in CONFIG_KEYS if key in config))
+
+
+def bind_app_context(func):
+    """Return ``func`` running in the current application context.
+
+    Threads don't inherit the application context of the thread starting
+    them, so functions submitted to a thread pool should be bound first::
+
+        executor.map(bind_app_context(marcxml2record), marcxmls)
+
+    Raises:
+        RuntimeError: if there is no current application context.
+    """
+    app = current_app._get_current_object()
+
+    @wraps(func)
+    def _func(*args, **kwargs):
+        with app.app_context():
+            return func(*args, **kwargs)
+
+    return _func
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2019 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Bounded memoization of pure functions used by the rules."""
+
+from __future__ import absolute_import, division, print_function
+
+import threading
+from collections import OrderedDict
+from functools import update_wrapper
+
+DEFAULT_MAXSIZE = 4096
+
+_registry = OrderedDict()
+
+
+class MemoizedFunction(object):
+    """A pure function with a bounded least-recently-used cache.
+
+    List results are stored as tuples and copied on every call, so that
+    callers mutating them cannot corrupt the cache. Calls with unhashable
+    arguments bypass the cache.
+
+    Exceptions listed in ``cache_exceptions`` are remembered like results:
+    later calls with the same arguments raise a new exception of the same
+    type and with the same arguments, without calling the function again.
+    """
+
+    def __init__(self, func, maxsize=DEFAULT_MAXSIZE, cache_exceptions=()):
+        update_wrapper(self, func)
+        self.func = func
+        self.maxsize = maxsize
+        self.cache_exceptions = cache_exceptions
+        self.hits = 0
+        self.misses = 0
+        self.failures = 0
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __call__(self, *args):
+        try:
+            with self._lock:
+                result = self._cache.pop(args)
+                self._cache[args] = result
+                self.hits += 1
+        except KeyError:
+            result = self._miss(args)
+        except TypeError:
+            return self.func(*args)
+
+        if isinstance(result, _ListResult):
+            return list(result)
+        elif isinstance(result, _CachedException):
+            with self._lock:
+                self.failures += 1
+            raise result.exc_type(*result.args)
+        return result
+
+    def _miss(self, args):
+        try:
+            result = self.func(*args)
+        except self.cache_exceptions as exc:
+            self._store(args, _CachedException(type(exc), exc.args))
+            with self._lock:
+                self.failures += 1
+            raise
+
+        if isinstance(result, list):
+            result = _ListResult(result)
+        self._store(args, result)
+
+        return result
+
+    def _store(self, args, result):
+        with self._lock:
+            self.misses += 1
+            self._cache[args] = result
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self.hits = self.misses = self.failures = 0
+
+    def stats(self):
+        with self._lock:
+            calls = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'failures': self.failures,
+                'size': len(self._cache),
+                'maxsize': self.maxsize,
+                'hit_rate': self.hits / calls if calls else 0.0,
+            }
+
+
+class _ListResult(tuple):
+    pass
+
+
+class _CachedException(object):
+    __slots__ = ('exc_type', 'args')
+
+    def __init__(self, exc_type, args):
+        self.exc_type = exc_type
+        self.args = args
+
+
+def memoize(name=None, maxsize=DEFAULT_MAXSIZE, cache_exceptions=()):
+    """Memoize a pure function and register its cache.
+
+    Args:
+        name(str): the name under which the cache stats are reported.
+            Defaults to the name of the function.
+        maxsize(int): the maximum number of cached results.
+        cache_exceptions(Tuple[type]): exception types to remember.
+    """
+
+    def decorator(func):
+        memoized = MemoizedFunction(
+            func, maxsize=maxsize, cache_exceptions=cache_exceptions
+        )
+        _registry[name or func.__name__] = memoized
+        return memoized
+
+    return decorator
+
+
+def get_cache_stats():
+    """Return the stats of all registered caches, by name."""
+    return {name: memoized.stats() for name, memoized in _registry.items()}
+
+
+def clear_caches():
+    """Empty all registered caches and reset their stats."""
+    for memoized in _registry.values():
+        memoized.clear()
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2019 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Cached date normalization shared by all the rules.
+
+Legacy records use a small vocabulary of date strings over and over, so
+both the normalized dates and the parsing failures are remembered.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+from inspire_utils import date as inspire_date
+
+from inspire_dojson.utils.cache import get_cache_stats, memoize
+
+DATE_ERRORS = (IndexError, TypeError, ValueError)
+
+
+@memoize(cache_exceptions=DATE_ERRORS)
+def normalize_date(date):
+    """Normalize a date to be schema-compliant.
+
+    Cached version of :func:`inspire_utils.date.normalize_date`.
+    """
+    return inspire_date.normalize_date(date)
+
+
+@memoize(cache_exceptions=DATE_ERRORS)
+def normalize_date_aggressively(date):
+    """Normalize date, stripping date parts until a valid date is obtained."""
+
+    def _strip_last_part(date):
+        parts = date.split('-')
+        return '-'.join(parts[:-1])
+
+    fake_dates = {'0000', '9999'}
+    if date in fake_dates:
+        return None
+    try:
+        return normalize_date(date)
+    except DATE_ERRORS:
+        if '-' not in date:
+            raise
+        else:
+            new_date = _strip_last_part(date)
+            return normalize_date_aggressively(new_date)
+
+
+@memoize()
+def trim_date(date):
+    """Normalize a ``YYYY-MM-DD`` or ``YYYYMMDD`` date, dropping zero parts.
+
+    Dates that can't be split in year, month and day are returned unchanged.
+    """
+    if len(date) == 8:
+        date = '-'.join([date[:4], date[4:6], date[6:8]])
+
+    try:
+        year, month, day = map(int, date.split('-'))
+    except ValueError:
+        return date
+
+    if year and month and day:
+        return '%d-%02d-%02d' % (year, month, day)
+    elif year and month:
+        return '%d-%02d' % (year, month)
+    return '%d' % year
+
+
+def get_date_cache_stats():
+    """Return the stats of the date normalization caches."""
+    names = ('normalize_date', 'normalize_date_aggressively', 'trim_date')
+    return {
+        name: stats for name, stats in get_cache_stats().items() if name in names
+    }
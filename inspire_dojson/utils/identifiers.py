@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2019 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Memoized identifier normalizers.
+
+The same identifiers recur constantly across a batch, so the rules use these
+cached versions of the ``idutils``, ``inspire_schemas`` and ``inspire_utils``
+helpers instead of the originals.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import idutils
+from inspire_schemas import utils as schemas_utils
+from inspire_utils import isbn
+from inspire_utils.dedupers import dedupe_list
+
+from inspire_dojson.utils.cache import memoize
+
+
+@memoize()
+def valid_arxiv_categories():
+    """List of all arXiv categories that ever existed.
+
+    ``inspire_schemas.utils.valid_arxiv_categories`` extends the list of the
+    cached schema with the new categories on every call, so every check of
+    an arXiv category gets slower for the rest of the process. This version
+    calls it once, on first use, and returns a copy of the deduplicated list.
+    """
+    return dedupe_list(schemas_utils.valid_arxiv_categories())
+
+
+@memoize()
+def _lowercase_arxiv_categories():
+    return frozenset(category.lower() for category in valid_arxiv_categories())
+
+
+def is_arxiv_eprint(value):
+    """Whether ``value`` is an arXiv identifier with a valid category, if any.
+
+    Same as ``inspire_schemas.utils.is_arxiv``, which ``ReferenceBuilder``
+    calls on every identifier, but checks the category against the list of
+    ``valid_arxiv_categories`` above instead of the growing one.
+    """
+    words = value.split()
+    if not words:
+        return False
+
+    for pattern in schemas_utils.ARXIV_PATTERNS:
+        match = pattern.match(words[0])
+        if match:
+            break
+    else:
+        return False
+
+    category = match.group('category')
+    if not category:
+        return True
+
+    categories = _lowercase_arxiv_categories()
+    category = category.lower()
+    return category in categories or category.replace('-', '.') in categories
+
+
+is_arxiv = memoize()(idutils.is_arxiv)
+is_arxiv_post_2007 = memoize()(idutils.is_arxiv_post_2007)
+is_doi = memoize()(idutils.is_doi)
+is_handle = memoize()(idutils.is_handle)
+normalize_doi = memoize()(idutils.normalize_doi)
+normalize_isbn = memoize()(isbn.normalize_isbn)
+normalize_arxiv_category = memoize()(schemas_utils.normalize_arxiv_category)
+normalize_collaboration = memoize()(schemas_utils.normalize_collaboration)
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2019 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Bounded interning of recurring string values.
+
+Values like ``arXiv``, ``CURATOR``, ``HEP``, affiliations and journal
+titles repeat thousands of times in a batch or in a single collaboration
+paper. Interning them makes all occurrences share one string object.
+Unlike the builtin ``intern``, the table is bounded and owned by the caller, so
+it can be dropped together with the batch.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import threading
+
+from six import string_types
+
+DEFAULT_MAXSIZE = 65536
+DEFAULT_MAX_LENGTH = 64
+
+
+class StringInterner(object):
+    """A bounded table of canonical strings.
+
+    Strings longer than ``max_length`` are returned unchanged. Once the
+    table holds ``maxsize`` strings, new ones are returned unchanged too,
+    while the ones already in the table keep being shared.
+
+    Args:
+        maxsize(int): the maximum number of strings in the table.
+        max_length(int): the maximum length of the strings to intern.
+    """
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, max_length=DEFAULT_MAX_LENGTH):
+        self.maxsize = maxsize
+        self.max_length = max_length
+        self.hits = 0
+        self.misses = 0
+        self._table = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, value):
+        if len(value) > self.max_length:
+            return value
+
+        with self._lock:
+            canonical = self._table.get(value)
+            if canonical is not None:
+                self.hits += 1
+                return canonical
+            self.misses += 1
+            if len(self._table) < self.maxsize:
+                self._table[value] = value
+        return value
+
+    def intern_values(self, obj):
+        """Intern in place all the strings in the lists and dicts of ``obj``.
+
+        Returns:
+            the same object, or the interned string if ``obj`` is one.
+        """
+        if isinstance(obj, string_types):
+            return self(obj)
+        elif isinstance(obj, dict):
+            for key, value in obj.items():
+                obj[key] = self.intern_values(value)
+        elif isinstance(obj, list):
+            for index, value in enumerate(obj):
+                obj[index] = self.intern_values(value)
+        return obj
+
+    def clear(self):
+        with self._lock:
+            self._table.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            calls = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._table),
+                'maxsize': self.maxsize,
+                'hit_rate': self.hits / calls if calls else 0.0,
+            }
@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Sampled round-trip verification of conversions.
+
+A ``RoundTripVerifier`` passed to ``marcxml2record`` picks a fraction of
+the converted records, converts them back to MARCXML in a background
+thread, and compares the fields of both versions. Records whose fields
+differ are reported to a sink, tag by tag.
+
+The cost is bounded by the sampling rate, by the number of records waiting
+to be verified, beyond which new samples are dropped, and by the number of
+discrepancies kept in each report.
+"""
+
+from __future__ import absolute_import, division, print_function
+
+import copy
+import json
+import random
+import threading
+from collections import Counter, namedtuple
+
+from dojson.contrib.marc21.utils import create_record
+from flask import current_app, has_app_context
+from lxml.etree import tostring
+from six import string_types, text_type
+from six.moves import queue
+
+from inspire_dojson.api import _get_reverse_model, record2marcxml_etree
+from inspire_dojson.errors import NotSupportedError
+
+DEFAULT_IGNORED_KEYS = ('005',)
+
+Discrepancy = namedtuple('Discrepancy', ['key', 'missing', 'extra'])
+RoundTripReport = namedtuple(
+    'RoundTripReport', ['control_number', 'discrepancies', 'truncated', 'error']
+)
+
+_STOP = object()
+
+
+class JsonLinesRoundTripSink(object):
+    """Round-trip sink writing one JSON line per report.
+
+    Args:
+        stream: a text file object to write to.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self._lock = threading.Lock()
+
+    def write(self, report):
+        line = {
+            'control_number': report.control_number,
+            'discrepancies': [
+                {
+                    'key': discrepancy.key,
+                    'missing': [_field_to_json(field) for field in discrepancy.missing],
+                    'extra': [_field_to_json(field) for field in discrepancy.extra],
+                }
+                for discrepancy in report.discrepancies
+            ],
+            'truncated': report.truncated,
+            'error': report.error,
+        }
+        with self._lock:
+            self.stream.write(json.dumps(line, sort_keys=True) + u'\n')
+
+
+class RoundTripVerifier(object):
+    """Verify a sample of the conversions by converting them back.
+
+    Args:
+        sink: an object with a ``write`` method, called from the background
+            thread with a ``RoundTripReport`` for every sampled record whose
+            fields differ after the round trip or which fails to convert
+            back.
+        rate(float): the fraction of records to verify.
+        max_pending(int): the maximum number of records waiting to be
+            verified. New samples are dropped while the queue is full.
+        max_discrepancies(int): the maximum number of keys reported for a
+            single record.
+        ignored_keys(Iterable[str]): MARC keys, or tags, not compared.
+        seed: the seed of the sampling, for reproducible samples.
+    """
+
+    def __init__(
+        self,
+        sink,
+        rate=0.01,
+        max_pending=100,
+        max_discrepancies=20,
+        ignored_keys=DEFAULT_IGNORED_KEYS,
+        seed=None,
+    ):
+        self.sink = sink
+        self.rate = rate
+        self.max_discrepancies = max_discrepancies
+        self.ignored_keys = frozenset(ignored_keys)
+        self.stats = Counter()
+        self._random = random.Random(seed)
+        self._queue = queue.Queue(max_pending)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def submit(self, marcxml, record):
+        """Queue a conversion for verification if it is sampled.
+
+        Sampled records are copied, so that the caller can modify them.
+        Records without reverse conversion rules are not verified.
+        """
+        with self._lock:
+            if self._random.random() >= self.rate:
+                return
+            try:
+                _get_reverse_model(record)
+            except NotSupportedError:
+                self.stats['unsupported'] += 1
+                return
+            self.stats['sampled'] += 1
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name='inspire-dojson-round-trip'
+                )
+                self._thread.daemon = True
+                self._thread.start()
+
+        app = current_app._get_current_object() if has_app_context() else None
+        try:
+            self._queue.put_nowait((app, marcxml, copy.deepcopy(record)))
+        except queue.Full:
+            with self._lock:
+                self.stats['dropped'] += 1
+
+    def verify(self, marcxml, record):
+        """Convert ``record`` back and compare it with ``marcxml``.
+
+        Returns:
+            RoundTripReport: the differences, or ``None`` if there are none.
+        """
+        marcjson = create_record(marcxml, keep_singletons=False)
+        control_number = marcjson.get('001')
+        try:
+            round_trip = create_record(
+                tostring(record2marcxml_etree(record)), keep_singletons=False
+            )
+        except Exception as exc:
+            return RoundTripReport(
+                control_number, [], False, u'{}: {}'.format(type(exc).__name__, exc)
+            )
+
+        expected = self._group_fields(marcjson)
+        result = self._group_fields(round_trip)
+        discrepancies = []
+        for key in sorted(set(expected) | set(result)):
+            missing = expected.get(key, Counter()) - result.get(key, Counter())
+            extra = result.get(key, Counter()) - expected.get(key, Counter())
+            if missing or extra:
+                discrepancies.append(
+                    Discrepancy(
+                        key, sorted(missing.elements()), sorted(extra.elements())
+                    )
+                )
+
+        if not discrepancies:
+            return None
+
+        return RoundTripReport(
+            control_number,
+            discrepancies[: self.max_discrepancies],
+            len(discrepancies) > self.max_discrepancies,
+            None,
+        )
+
+    def flush(self):
+        """Wait until all queued records are verified."""
+        self._queue.join()
+
+    def close(self):
+        """Verify the queued records and stop the background thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is _STOP:
+                    return
+                self._verify_queued(*item)
+            finally:
+                self._queue.task_done()
+
+    def _verify_queued(self, app, marcxml, record):
+        if app is not None:
+            with app.app_context():
+                report = self.verify(marcxml, record)
+        else:
+            report = self.verify(marcxml, record)
+
+        with self._lock:
+            if report is None:
+                self.stats['verified'] += 1
+            elif report.error is None:
+                self.stats['mismatched'] += 1
+            else:
+                self.stats['failed'] += 1
+
+        if report is not None:
+            self.sink.write(report)
+
+    def _group_fields(self, marcjson):
+        fields = {}
+        for key, value in marcjson.iteritems(repeated=True):
+            if key == '__order__' or key in self.ignored_keys:
+                continue
+            if key[:3] in self.ignored_keys:
+                continue
+            fields.setdefault(key, Counter())[_normalize_field(value)] += 1
+
+        return fields
+
+
+def _normalize_field(value):
+    if isinstance(value, string_types):
+        return value.strip()
+    return tuple(
+        sorted(
+            (code, text_type(subfield).strip())
+            for code, subfield in value.iteritems(repeated=True)
+            if code != '__order__'
+        )
+    )
+
+
+def _field_to_json(field):
+    if isinstance(field, string_types):
+        return field
+    return [list(subfield) for subfield in field]
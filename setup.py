@@ -24,6 +24,8 @@
 
 from __future__ import absolute_import, division, print_function
 
+import sys
+
 from setuptools import find_packages, setup
 
 URL = "https://github.com/inspirehep/inspire-dojson"
@@ -71,6 +73,14 @@ for _name, reqs in extras_require.items():
 
 packages = find_packages(exclude=["docs"])
 
+console_scripts = [
+    "inspire-dojson-index = inspire_dojson.dump_index:main",
+    "inspire-dojson-scaling = inspire_dojson.scaling:main",
+]
+if sys.version_info >= (3,):
+    # statistics only exists on Python 3
+    console_scripts.append("inspire-dojson-benchmark = inspire_dojson.benchmarks:main")
+
 setup(
     name="inspire-dojson",
     url=URL,
@@ -86,6 +96,7 @@ setup(
     install_requires=install_requires,
     tests_require=tests_require,
     extras_require=extras_require,
+    entry_points={"console_scripts": console_scripts},
     version="63.2.33",
     classifiers=[
         "Development Status :: 4 - Beta",
@@ -21,16 +21,56 @@
 
 from __future__ import absolute_import, division, print_function
 
+import sys
+
 import pytest
 from flask import Flask
 from langdetect import DetectorFactory
 
+collect_ignore = []
+if sys.version_info < (3,):
+    # these tests need parts of the standard library added in Python 3
+    collect_ignore.extend(
+        [
+            'test_aio.py',
+            'test_benchmarks.py',
+            'test_service.py',
+            'test_thread_safety.py',
+        ]
+    )
+if sys.version_info < (3, 9):
+    collect_ignore.append('test_profiling.py')
+
 CONFIG = {
     'SERVER_NAME': 'localhost:5000',
     'LEGACY_BASE_URL': 'http://inspirehep.net',
 }
 
 
+def pytest_addoption(parser):
+    parser.addoption(
+        '--benchmarks',
+        action='store_true',
+        help='run the benchmarks, which depend on the speed of the machine',
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        'markers', 'benchmark: measures wall-clock time, run with --benchmarks'
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption('--benchmarks'):
+        return
+
+    skip = pytest.mark.skip(reason='needs --benchmarks')
+    for item in items:
+        if item.get_closest_marker('benchmark'):
+            item.add_marker(skip)
+
+
 @pytest.fixture(autouse=True, scope='session')
 def app():
     app = Flask(__name__)
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+from __future__ import absolute_import, division, print_function
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from flask import Flask
+
+from inspire_dojson import aio
+from inspire_dojson.aio import AsyncConverter
+from inspire_dojson.api import marcxml2record
+from inspire_dojson.errors import DoJsonError
+
+RECORD = (  # synthetic data
+    '<record>'
+    '  <controlfield tag="001">{}</controlfield>'
+    '  <datafield tag="245" ind1=" " ind2=" ">'
+    '    <subfield code="a">A title</subfield>'
+    '  </datafield>'
+    '  <datafield tag="980" ind1=" " ind2=" ">'
+    '    <subfield code="a">HEP</subfield>'
+    '  </datafield>'
+    '</record>'
+)
+
+BAD_RECORD = (  # synthetic data
+    '<record>'
+    '  <datafield tag="269" ind1=" " ind2=" ">'
+    '    <subfield code="c">Ceci n’est pas une dâte</subfield>'
+    '  </datafield>'
+    '</record>'
+)
+
+
+class CountingExecutor(ThreadPoolExecutor):
+    """Executor recording how many tasks were submitted and not done."""
+
+    def __init__(self, *args, **kwargs):
+        super(CountingExecutor, self).__init__(*args, **kwargs)
+        self.submitted = 0
+        self.started = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._counter_lock = threading.Lock()
+
+    def submit(self, fn, *args, **kwargs):
+        with self._counter_lock:
+            self.submitted += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        future = super(CountingExecutor, self).submit(self._run, fn, *args, **kwargs)
+        future.add_done_callback(self._done)
+        return future
+
+    def _run(self, fn, *args, **kwargs):
+        with self._counter_lock:
+            self.started += 1
+        return fn(*args, **kwargs)
+
+    def _done(self, future):
+        with self._counter_lock:
+            self.in_flight -= 1
+
+
+def test_convert():
+    record = asyncio.run(aio.convert(RECORD.format(1)))
+
+    assert record == marcxml2record(RECORD.format(1))
+
+
+def test_convert_stream_keeps_order():
+    async def _marcxmls():
+        for recid in range(20):
+            yield RECORD.format(recid)
+
+    async def _convert_all():
+        return [record async for record in aio.convert_stream(_marcxmls())]
+
+    records = asyncio.run(_convert_all())
+
+    assert [record['control_number'] for record in records] == list(range(20))
+
+
+def test_convert_stream_bounds_in_flight_conversions():
+    executor = CountingExecutor(8)
+    converter = AsyncConverter(executor, window=3)
+
+    async def _convert_all():
+        marcxmls = [RECORD.format(recid) for recid in range(30)]
+        return [record async for record in converter.convert_stream(marcxmls)]
+
+    records = asyncio.run(_convert_all())
+    executor.shutdown()
+
+    assert len(records) == 30
+    assert executor.max_in_flight <= 3
+
+
+def test_convert_propagates_config_to_workers():
+    config = {
+        'SERVER_NAME': 'example.org',
+        'LEGACY_BASE_URL': 'https://old.example.org',
+    }
+
+    with AsyncConverter(config=config) as converter:
+        record = asyncio.run(converter.convert(RECORD.format(1)))
+
+    assert record['self'] == {'$ref': 'http://example.org/api/literature/1'}
+
+
+def test_convert_reads_the_config_of_each_caller():
+    other = Flask(__name__)
+    other.config.update(SERVER_NAME='example.org')
+
+    with other.app_context():
+        record = asyncio.run(aio.convert(RECORD.format(1)))
+
+    assert record['self'] == {'$ref': 'http://example.org/api/literature/1'}
+
+    record = asyncio.run(aio.convert(RECORD.format(1)))
+
+    assert record['self'] == {'$ref': 'http://localhost:5000/api/literature/1'}
+
+
+def test_convert_uses_process_pool():
+    with AsyncConverter('process', max_workers=1) as converter:
+        record = asyncio.run(converter.convert(RECORD.format(1)))
+
+    assert record == marcxml2record(RECORD.format(1))
+
+
+def test_convert_raises_conversion_errors():
+    with AsyncConverter() as converter, pytest.raises(DoJsonError):
+        asyncio.run(converter.convert(BAD_RECORD))
+
+
+def test_cancelled_conversion_does_not_run():
+    executor = CountingExecutor(1)
+    converter = AsyncConverter(executor, window=2)
+    release = threading.Event()
+
+    async def _cancel():
+        loop = asyncio.get_running_loop()
+        blocker = loop.run_in_executor(executor, release.wait)
+        task = asyncio.ensure_future(converter.convert(RECORD.format(1)))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        release.set()
+        await blocker
+        return await converter.convert(RECORD.format(2))
+
+    record = asyncio.run(_cancel())
+    executor.shutdown()
+
+    assert record['control_number'] == 2
+    assert executor.submitted == 3
+    assert executor.started == 2
+
+
+def test_closing_stream_cancels_pending_conversions():
+    release = threading.Event()
+
+    class GatedExecutor(CountingExecutor):
+        def _run(self, fn, *args, **kwargs):
+            if self.started:
+                release.wait()
+            return super(GatedExecutor, self)._run(fn, *args, **kwargs)
+
+    executor = GatedExecutor(1)
+    converter = AsyncConverter(executor, window=4)
+
+    async def _first():
+        marcxmls = [RECORD.format(recid) for recid in range(100)]
+        stream = converter.convert_stream(marcxmls)
+        record = await stream.__anext__()
+        await stream.aclose()
+        return record
+
+    record = asyncio.run(_first())
+    release.set()
+    executor.shutdown()
+
+    assert record['control_number'] == 0
+    assert executor.submitted == 4
+    assert executor.started <= 2
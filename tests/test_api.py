@@ -28,6 +28,7 @@ from inspire_dojson.api import (
     cds_marcxml2record,
     marcxml2record,
     record2marcxml,
+    record2marcxml_delta,
 )
 from inspire_dojson.errors import NotSupportedError
 
@@ -180,6 +181,107 @@ def test_marcxml2record_falls_back_to_hep():
     assert expected == result['$schema']
 
 
+DELETED_RECORD = (  # synthetic data
+    '<record>'
+    '  <controlfield tag="001">1234</controlfield>'
+    '  <datafield tag="245" ind1=" " ind2=" ">'
+    '    <subfield code="a">A title</subfield>'
+    '  </datafield>'
+    '  <datafield tag="970" ind1=" " ind2=" ">'
+    '    <subfield code="d">5678</subfield>'
+    '  </datafield>'
+    '  <datafield tag="980" ind1=" " ind2=" ">'
+    '    <subfield code="a">HEP</subfield>'
+    '  </datafield>'
+    '  <datafield tag="980" ind1=" " ind2=" ">'
+    '    <subfield code="c">DELETED</subfield>'
+    '  </datafield>'
+    '  <datafield tag="981" ind1=" " ind2=" ">'
+    '    <subfield code="a">4321</subfield>'
+    '  </datafield>'
+    '</record>'
+)
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_marcxml2record_converts_deleted_records_to_tombstones(compact):
+    expected = {
+        '$schema': 'hep.json',
+        'control_number': 1234,
+        'deleted': True,
+        'deleted_records': [
+            {'$ref': 'http://localhost:5000/api/literature/4321'},
+        ],
+        'new_record': {'$ref': 'http://localhost:5000/api/literature/5678'},
+    }
+    result = marcxml2record(DELETED_RECORD, compact=compact, tombstone_deleted=True)
+
+    assert expected == result
+
+
+def test_marcxml2record_tombstones_are_part_of_the_full_conversion():
+    tombstone = marcxml2record(DELETED_RECORD, tombstone_deleted=True)
+    record = marcxml2record(DELETED_RECORD)
+
+    assert record['titles'] == [{'title': 'A title'}]
+    assert tombstone == {key: record[key] for key in tombstone}
+
+
+def test_marcxml2record_converts_deleted_authorities_to_tombstones():
+    snippet = (  # synthetic data
+        '<record>'
+        '  <controlfield tag="001">1234</controlfield>'
+        '  <datafield tag="111" ind1=" " ind2=" ">'
+        '    <subfield code="a">A conference</subfield>'
+        '  </datafield>'
+        '  <datafield tag="980" ind1=" " ind2=" ">'
+        '    <subfield code="a">CONFERENCES</subfield>'
+        '    <subfield code="c">DELETED</subfield>'
+        '  </datafield>'
+        '</record>'
+    )
+
+    expected = {
+        '$schema': 'conferences.json',
+        'control_number': 1234,
+        'deleted': True,
+    }
+    result = marcxml2record(snippet, tombstone_deleted=True)
+
+    assert expected == result
+
+
+def test_marcxml2record_follows_the_deleted_rule_of_the_collection():
+    snippet = (  # synthetic data
+        '<record>'
+        '  <controlfield tag="001">1234</controlfield>'
+        '  <datafield tag="111" ind1=" " ind2=" ">'
+        '    <subfield code="a">A conference</subfield>'
+        '  </datafield>'
+        '  <datafield tag="980" ind1=" " ind2=" ">'
+        '    <subfield code="a">CONFERENCES</subfield>'
+        '    <subfield code="a">DELETED</subfield>'
+        '  </datafield>'
+        '</record>'
+    )
+
+    expected = marcxml2record(snippet)
+    result = marcxml2record(snippet, tombstone_deleted=True)
+
+    assert expected == result
+    assert 'deleted' not in result
+
+
+def test_marcxml2record_fully_converts_records_not_deleted():
+    snippet = DELETED_RECORD.replace('DELETED', 'CORE')
+
+    expected = marcxml2record(snippet)
+    result = marcxml2record(snippet, tombstone_deleted=True)
+
+    assert expected == result
+    assert 'titles' in result
+
+
 def test_cds_marcxml2record_handles_cds():
     snippet = (  # cds.cern.ch/record/2270264
         '<record>'
@@ -403,3 +505,61 @@ def test_record2marcxml_raises_when_rules_were_not_implemented():
     with pytest.raises(NotImplementedError) as excinfo:
         record2marcxml(record)
     assert 'missing' in str(excinfo.value)
+
+
+DELTA_RECORD = {
+    '$schema': 'http://localhost:5000/schemas/records/hep.json',
+    'control_number': 4328,
+    'titles': [
+        {'title': 'A title'},
+    ],
+    'authors': [
+        {'full_name': 'Smith, J.'},
+        {'full_name': 'Doe, J.'},
+    ],
+    'keywords': [
+        {'schema': 'INSPIRE', 'value': 'foo'},
+    ],
+}
+
+
+def test_record2marcxml_delta_emits_only_changed_tags():
+    new_record = dict(DELTA_RECORD, titles=[{'title': 'A title'}, {'title': 'Other'}])
+
+    expected = (
+        b'<record>\n'
+        b'  <controlfield tag="001">4328</controlfield>\n'
+        b'  <datafield tag="246" ind1=" " ind2=" ">\n'
+        b'    <subfield code="a">Other</subfield>\n'
+        b'  </datafield>\n'
+        b'</record>\n'
+    )
+    result = record2marcxml_delta(DELTA_RECORD, new_record)
+
+    assert expected == result
+
+
+def test_record2marcxml_delta_emits_whole_tags_and_removed_tags():
+    new_record = dict(DELTA_RECORD, authors=[{'full_name': 'Doe, J.'}])
+    del new_record['keywords']
+
+    expected = (
+        b'<record>\n'
+        b'  <controlfield tag="001">4328</controlfield>\n'
+        b'  <datafield tag="100" ind1=" " ind2=" ">\n'
+        b'    <subfield code="a">Doe, J.</subfield>\n'
+        b'  </datafield>\n'
+        b'  <datafield tag="695" ind1=" " ind2=" "/>\n'
+        b'  <datafield tag="700" ind1=" " ind2=" "/>\n'
+        b'</record>\n'
+    )
+    result = record2marcxml_delta(DELTA_RECORD, new_record)
+
+    assert expected == result
+
+
+def test_record2marcxml_delta_without_changes_only_emits_control_number():
+    expected = b'<record>\n  <controlfield tag="001">4328</controlfield>\n</record>\n'
+    result = record2marcxml_delta(DELTA_RECORD, DELTA_RECORD)
+
+    assert expected == result
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+from __future__ import absolute_import, division, print_function
+
+import io
+import json
+
+import pytest
+
+from inspire_dojson.api import marcxml2record
+from inspire_dojson.batch import JsonLinesDeadLetterSink, marcxml2records
+from inspire_dojson.errors import DoJsonError, NotSupportedError
+
+GOOD_RECORD = (  # synthetic data
+    '<record>'
+    '  <controlfield tag="001">1</controlfield>'
+    '  <datafield tag="980" ind1=" " ind2=" ">'
+    '    <subfield code="a">HEP</subfield>'
+    '  </datafield>'
+    '</record>'
+)
+
+BAD_RECORD = (  # synthetic data
+    '<record>'
+    '  <controlfield tag="001">2</controlfield>'
+    '  <datafield tag="245" ind1=" " ind2=" ">'
+    '    <subfield code="a">A title</subfield>'
+    '  </datafield>'
+    '  <datafield tag="269" ind1=" " ind2=" ">'
+    '    <subfield code="c">Ceci n’est pas une dâte</subfield>'
+    '  </datafield>'
+    '  <datafield tag="980" ind1=" " ind2=" ">'
+    '    <subfield code="a">HEP</subfield>'
+    '  </datafield>'
+    '</record>'
+)
+
+JOB_RECORD = (  # synthetic data
+    '<record>'
+    '  <controlfield tag="001">3</controlfield>'
+    '  <datafield tag="980" ind1=" " ind2=" ">'
+    '    <subfield code="a">JOB</subfield>'
+    '  </datafield>'
+    '</record>'
+)
+
+
+def test_do_json_error_exposes_rule_key_and_value():
+    with pytest.raises(DoJsonError) as exc:
+        marcxml2record(BAD_RECORD)
+
+    assert exc.value.rule == 'preprint_date'
+    assert exc.value.key == '269__'
+    assert exc.value.value['c'] == u'Ceci n’est pas une dâte'
+
+
+def test_marcxml2record_collects_rule_errors():
+    rule_errors = []
+
+    result = marcxml2record(BAD_RECORD, rule_errors=rule_errors)
+
+    assert result['titles'] == [{'title': 'A title'}]
+    assert 'preprint_date' not in result
+    assert [error.rule for error in rule_errors] == ['preprint_date']
+
+
+def test_marcxml2records_raises_without_dead_letters():
+    with pytest.raises(DoJsonError):
+        list(marcxml2records([GOOD_RECORD, BAD_RECORD]))
+
+
+def test_marcxml2records_writes_dead_letters():
+    stream = io.StringIO()
+    sink = JsonLinesDeadLetterSink(stream)
+
+    result = list(
+        marcxml2records([BAD_RECORD, GOOD_RECORD, JOB_RECORD], dead_letters=sink)
+    )
+
+    assert result[0].record is None
+    assert isinstance(result[0].error, DoJsonError)
+    assert result[1].record['control_number'] == 1
+    assert isinstance(result[2].error, NotSupportedError)
+
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert len(lines) == 2
+    assert lines[0]['index'] == 0
+    assert lines[0]['control_number'] == 2
+    assert lines[0]['rule'] == 'preprint_date'
+    assert lines[0]['key'] == '269__'
+    assert lines[0]['value'] == {'c': u'Ceci n’est pas une dâte'}
+    assert lines[0]['marcxml'] == BAD_RECORD
+    assert lines[1]['error'] == 'NotSupportedError'
+    assert lines[1]['rule'] is None
+
+    expected = {
+        'failed': 2,
+        'partial': 0,
+        'by_error': {'DoJsonError': 1, 'NotSupportedError': 1},
+        'by_rule': {'preprint_date': 1},
+    }
+    assert expected == sink.summary()
+
+
+def test_marcxml2records_skip_failing_rules():
+    stream = io.StringIO()
+    sink = JsonLinesDeadLetterSink(stream)
+
+    result = list(
+        marcxml2records([BAD_RECORD], dead_letters=sink, skip_failing_rules=True)
+    )
+
+    assert result[0].error is None
+    assert result[0].record['titles'] == [{'title': 'A title'}]
+    assert [error.rule for error in result[0].rule_errors] == ['preprint_date']
+    assert json.loads(stream.getvalue())['partial'] is True
+    assert sink.summary()['partial'] == 1
+
+
+def test_marcxml2records_skip_failing_rules_requires_dead_letters():
+    with pytest.raises(ValueError, match='requires a dead_letters sink'):
+        list(marcxml2records([GOOD_RECORD], skip_failing_rules=True))
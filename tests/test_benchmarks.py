@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+
+from __future__ import absolute_import, division, print_function
+
+import json
+import os
+
+import pytest
+
+from inspire_dojson.benchmarks import (
+    BenchmarkResult,
+    Fixture,
+    compare_reports,
+    extract_fixtures,
+    main,
+    make_report,
+    record_calls,
+    run_benchmarks,
+    time_calls,
+)
+
+TEST_MODULE = '''
+from dojson.contrib.marc21.utils import create_record
+
+from inspire_dojson.hep import hep, hep2marc
+
+
+def test_round_trip():
+    snippet = (
+        '<datafield tag="245" ind1=" " ind2=" ">'
+        '<subfield code="a">A title</subfield>'
+        '</datafield>'
+    )
+
+    result = hep.do(create_record(snippet))
+    assert result['titles'] == [{'title': 'A title'}]
+
+    result = hep2marc.do(result)
+    assert result['245'] == {'a': 'A title'}
+
+
+def test_from_json():
+    snippet = {'preprint_date': '2001-01-01'}
+
+    result = hep2marc.do(snippet)
+    assert result['269'] == {'c': '2001-01-01'}
+
+
+def test_from_a_parameter(snippet):
+    result = hep.do(create_record(snippet))
+'''
+
+
+@pytest.fixture
+def test_module(tmp_path):
+    path = tmp_path / 'test_module.py'
+    path.write_text(TEST_MODULE)
+
+    return str(path)
+
+
+def test_extract_fixtures(test_module):
+    snippet = (
+        '<datafield tag="245" ind1=" " ind2=" ">'
+        '<subfield code="a">A title</subfield>'
+        '</datafield>'
+    )
+
+    expected = [
+        Fixture('test_module.py::test_round_trip[0]', ('hep',), snippet),
+        Fixture('test_module.py::test_round_trip[1]', ('hep', 'hep2marc'), snippet),
+        Fixture(
+            'test_module.py::test_from_json',
+            ('hep2marc',),
+            {'preprint_date': '2001-01-01'},
+        ),
+    ]
+    result = extract_fixtures(test_module)
+
+    assert expected == result
+
+
+def test_extract_fixtures_of_hep_tests():
+    path = os.path.join(os.path.dirname(__file__), 'test_hep_bd1xx.py')
+    fixtures = extract_fixtures(path)
+    models = {fixture.models for fixture in fixtures}
+
+    assert models == {('hep',), ('hep', 'hep2marc')}
+    assert len(fixtures) >= 30
+
+
+def test_record_calls_of_the_last_model_only(test_module):
+    fixture = extract_fixtures(test_module)[1]
+    result = record_calls(fixture)
+
+    assert ('rules', '246') in result
+    assert ('filters', 'clean_marc') in result
+    assert ('rules', 'titles') not in result
+
+
+def test_record_calls_of_a_failing_conversion():
+    fixture = Fixture('test', ('hep',), '<controlfield tag="001">foo</controlfield>')
+    result = record_calls(fixture)
+
+    assert ('rules', 'control_number') in result
+    assert ('filters', '_clean_record') not in result
+
+
+def test_time_calls_copies_the_arguments():
+    values = []
+
+    def append(value):
+        value.append(1)
+        values.append(len(value))
+
+    result = time_calls([(append, ([],))], warmup=2, repeat=3, number=4)
+
+    assert len(result) == 3
+    assert all(seconds >= 0 for seconds in result)
+    assert values == [1] * 14
+
+
+def test_run_benchmarks(test_module):
+    fixtures = extract_fixtures(test_module)
+    result = run_benchmarks(fixtures, warmup=0, repeat=2, number=1, models=['hep'])
+
+    assert {(benchmark.kind, benchmark.name) for benchmark in result} >= {
+        ('rules', 'titles'),
+        ('filters', '_clean_record'),
+    }
+    assert {benchmark.model for benchmark in result} == {'hep'}
+    assert all(len(benchmark.seconds) == 2 for benchmark in result)
+
+
+def test_make_report_sums_the_fixtures():
+    results = [
+        BenchmarkResult('hep', 'rules', 'titles', 'test_a', 1, [1.0, 2.0, 3.0]),
+        BenchmarkResult('hep', 'rules', 'titles', 'test_b', 2, [2.0, 2.0, 2.0]),
+    ]
+
+    expected = {
+        'calls': 3,
+        'fixtures': 2,
+        'min': 3.0,
+        'median': 4.0,
+        'mean': 4.0,
+    }
+    result = make_report(results, repeat=3)
+
+    assert expected == result['rules']['hep']['titles']
+    assert result['fixtures']['hep']['rules']['titles']['test_a']['stdev'] == 1.0
+    assert result['settings'] == {'repeat': 3}
+
+
+def test_compare_reports():
+    before = {
+        'rules': {
+            'hep': {
+                'titles': {'min': 1e-5},
+                'dois': {'min': 1e-5},
+                'isbns': {'min': 1e-5},
+                'noise': {'min': 1e-8},
+            }
+        }
+    }
+    after = {
+        'rules': {
+            'hep': {
+                'titles': {'min': 2e-5},
+                'dois': {'min': 1.1e-5},
+                'isbns': {'min': 0.5e-5},
+                'noise': {'min': 1e-7},
+                'new': {'min': 1e-5},
+            }
+        }
+    }
+
+    expected = [
+        ('rules', 'hep', 'titles', 1e-5, 2e-5),
+        ('rules', 'hep', 'isbns', 1e-5, 0.5e-5),
+    ]
+    result = compare_reports(before, after)
+
+    assert expected == result
+
+
+def test_main(test_module, tmp_path, capsys):
+    before = tmp_path / 'before.json'
+    before.write_text(
+        json.dumps({'rules': {'hep2marc': {'269': {'min': 1.0, 'median': 1.0}}}})
+    )
+    output = tmp_path / 'after.json'
+
+    result = main(
+        [
+            test_module,
+            '--warmup',
+            '0',
+            '--repeat',
+            '1',
+            '--number',
+            '1',
+            '-o',
+            str(output),
+            '--compare',
+            str(before),
+        ]
+    )
+    _, err = capsys.readouterr()
+    report = json.loads(output.read_text())
+
+    assert result == 0
+    assert report['settings'] == {'number': 1, 'repeat': 1, 'warmup': 0}
+    assert set(report['rules']) == {'hep', 'hep2marc'}
+    assert 'test_module.py::test_from_json' in (
+        report['fixtures']['hep2marc']['rules']['269']
+    )
+    assert 'hep2marc rule "269"' in err
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+from __future__ import absolute_import, division, print_function
+
+import pickle
+
+import pytest
+from dojson.contrib.marc21.utils import create_record
+from inspire_utils.helpers import force_list
+from inspire_utils.record import get_value
+
+from inspire_dojson.api import cds_marcxml2record, marcxml2record
+from inspire_dojson.compact import CompactRecord, create_compact_record
+
+RECORD = (  # synthetic data
+    '<record>'
+    '  <controlfield tag="001">4328</controlfield>'
+    '  <controlfield tag="005"></controlfield>'
+    '  <datafield tag="100" ind1=" " ind2=" ">'
+    '    <subfield code="a">Smith, J.</subfield>'
+    '    <subfield code="u">CERN</subfield>'
+    '    <subfield code="u">DESY</subfield>'
+    '    <subfield code="v"></subfield>'
+    '  </datafield>'
+    '  <datafield tag="245" ind1="#" ind2="">'
+    '    <subfield code="A">A title</subfield>'
+    '  </datafield>'
+    '  <datafield tag="700" ind1=" " ind2=" ">'
+    '    <subfield code="a">Doe, J.</subfield>'
+    '  </datafield>'
+    '  <datafield tag="700" ind1=" " ind2=" ">'
+    '    <subfield code="a">Roe, R.</subfield>'
+    '  </datafield>'
+    '  <datafield tag="999" ind1="C" ind2="5">'
+    '    <subfield code="0">1</subfield>'
+    '  </datafield>'
+    '  <datafield tag="980" ind1=" " ind2=" ">'
+    '    <subfield code="a">HEP</subfield>'
+    '  </datafield>'
+    '</record>'
+)
+
+
+def test_create_compact_record_matches_create_record():
+    expected = create_record(RECORD, keep_singletons=False)
+    result = create_compact_record(RECORD)
+
+    assert expected.keys(repeated=True) == result.keys(repeated=True)
+    for key in result:
+        assert list(force_list(expected[key])) == list(force_list(result[key]))
+
+
+def test_compact_field_access():
+    record = create_compact_record(RECORD)
+    author = record['100__']
+
+    assert author.get('a') == 'Smith, J.'
+    assert author.get('u') == ('CERN', 'DESY')
+    assert author.get('v') is None
+    assert author.get('v', 'default') == 'default'
+    assert 'v' not in author
+    assert author.keys() == ['a', 'u']
+    assert list(author.iteritems(repeated=True)) == [
+        ('a', 'Smith, J.'),
+        ('u', 'CERN'),
+        ('u', 'DESY'),
+    ]
+    assert record['245__'].get('a') == 'A title'
+    assert len(record.get('700__')) == 2
+
+
+def test_compact_record_works_with_get_value():
+    record = create_compact_record(RECORD)
+
+    assert get_value(record, '980__.a') == 'HEP'
+
+
+def test_compact_record_is_immutable():
+    record = create_compact_record(RECORD)
+
+    with pytest.raises(TypeError, match='does not support item assignment'):
+        record['001'] = '1'
+
+
+def test_compact_record_can_be_pickled():
+    record = create_compact_record(RECORD)
+
+    assert pickle.loads(pickle.dumps(record)) == record
+
+
+def test_compact_record_from_dict():
+    record = CompactRecord.from_dict({'001': '1', '700__': [{'a': 'A'}, {'a': 'B'}]})
+
+    assert record.keys(repeated=True) == ['001', '700__', '700__']
+
+
+def test_marcxml2record_compact_matches_default():
+    assert marcxml2record(RECORD, compact=True) == marcxml2record(RECORD)
+
+
+def test_cds_marcxml2record_compact_matches_default():
+    snippet = (  # synthetic data
+        '<record>'
+        '  <controlfield tag="001">2270264</controlfield>'
+        '  <datafield tag="245" ind1=" " ind2=" ">'
+        '    <subfield code="a">A title</subfield>'
+        '  </datafield>'
+        '  <datafield tag="700" ind1=" " ind2=" ">'
+        '    <subfield code="a">Doe, J.</subfield>'
+        '  </datafield>'
+        '</record>'
+    )
+
+    assert cds_marcxml2record(snippet, compact=True) == cds_marcxml2record(snippet)
+
+
+def test_compact_record_takes_less_memory():
+    tracemalloc = pytest.importorskip('tracemalloc')
+    marcxml = '<record>{}</record>'.format(
+        ''.join(
+            '<datafield tag="700" ind1=" " ind2=" ">'
+            '  <subfield code="a">Author, {}</subfield>'
+            '  <subfield code="u">CERN</subfield>'
+            '</datafield>'.format(i)
+            for i in range(1000)
+        )
+    )
+
+    def _allocated(parse):
+        tracemalloc.start()
+        try:
+            record = parse()
+            return tracemalloc.get_traced_memory()[0], record
+        finally:
+            tracemalloc.stop()
+
+    default, _ = _allocated(lambda: create_record(marcxml, keep_singletons=False))
+    compact, _ = _allocated(lambda: create_compact_record(marcxml))
+
+    assert compact < default / 2
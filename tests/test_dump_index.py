@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+from __future__ import absolute_import, division, print_function
+
+import json
+
+import pytest
+
+from inspire_dojson.dump_index import MarcXmlDumpReader, build_index, main
+
+DUMP = (  # synthetic data
+    u'<?xml version="1.0" encoding="UTF-8"?>\n'
+    u'<collection xmlns="http://www.loc.gov/MARC21/slim">\n'
+    u'<record>'
+    u'  <controlfield tag="001">20</controlfield>'
+    u'  <datafield tag="245" ind1=" " ind2=" ">'
+    u'    <subfield code="a">Twenty</subfield>'
+    u'  </datafield>'
+    u'  <datafield tag="980" ind1=" " ind2=" ">'
+    u'    <subfield code="a">HEP</subfield>'
+    u'  </datafield>'
+    u'</record>\n'
+    u'<record>'
+    u'  <datafield tag="245" ind1=" " ind2=" ">'
+    u'    <subfield code="a">No control number</subfield>'
+    u'  </datafield>'
+    u'</record>\n'
+    u'<record>'
+    u'  <controlfield tag="001">3</controlfield>'
+    u'  <datafield tag="100" ind1=" " ind2=" ">'
+    u'    <subfield code="a">Ellis, John Richard</subfield>'
+    u'  </datafield>'
+    u'  <datafield tag="980" ind1=" " ind2=" ">'
+    u'    <subfield code="a">HEPNAMES</subfield>'
+    u'  </datafield>'
+    u'</record>\n'
+    u'<record>'
+    u'  <controlfield tag="001">111</controlfield>'
+    u'  <datafield tag="245" ind1=" " ind2=" ">'
+    u'    <subfield code="a">Ünïcödé</subfield>'
+    u'  </datafield>'
+    u'</record>\n'
+    u'</collection>\n'
+)
+
+
+@pytest.fixture()
+def dump_paths(tmpdir):
+    dump = tmpdir.join('dump.xml')
+    dump.write_binary(DUMP.encode('utf-8'))
+    index = tmpdir.join('dump.idx')
+    build_index(str(dump), str(index))
+
+    return str(dump), str(index)
+
+
+def test_build_index_skips_records_without_control_number(tmpdir):
+    dump = tmpdir.join('dump.xml')
+    dump.write_binary(DUMP.encode('utf-8'))
+
+    expected = 3
+    result = build_index(str(dump), str(tmpdir.join('dump.idx')))
+
+    assert expected == result
+
+
+def test_dump_reader_lists_recids_in_order(dump_paths):
+    with MarcXmlDumpReader(*dump_paths) as reader:
+        assert len(reader) == 3
+        assert list(reader.recids()) == [3, 20, 111]
+        assert 20 in reader
+        assert 21 not in reader
+
+
+def test_dump_reader_get_marcxml(dump_paths):
+    with MarcXmlDumpReader(*dump_paths) as reader:
+        result = reader.get_marcxml(111)
+
+    assert result.startswith(b'<record>')
+    assert result.endswith(b'</record>')
+    assert u'Ünïcödé'.encode('utf-8') in result
+
+
+def test_dump_reader_get_record(dump_paths):
+    with MarcXmlDumpReader(*dump_paths) as reader:
+        result = reader.get_record(3)
+
+    assert result['$schema'] == 'authors.json'
+    assert result['control_number'] == 3
+
+
+def test_dump_reader_raises_on_missing_recid(dump_paths):
+    with MarcXmlDumpReader(*dump_paths) as reader, pytest.raises(KeyError):
+        reader.get_marcxml(4)
+
+
+def test_dump_reader_iter_records_skips_missing_recids(dump_paths):
+    with MarcXmlDumpReader(*dump_paths) as reader:
+        result = dict(reader.iter_records([111, 20, 42]))
+
+    assert sorted(result) == [20, 111]
+    assert result[20]['titles'] == [{'title': 'Twenty'}]
+    assert result[111]['titles'] == [{'title': u'Ünïcödé'}]
+
+
+def test_dump_reader_rejects_invalid_index(tmpdir):
+    dump = tmpdir.join('dump.xml')
+    dump.write_binary(DUMP.encode('utf-8'))
+    index = tmpdir.join('dump.idx')
+    index.write_binary(b'not an index at all')
+
+    with pytest.raises(ValueError, match='not a valid dump index'):
+        MarcXmlDumpReader(str(dump), str(index))
+
+
+def test_main_builds_and_converts(tmpdir, capsys):
+    dump = tmpdir.join('dump.xml')
+    dump.write_binary(DUMP.encode('utf-8'))
+    index = tmpdir.join('dump.idx')
+
+    assert main(['build', str(dump), str(index)]) == 0
+    assert 'Indexed 3 records' in capsys.readouterr().out
+
+    assert main(['convert', str(dump), str(index), '20']) == 0
+    result = json.loads(capsys.readouterr().out)
+
+    assert result['control_number'] == 20
+
+
+def test_dump_reader_declares_the_namespace_of_prefixed_records(tmpdir):
+    dump = tmpdir.join('dump.xml')
+    dump.write_binary(
+        b'<?xml version="1.0" encoding="UTF-8"?>\n'
+        b'<marc:collection xmlns:marc="http://www.loc.gov/MARC21/slim">\n'
+        b'<marc:record>'
+        b'  <marc:controlfield tag="001">1</marc:controlfield>'
+        b'  <marc:datafield tag="245" ind1=" " ind2=" ">'
+        b'    <marc:subfield code="a">Prefixed</marc:subfield>'
+        b'  </marc:datafield>'
+        b'  <marc:datafield tag="980" ind1=" " ind2=" ">'
+        b'    <marc:subfield code="a">HEP</marc:subfield>'
+        b'  </marc:datafield>'
+        b'</marc:record>\n'
+        b'</marc:collection>\n'
+    )
+    index = tmpdir.join('dump.idx')
+    build_index(str(dump), str(index))
+
+    with MarcXmlDumpReader(str(dump), str(index)) as reader:
+        marcxml = reader.get_marcxml(1)
+        record = reader.get_record(1)
+
+    assert marcxml.startswith(
+        b'<marc:record xmlns:marc="http://www.loc.gov/MARC21/slim">'
+    )
+    assert record['titles'] == [{'title': 'Prefixed'}]
+
+
+def test_build_index_skips_self_closing_records(tmpdir):
+    dump = tmpdir.join('dump.xml')
+    dump.write_binary(
+        b'<collection>\n'
+        b'<record/>\n'
+        b'<record>'
+        b'  <controlfield tag="001">1</controlfield>'
+        b'  <datafield tag="245" ind1=" " ind2=" ">'
+        b'    <subfield code="a">After an empty record</subfield>'
+        b'  </datafield>'
+        b'  <datafield tag="980" ind1=" " ind2=" ">'
+        b'    <subfield code="a">HEP</subfield>'
+        b'  </datafield>'
+        b'</record>\n'
+        b'</collection>\n'
+    )
+    index = tmpdir.join('dump.idx')
+
+    assert build_index(str(dump), str(index)) == 1
+
+    with MarcXmlDumpReader(str(dump), str(index)) as reader:
+        marcxml = reader.get_marcxml(1)
+        record = reader.get_record(1)
+
+    assert marcxml.startswith(b'<record>')
+    assert record['titles'] == [{'title': 'After an empty record'}]
+
+
+def test_build_index_of_an_empty_dump(tmpdir):
+    dump = tmpdir.join('dump.xml')
+    dump.write_binary(b'')
+    index = tmpdir.join('dump.idx')
+
+    assert build_index(str(dump), str(index)) == 0
+
+    with MarcXmlDumpReader(str(dump), str(index)) as reader:
+        assert len(reader) == 0
+        assert 1 not in reader
+
+
+def test_dump_reader_rejects_an_empty_index(tmpdir):
+    dump = tmpdir.join('dump.xml')
+    dump.write_binary(DUMP.encode('utf-8'))
+    index = tmpdir.join('dump.idx')
+    index.write_binary(b'')
+
+    with pytest.raises(ValueError, match='not a valid dump index'):
+        MarcXmlDumpReader(str(dump), str(index))
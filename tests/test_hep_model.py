@@ -92,3 +92,22 @@ def test_set_citeable_when_citeable():
 
     assert validate(result['citeable'], subschema) is None
     assert expected == result['citeable']
+
+
+def test_ensure_unique_documents_and_figures_with_many_duplicates():
+    snippet = '<record>{}</record>'.format(  # synthetic data
+        ''.join(
+            '<datafield tag="FFT" ind1=" " ind2=" ">'
+            '  <subfield code="a">http://example.org/fig{}.png</subfield>'
+            '  <subfield code="d">{:05d} Caption</subfield>'
+            '  <subfield code="f">.png</subfield>'
+            '  <subfield code="n">fig{}</subfield>'
+            '</datafield>'.format(i, i, i % 2)
+            for i in range(5)
+        )
+    )
+
+    expected = ['fig0.png', 'fig1.png', '2_fig0.png', '3_fig1.png', '4_fig0.png']
+    result = hep.do(create_record(snippet))
+
+    assert expected == [figure['key'] for figure in result['figures']]
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+from __future__ import absolute_import, division, print_function
+
+import pytest
+from dojson.contrib.marc21.utils import create_record
+
+from inspire_dojson.api import marcxml2record
+from inspire_dojson.errors import ReconversionMismatchError
+from inspire_dojson.incremental import get_changed_keys, reconvert
+
+FIELDS = [  # synthetic data
+    '<controlfield tag="001">4328</controlfield>',
+    '<datafield tag="037" ind1=" " ind2=" ">'
+    '  <subfield code="9">arXiv</subfield>'
+    '  <subfield code="a">arXiv:1703.04802</subfield>'
+    '  <subfield code="c">hep-ph</subfield>'
+    '</datafield>',
+    '<datafield tag="100" ind1=" " ind2=" ">'
+    '  <subfield code="a">Smith, J.</subfield>'
+    '  <subfield code="u">CERN</subfield>'
+    '</datafield>',
+    '<datafield tag="245" ind1=" " ind2=" ">'
+    '  <subfield code="a">A title</subfield>'
+    '</datafield>',
+    '<datafield tag="500" ind1=" " ind2=" ">'
+    '  <subfield code="a">* Brief entry *</subfield>'
+    '</datafield>',
+    '<datafield tag="502" ind1=" " ind2=" ">'
+    '  <subfield code="b">PhD</subfield>'
+    '  <subfield code="c">CERN</subfield>'
+    '</datafield>',
+    '<datafield tag="520" ind1=" " ind2=" ">'
+    '  <subfield code="9">arXiv</subfield>'
+    '  <subfield code="a">An abstract</subfield>'
+    '</datafield>',
+    '<datafield tag="520" ind1=" " ind2=" ">'
+    '  <subfield code="a">Another abstract</subfield>'
+    '</datafield>',
+    '<datafield tag="650" ind1="1" ind2="7">'
+    '  <subfield code="2">arXiv</subfield>'
+    '  <subfield code="a">hep-th</subfield>'
+    '</datafield>',
+    '<datafield tag="700" ind1=" " ind2=" ">'
+    '  <subfield code="a">Doe, J.</subfield>'
+    '</datafield>',
+    '<datafield tag="773" ind1=" " ind2=" ">'
+    '  <subfield code="p">Phys.Rev.</subfield>'
+    '</datafield>',
+    '<datafield tag="999" ind1="C" ind2="5">'
+    '  <subfield code="0">1</subfield>'
+    '  <subfield code="s">Phys.Rev.,D94,054021</subfield>'
+    '</datafield>',
+    '<datafield tag="980" ind1=" " ind2=" ">'
+    '  <subfield code="a">HEP</subfield>'
+    '</datafield>',
+]
+
+
+def _marcxml(fields):
+    return u'<record>{}</record>'.format(u''.join(fields))
+
+
+@pytest.fixture(scope='module')
+def previous():
+    marcxml = _marcxml(FIELDS)
+    return create_record(marcxml, keep_singletons=False), marcxml2record(marcxml)
+
+
+def test_get_changed_keys():
+    previous_marcjson = create_record(_marcxml(FIELDS), keep_singletons=False)
+    fields = FIELDS[:4] + FIELDS[5:] + FIELDS[4:5]
+    marcjson = create_record(_marcxml(fields), keep_singletons=False)
+
+    assert get_changed_keys(previous_marcjson, marcjson) is None
+    assert get_changed_keys(previous_marcjson, previous_marcjson) == set()
+
+
+def test_reconvert_only_reruns_affected_rules(previous):
+    reference = (
+        '<datafield tag="999" ind1="C" ind2="5">'
+        '  <subfield code="0">2</subfield>'
+        '</datafield>'
+    )
+    marcxml = _marcxml(FIELDS[:-1] + [reference] + FIELDS[-1:])
+
+    result = reconvert(previous[0], previous[1], marcxml, parity=True)
+
+    assert result.record == marcxml2record(marcxml)
+    assert result.plan.rules == {'references'}
+    assert [filter_.__name__ for filter_ in result.plan.filters] == ['_clean_record']
+
+
+def test_reconvert_reruns_filters_reading_the_blob(previous):
+    category = (
+        '<datafield tag="650" ind1="1" ind2="7">'
+        '  <subfield code="2">arXiv</subfield>'
+        '  <subfield code="a">hep-ex</subfield>'
+        '</datafield>'
+    )
+    marcxml = _marcxml(FIELDS + [category])
+
+    result = reconvert(previous[0], previous[1], marcxml, parity=True)
+
+    assert result.record['arxiv_eprints'][0]['categories'] == [
+        'hep-ph',
+        'hep-th',
+        'hep-ex',
+    ]
+    assert 'arxiv_eprints' in result.plan.rules
+
+
+def test_reconvert_follows_dependencies_between_filters(previous):
+    publication_info = (
+        '<datafield tag="773" ind1=" " ind2=" ">'
+        '  <subfield code="p">Phys.Rev.</subfield>'
+        '  <subfield code="v">D94</subfield>'
+        '  <subfield code="c">054021</subfield>'
+        '  <subfield code="y">2016</subfield>'
+        '</datafield>'
+    )
+    marcxml = _marcxml(FIELDS[:10] + [publication_info] + FIELDS[11:])
+
+    result = reconvert(previous[0], previous[1], marcxml, parity=True)
+
+    assert result.record['citeable'] is True
+    assert 'public_notes' not in result.record
+    assert {'publication_info', 'public_notes', 'thesis_info'} <= result.plan.rules
+
+
+@pytest.mark.parametrize('index', range(len(FIELDS) - 1))
+def test_reconvert_matches_full_conversion_without_each_field(previous, index):
+    marcxml = _marcxml(FIELDS[:index] + FIELDS[index + 1 :])
+
+    result = reconvert(previous[0], previous[1], marcxml, parity=True)
+
+    assert result.record == marcxml2record(marcxml)
+
+
+def test_reconvert_converts_fully_when_collection_changes(previous):
+    marcxml = _marcxml(
+        FIELDS[:-1]
+        + [
+            '<datafield tag="980" ind1=" " ind2=" ">'
+            '  <subfield code="a">CONFERENCES</subfield>'
+            '</datafield>'
+        ]
+    )
+
+    result = reconvert(previous[0], previous[1], marcxml)
+
+    assert result.plan is None
+    assert result.record == marcxml2record(marcxml)
+
+
+def test_reconvert_parity_detects_stale_previous_record(previous):
+    stale = dict(previous[1], titles=[{'title': 'Stale'}])
+    marcxml = _marcxml(FIELDS[:-2] + FIELDS[-1:])
+
+    with pytest.raises(ReconversionMismatchError) as exc:
+        reconvert(previous[0], stale, marcxml, parity=True)
+
+    assert exc.value.keys == {'titles'}
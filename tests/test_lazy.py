@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+from __future__ import absolute_import, division, print_function
+
+import pytest
+
+from inspire_dojson.api import marcxml2record
+from inspire_dojson.errors import NotSupportedError
+from inspire_dojson.lazy import lazy_marcxml2record
+
+RECORD = (  # synthetic data
+    '<record>'
+    '  <controlfield tag="001">4328</controlfield>'
+    '  <datafield tag="037" ind1=" " ind2=" ">'
+    '    <subfield code="9">arXiv</subfield>'
+    '    <subfield code="a">arXiv:1703.04802</subfield>'
+    '    <subfield code="c">hep-ph</subfield>'
+    '  </datafield>'
+    '  <datafield tag="100" ind1=" " ind2=" ">'
+    '    <subfield code="a">Smith, J.</subfield>'
+    '  </datafield>'
+    '  <datafield tag="245" ind1=" " ind2=" ">'
+    '    <subfield code="a">A title</subfield>'
+    '  </datafield>'
+    '  <datafield tag="500" ind1=" " ind2=" ">'
+    '    <subfield code="a">A note</subfield>'
+    '  </datafield>'
+    '  <datafield tag="650" ind1="1" ind2="7">'
+    '    <subfield code="2">arXiv</subfield>'
+    '    <subfield code="a">hep-th</subfield>'
+    '  </datafield>'
+    '  <datafield tag="700" ind1=" " ind2=" ">'
+    '    <subfield code="a">Doe, J.</subfield>'
+    '  </datafield>'
+    '  <datafield tag="773" ind1=" " ind2=" ">'
+    '    <subfield code="p">Phys.Rev.</subfield>'
+    '  </datafield>'
+    '  <datafield tag="999" ind1="C" ind2="5">'
+    '    <subfield code="0">1</subfield>'
+    '  </datafield>'
+    '  <datafield tag="980" ind1=" " ind2=" ">'
+    '    <subfield code="a">HEP</subfield>'
+    '  </datafield>'
+    '</record>'
+)
+
+
+@pytest.mark.parametrize(
+    'key',
+    [
+        '$schema',
+        '_collections',
+        'arxiv_eprints',
+        'authors',
+        'control_number',
+        'curated',
+        'document_type',
+        'public_notes',
+        'references',
+        'self',
+        'titles',
+    ],
+)
+def test_lazy_record_converts_each_key_like_marcxml2record(key):
+    record = lazy_marcxml2record(RECORD)
+
+    assert record[key] == marcxml2record(RECORD)[key]
+
+
+def test_lazy_record_only_converts_what_is_needed():
+    record = lazy_marcxml2record(RECORD)
+
+    assert record['titles'] == [{'title': 'A title'}]
+    assert 'references' not in record._values
+
+
+def test_lazy_record_merges_authors():
+    record = lazy_marcxml2record(RECORD)
+
+    assert [author['full_name'] for author in record['authors']] == [
+        'Smith, J.',
+        'Doe, J.',
+    ]
+    assert 'authors_second' not in record
+
+
+def test_lazy_record_moves_incomplete_publication_infos():
+    record = lazy_marcxml2record(RECORD)
+
+    assert record['public_notes'] == [
+        {'value': 'A note'},
+        {'value': 'Submitted to Phys.Rev.'},
+    ]
+    assert 'publication_info' not in record
+
+
+def test_lazy_record_materialize_matches_marcxml2record():
+    record = lazy_marcxml2record(RECORD)
+    record['arxiv_eprints']
+
+    expected = marcxml2record(RECORD)
+
+    assert record.materialize() == expected
+    assert dict(record) == expected
+    assert len(record) == len(expected)
+
+
+def test_lazy_marcxml2record_raises_on_jobs():
+    snippet = (  # synthetic data
+        '<record>'
+        '  <datafield tag="980" ind1=" " ind2=" ">'
+        '    <subfield code="a">JOB</subfield>'
+        '  </datafield>'
+        '</record>'
+    )
+
+    with pytest.raises(NotSupportedError):
+        lazy_marcxml2record(snippet)
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+from __future__ import absolute_import, division, print_function
+
+import pytest
+from mock import patch
+
+from inspire_dojson.api import marcxml2record
+from inspire_dojson.batch import marcxml2records
+from inspire_dojson.errors import LimitExceededError
+from inspire_dojson.limits import (
+    MAX_FIELDS,
+    MAX_SUBFIELD_LENGTH,
+    TIME_BUDGET,
+    ConversionLimits,
+    get_limit_counters,
+    reset_limit_counters,
+)
+
+RECORD = (  # synthetic data
+    '<record>'
+    '  <controlfield tag="001">1</controlfield>'
+    '  <datafield tag="520" ind1=" " ind2=" ">'
+    '    <subfield code="a">A rather short abstract.</subfield>'
+    '  </datafield>'
+    '  <datafield tag="650" ind1="1" ind2="7">'
+    '    <subfield code="2">arXiv</subfield>'
+    '    <subfield code="a">hep-ph</subfield>'
+    '  </datafield>'
+    '  <datafield tag="980" ind1=" " ind2=" ">'
+    '    <subfield code="a">HEP</subfield>'
+    '  </datafield>'
+    '</record>'
+)
+
+
+@pytest.fixture(autouse=True)
+def _reset_counters():
+    reset_limit_counters()
+    yield
+    reset_limit_counters()
+
+
+def test_marcxml2record_without_limits():
+    assert marcxml2record(RECORD) == marcxml2record(RECORD, limits=ConversionLimits())
+
+
+def test_marcxml2record_within_limits():
+    limits = ConversionLimits(max_fields=4, max_subfield_length=24, time_budget=60)
+
+    result = marcxml2record(RECORD, limits=limits)
+
+    assert result['control_number'] == 1
+    assert get_limit_counters() == {}
+
+
+def test_marcxml2record_max_fields():
+    limits = ConversionLimits(max_fields=3)
+
+    with pytest.raises(LimitExceededError) as exc:
+        marcxml2record(RECORD, limits=limits)
+
+    assert exc.value.limit == MAX_FIELDS
+    assert 'Record has 4 fields' in str(exc.value)
+    assert get_limit_counters() == {MAX_FIELDS: 1}
+
+
+def test_marcxml2record_max_subfield_length():
+    limits = ConversionLimits(max_subfield_length=23)
+
+    with pytest.raises(LimitExceededError) as exc:
+        marcxml2record(RECORD, limits=limits)
+
+    assert exc.value.limit == MAX_SUBFIELD_LENGTH
+    assert 'Subfield "520__a" has 24 characters' in str(exc.value)
+    assert get_limit_counters() == {MAX_SUBFIELD_LENGTH: 1}
+
+
+@patch('inspire_dojson.limits.time.time')
+def test_marcxml2record_time_budget(mock_time):
+    mock_time.side_effect = [0, 0, 100]
+    limits = ConversionLimits(time_budget=10)
+
+    with pytest.raises(LimitExceededError) as exc:
+        marcxml2record(RECORD, limits=limits)
+
+    assert exc.value.limit == TIME_BUDGET
+    assert get_limit_counters() == {TIME_BUDGET: 1}
+
+
+def test_marcxml2records_turns_over_limit_records_into_errors():
+    limits = ConversionLimits(max_fields=3)
+    small_record = '<record><controlfield tag="001">2</controlfield></record>'
+
+    result = list(marcxml2records([RECORD, small_record], limits=limits))
+
+    assert result[0].record is None
+    assert result[0].error.limit == MAX_FIELDS
+    assert result[1].record['control_number'] == 2
+    assert result[1].error is None
@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+from __future__ import absolute_import, division, print_function
+
+import io
+
+import pytest
+
+from inspire_dojson.api import cds_marcxml2record, marcxml2record, record2marcxml
+from inspire_dojson.batch import JsonLinesDeadLetterSink, marcxml2records
+from inspire_dojson.errors import DoJsonError
+from inspire_dojson.metrics import (
+    MetricsRegistry,
+    export_prometheus,
+    get_metrics,
+    reset_metrics,
+)
+
+RECORD = (  # synthetic data
+    '<record>'
+    '  <controlfield tag="001">1</controlfield>'
+    '  <datafield tag="245" ind1=" " ind2=" ">'
+    '    <subfield code="a">A title</subfield>'
+    '  </datafield>'
+    '  <datafield tag="980" ind1=" " ind2=" ">'
+    '    <subfield code="a">HEP</subfield>'
+    '  </datafield>'
+    '</record>'
+)
+
+BAD_RECORD = (  # synthetic data
+    '<record>'
+    '  <controlfield tag="001">2</controlfield>'
+    '  <datafield tag="269" ind1=" " ind2=" ">'
+    '    <subfield code="c">Ceci n’est pas une dâte</subfield>'
+    '  </datafield>'
+    '  <datafield tag="980" ind1=" " ind2=" ">'
+    '    <subfield code="a">HEP</subfield>'
+    '  </datafield>'
+    '</record>'
+)
+
+JOB_RECORD = (  # synthetic data
+    '<record>'
+    '  <controlfield tag="001">3</controlfield>'
+    '  <datafield tag="980" ind1=" " ind2=" ">'
+    '    <subfield code="a">JOB</subfield>'
+    '  </datafield>'
+    '</record>'
+)
+
+
+@pytest.fixture(autouse=True)
+def _reset_metrics():
+    reset_metrics()
+    yield
+    reset_metrics()
+
+
+def test_conversions_are_counted_by_function_and_collection():
+    record = marcxml2record(RECORD)
+    record2marcxml(record)
+    cds_marcxml2record(RECORD)
+
+    metrics = get_metrics()
+
+    assert metrics['conversions'] == 3
+    assert metrics['rate'] > 0
+    assert metrics['latencies']['marcxml2record']['hep']['count'] == 1
+    assert metrics['latencies']['record2marcxml']['hep']['count'] == 1
+    assert metrics['latencies']['cds_marcxml2record']['cds']['count'] == 1
+    assert metrics['filters']['_clean_record']['calls'] == 3
+    assert 'normalize_date' in metrics['caches']
+
+
+def test_errors_are_counted_by_rule():
+    with pytest.raises(DoJsonError):
+        marcxml2record(BAD_RECORD)
+
+    assert get_metrics()['errors'] == [
+        {
+            'function': 'marcxml2record',
+            'rule': 'preprint_date',
+            'error': 'DoJsonError',
+            'count': 1,
+        }
+    ]
+
+
+def test_batch_records_are_counted_by_status():
+    sink = JsonLinesDeadLetterSink(io.StringIO())
+
+    list(
+        marcxml2records(
+            [RECORD, BAD_RECORD, JOB_RECORD],
+            dead_letters=sink,
+            skip_failing_rules=True,
+        )
+    )
+
+    assert get_metrics()['batch_records'] == {
+        'converted': 1,
+        'partial': 1,
+        'failed': 1,
+    }
+
+
+def test_export_prometheus(tmpdir):
+    marcxml2record(RECORD)
+    path = str(tmpdir.join('inspire_dojson.prom'))
+
+    text = export_prometheus(path)
+
+    assert tmpdir.join('inspire_dojson.prom').read_text('utf-8') == text
+    assert (
+        'inspire_dojson_conversion_seconds_count'
+        '{collection="hep",function="marcxml2record"} 1\n'
+    ) in text
+    assert (
+        'inspire_dojson_conversion_seconds_bucket'
+        '{collection="hep",function="marcxml2record",le="+Inf"} 1\n'
+    ) in text
+    assert 'inspire_dojson_filter_seconds_count{filter="_clean_record"} 1\n' in text
+    assert '# TYPE inspire_dojson_cache_hits_total counter\n' in text
+
+
+def test_metrics_registry_histogram_buckets():
+    registry = MetricsRegistry(buckets=(0.1, 1))
+    for seconds in (0.05, 0.5, 0.5, 5):
+        registry.observe_conversion('marcxml2record', 'hep', seconds)
+
+    histogram = registry.snapshot()['latencies']['marcxml2record']['hep']
+
+    assert histogram == {'buckets': {0.1: 1, 1: 3}, 'sum': 6.05, 'count': 4}
+    assert 'le="1"} 3\n' in registry.to_prometheus()
+    assert 'le="+Inf"} 4\n' in registry.to_prometheus()
+
+
+def test_metrics_registry_drain_and_merge():
+    worker = MetricsRegistry(buckets=(0.1, 1))
+    worker.observe_conversion('marcxml2record', 'hep', 0.5)
+    worker.observe_filter('_clean_record', 0.25)
+    registry = MetricsRegistry(buckets=(0.1, 1))
+    registry.observe_conversion('marcxml2record', 'hep', 0.05)
+
+    registry.merge(worker.drain())
+
+    snapshot = registry.snapshot()
+    assert snapshot['latencies']['marcxml2record']['hep'] == {
+        'buckets': {0.1: 1, 1: 2},
+        'sum': 0.55,
+        'count': 2,
+    }
+    assert snapshot['filters'] == {'_clean_record': {'calls': 1, 'seconds': 0.25}}
+    assert worker.snapshot()['conversions'] == 0
@@ -23,9 +23,13 @@
 from __future__ import absolute_import, division, print_function
 
 import pytest
+from dojson import utils
+from dojson.contrib.marc21.utils import create_record
+from dojson.errors import IgnoreItem, IgnoreKey
 
 from inspire_dojson import DoJsonError, marcxml2record, record2marcxml
-from inspire_dojson.model import FilterOverdo, add_schema
+from inspire_dojson.hep import hep
+from inspire_dojson.model import FilterOverdo, add_schema, clean_record, depends_on
 
 
 def test_filteroverdo_works_without_filters():
@@ -72,3 +76,133 @@ def test_add_schema():
     result = model.do({})
 
     assert expected == result
+
+
+@depends_on(inputs=['a'], outputs=['b'], skip_if_absent=True)
+def copy_a_to_b(record, blob):
+    record['b'] = record['a']
+    return record
+
+
+@depends_on(inputs=['b'], outputs=['c'], skip_if_absent=True)
+def copy_b_to_c(record, blob):
+    record['c'] = record['b']
+    return record
+
+
+def test_filteroverdo_skips_filters_without_inputs():
+    model = FilterOverdo(
+        filters=[add_schema('hep.json'), copy_a_to_b, copy_b_to_c, clean_record()]
+    )
+
+    expected = {'$schema': 'hep.json'}
+    filters_run = []
+    result = model.do({}, filters_run=filters_run)
+
+    assert expected == result
+    assert filters_run == ['_add_schema', '_clean_record']
+
+
+def test_filteroverdo_runs_filters_whose_inputs_are_written_by_filters():
+    model = FilterOverdo(filters=[copy_a_to_b, copy_b_to_c])
+    model.over('a', '^a')(lambda self, key, value: value)
+
+    expected = {'a': 'foo', 'b': 'foo', 'c': 'foo'}
+    filters_run = []
+    result = model.do({'a': 'foo'}, filters_run=filters_run)
+
+    assert expected == result
+    assert filters_run == ['copy_a_to_b', 'copy_b_to_c']
+
+
+def test_filteroverdo_skips_hep_filters_of_a_small_record():
+    snippet = (  # synthetic data
+        '<record>'
+        '  <datafield tag="245" ind1=" " ind2=" ">'
+        '    <subfield code="a">A title</subfield>'
+        '  </datafield>'
+        '</record>'
+    )
+
+    expected = {
+        '$schema': 'hep.json',
+        'curated': True,
+        'document_type': ['article'],
+        'titles': [{'title': 'A title'}],
+    }
+    filters_run = []
+    result = hep.do(create_record(snippet), filters_run=filters_run)
+
+    assert expected == result
+    assert filters_run == [
+        '_add_schema',
+        'ensure_curated',
+        'ensure_document_type',
+        '_clean_record',
+    ]
+
+
+def _split(self, key, value):
+    if value == 'skip':
+        raise IgnoreItem
+    elif value == 'ignore':
+        raise IgnoreKey(key)
+    elif value == 'fail':
+        raise ValueError('failed', value)
+    return value.split()
+
+
+@pytest.mark.parametrize(
+    'decorators',
+    [
+        [utils.for_each_value],
+        [utils.flatten, utils.for_each_value],
+        [utils.flatten],
+        [utils.for_each_value, utils.filter_values],
+    ],
+)
+@pytest.mark.parametrize(
+    'value',
+    ['a b', ('a b', 'c'), ['a', 'skip', 'b c'], ('fail',), ['a', 'ignore']],
+)
+def test_filteroverdo_fused_decorators_behave_like_dojson(decorators, value):
+    def rule(self, key, value):
+        return _split(self, key, value)
+
+    for decorator in reversed(decorators):
+        rule = decorator(rule)
+
+    model = FilterOverdo()
+    model.over('result', '^key')(rule)
+
+    try:
+        expected = {'result': rule({}, 'key', value)}
+        if getattr(rule, '__extend__', False):
+            expected['result'] = list(expected['result'])
+    except IgnoreKey:
+        expected = {}
+    except Exception as exc:
+        expected = DoJsonError(
+            'Error in rule "result" for field "key"', exc.args, value
+        )
+
+    if isinstance(expected, DoJsonError):
+        with pytest.raises(DoJsonError) as excinfo:
+            model.do({'key': value})
+        assert expected.args == excinfo.value.args
+    else:
+        assert expected == model.do({'key': value})
+
+
+def test_filteroverdo_keeps_decorators_without_wrapped():
+    @utils.flatten
+    @utils.for_each_value
+    def rule(self, key, value):
+        return _split(self, key, value)
+
+    del rule.__wrapped__  # as with functools.wraps on Python 2
+
+    model = FilterOverdo()
+    model.over('result', '^key')(rule)
+
+    assert model.do({'key': ('a b', 'skip', 'c')}) == {'result': ['a', 'b', 'c']}
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+from __future__ import absolute_import, division, print_function
+
+import gc
+
+import pytest
+from langdetect import detector_factory
+
+from inspire_dojson import warmup
+from inspire_dojson.hep import hep, hep2marc
+from inspire_dojson.hepnames import hepnames
+
+
+def test_warmup_hep():
+    hep.index = hep2marc.index = None
+
+    result = warmup(collections=['hep'])
+
+    assert list(result) == [
+        'schemas',
+        'rule_indexes',
+        'dates',
+        'identifiers',
+        'langdetect',
+        'pycountry',
+    ]
+    assert all(seconds >= 0 for seconds in result.values())
+    assert hep.index is not None
+    assert hep2marc.index is not None
+    assert detector_factory._factory is not None
+
+
+def test_warmup_skips_hep_only_steps():
+    hepnames.index = None
+
+    result = warmup(collections=['hepnames'])
+
+    assert 'langdetect' not in result
+    assert hepnames.index is not None
+
+
+def test_warmup_defaults_to_all_collections():
+    try:
+        result = warmup(freeze=True)
+    finally:
+        gc.unfreeze()
+
+    assert 'langdetect' in result
+
+
+def test_warmup_rejects_unknown_collections():
+    with pytest.raises(ValueError, match='Unknown collections: jobs'):
+        warmup(collections=['hep', 'jobs'])
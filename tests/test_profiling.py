@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+from __future__ import absolute_import, division, print_function
+
+import tracemalloc
+
+import pytest
+
+from inspire_dojson.api import marcxml2record, record2marcxml
+from inspire_dojson.errors import NotSupportedError
+from inspire_dojson.profiling import MemoryProfiler, assert_allocation_budgets
+
+KB = 1024
+MB = 1024 * KB
+
+LARGE_RECORD = (  # synthetic data
+    '<record>'
+    '  <controlfield tag="001">1</controlfield>'
+    '  <datafield tag="245" ind1=" " ind2=" ">'
+    '    <subfield code="a">A title</subfield>'
+    '  </datafield>'
+    '{authors}{references}'
+    '  <datafield tag="980" ind1=" " ind2=" ">'
+    '    <subfield code="a">HEP</subfield>'
+    '  </datafield>'
+    '</record>'
+).format(
+    authors=''.join(
+        '<datafield tag="700" ind1=" " ind2=" ">'
+        '  <subfield code="a">Author, A{}.</subfield>'
+        '  <subfield code="u">CERN</subfield>'
+        '</datafield>'.format(i)
+        for i in range(300)
+    ),
+    references=''.join(
+        '<datafield tag="999" ind1="C" ind2="5">'
+        '  <subfield code="r">arXiv:1705.{:05d}</subfield>'
+        '  <subfield code="s">Phys.Rev.,D{},{}</subfield>'
+        '</datafield>'.format(i, i % 90 + 1, i)
+        for i in range(300)
+    ),
+)
+
+
+def test_memory_profiler_profiles_rules_and_filters():
+    profiler = MemoryProfiler()
+
+    record = profiler.run(marcxml2record, LARGE_RECORD)
+
+    assert record == marcxml2record(LARGE_RECORD)
+    profile = profiler.records[0]
+    assert profile.label == 'marcxml2record'
+    assert profile.peak >= profile.net > 0
+    assert profile.rules['authors_second'].calls == 300
+    assert profile.rules['references'].calls == 300
+    assert profile.filters['_clean_record'].calls == 1
+    assert profile.top_sites
+    assert not tracemalloc.is_tracing()
+
+
+def test_memory_profiler_records_failed_conversions():
+    profiler = MemoryProfiler(top=0)
+
+    with pytest.raises(NotSupportedError):
+        profiler.run(record2marcxml, {'$schema': 'http://localhost:5000/jobs.json'})
+
+    assert profiler.records[0].label == 'record2marcxml'
+    assert profiler.records[0].top_sites == []
+
+
+def test_large_record_stays_within_allocation_budgets():
+    profiler = MemoryProfiler(top=0)
+    record = profiler.run(marcxml2record, LARGE_RECORD)
+    profiler.run(record2marcxml, record)
+
+    conversion, reverse_conversion = profiler.records
+
+    assert_allocation_budgets(
+        conversion,
+        peak=16 * MB,
+        rules={'authors_second': 64 * KB, 'references': 64 * KB},
+        filters={'_clean_record': 4 * MB},
+    )
+    assert_allocation_budgets(
+        reverse_conversion,
+        peak=8 * MB,
+        rules={'100': 2 * MB, '999C5': 4 * MB},
+        filters={'clean_marc': 2 * MB},
+    )
+
+
+def test_assert_allocation_budgets_lists_exceeded_budgets():
+    profiler = MemoryProfiler()
+    profiler.run(marcxml2record, LARGE_RECORD)
+
+    with pytest.raises(AssertionError) as excinfo:
+        assert_allocation_budgets(profiler.records[0], peak=1, rules={'references': 1})
+
+    message = str(excinfo.value)
+    assert 'peak:' in message
+    assert 'rules "references":' in message
+    assert 'Top allocation sites:' in message
+
+
+def test_memory_profiler_needs_tracemalloc(monkeypatch):
+    monkeypatch.setattr('inspire_dojson.profiling.tracemalloc', None)
+
+    with pytest.raises(NotSupportedError):
+        MemoryProfiler()
+
+    assert marcxml2record(LARGE_RECORD)['control_number'] == 1
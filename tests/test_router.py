@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+from __future__ import absolute_import, division, print_function
+
+import io
+
+import pytest
+from dojson.contrib.marc21.utils import create_record
+
+from inspire_dojson.api import COLLECTION_MODELS, marcxml2record
+from inspire_dojson.router import iter_routed_records, route_marcxml, split_dump
+
+DUMP = (  # synthetic data
+    b'<?xml version="1.0" encoding="UTF-8"?>\n'
+    b'<collection xmlns="http://www.loc.gov/MARC21/slim">\n'
+    b'<record>'
+    b'  <controlfield tag="001">1</controlfield>'
+    b'  <datafield tag="980" ind1=" " ind2=" ">'
+    b'    <subfield code="a">HEP</subfield>'
+    b'  </datafield>'
+    b'</record>\n'
+    b'<record>'
+    b'  <controlfield tag="001">2</controlfield>'
+    b'  <datafield tag="980" ind1=" " ind2=" ">'
+    b'    <subfield code="a">JOB</subfield>'
+    b'  </datafield>'
+    b'</record>\n'
+    b'<record>'
+    b'  <controlfield tag="001">3</controlfield>'
+    b'  <datafield tag="980" ind1=" " ind2=" ">'
+    b'    <subfield code="a">HEPNAMES</subfield>'
+    b'  </datafield>'
+    b'</record>\n'
+    b'<record>'
+    b'  <controlfield tag="001">4</controlfield>'
+    b'  <datafield tag="980" ind1=" " ind2=" ">'
+    b'    <subfield code="a">CORE</subfield>'
+    b'  </datafield>'
+    b'</record>\n'
+    b'</collection>\n'
+)
+
+
+@pytest.mark.parametrize(
+    ('collection', 'expected'),
+    [
+        ('CONFERENCES', 'conferences'),
+        ('DATA', 'data'),
+        ('EXPERIMENT', 'experiments'),
+        ('HEPNAMES', 'hepnames'),
+        ('INSTITUTION', 'institutions'),
+        ('JOURNALS', 'journals'),
+        ('JOURNALSNEW', 'journals'),
+        ('HALhidden', 'hep'),
+    ],
+)
+def test_route_marcxml_agrees_with_marcxml2record(collection, expected):
+    snippet = (
+        '<datafield tag="980" ind1=" " ind2=" ">'
+        '  <subfield code="a">{}</subfield>'
+        '</datafield>'
+    ).format(collection)
+
+    result = route_marcxml(snippet)
+
+    assert expected == result
+    assert marcxml2record(snippet) == COLLECTION_MODELS[result].do(
+        create_record(snippet, keep_singletons=False)
+    )
+
+
+def test_route_marcxml_handles_jobs():
+    snippet = (
+        '<datafield tag="980" ind1=" " ind2=" ">'
+        '  <subfield code="a">JOBHIDDEN</subfield>'
+        '</datafield>'
+    )
+
+    expected = 'jobs'
+    result = route_marcxml(snippet)
+
+    assert expected == result
+
+
+def test_route_marcxml_ignores_980_with_indicators():
+    snippet = (  # synthetic data
+        '<record>'
+        '  <datafield tag="980" ind1="1" ind2=" ">'
+        '    <subfield code="a">HEPNAMES</subfield>'
+        '  </datafield>'
+        '</record>'
+    )
+
+    expected = 'hep'
+    result = route_marcxml(snippet)
+
+    assert expected == result
+
+
+def test_iter_routed_records():
+    expected = ['hep', 'jobs', 'hepnames', 'hep']
+    result = [collection for collection, _ in iter_routed_records(io.BytesIO(DUMP))]
+
+    assert expected == result
+
+
+def test_iter_routed_records_yields_convertible_marcxml():
+    records = dict(iter_routed_records(io.BytesIO(DUMP)))
+
+    result = marcxml2record(records['hepnames'])
+
+    assert result['control_number'] == 3
+
+
+def test_split_dump(tmpdir):
+    expected = {'hep': 2, 'hepnames': 1, 'jobs': 1}
+    result = split_dump(io.BytesIO(DUMP), str(tmpdir))
+
+    assert expected == result
+    assert sorted(path.basename for path in tmpdir.listdir()) == [
+        'hep.xml',
+        'hepnames.xml',
+    ]
+    assert [
+        collection
+        for collection, _ in iter_routed_records(str(tmpdir.join('hep.xml')))
+    ] == ['hep', 'hep']
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+
+from __future__ import absolute_import, division, print_function
+
+import pytest
+from inspire_schemas import utils as schemas_utils
+
+from inspire_dojson.api import marcxml2record
+from inspire_dojson.scaling import (
+    ScalingResult,
+    assert_linear_scaling,
+    fit_exponent,
+    main,
+    make_record,
+    profile_scaling,
+)
+from inspire_dojson.utils.identifiers import is_arxiv_eprint, valid_arxiv_categories
+
+
+def test_make_record_repeats_every_field():
+    result = make_record(3)
+
+    assert result.count('<datafield tag="700"') == 3
+    assert result.count('<datafield tag="999" ind1="C" ind2="5">') == 3
+    assert result.count('<datafield tag="695"') == 3
+    assert result.count('<datafield tag="FFT"') == 6
+
+
+def test_make_record_with_some_fields():
+    result = make_record(3, ['keywords'])
+
+    assert result.count('<datafield tag="695"') == 3
+    assert '<datafield tag="700"' not in result
+
+
+@pytest.mark.parametrize('exponent', [0, 1, 2])
+def test_fit_exponent(exponent):
+    sizes = [10, 20, 40, 80]
+    seconds = [0.001 * size**exponent for size in sizes]
+
+    assert fit_exponent(sizes, seconds) == pytest.approx(exponent)
+
+
+def test_fit_exponent_needs_two_sizes():
+    assert fit_exponent([10], [0.1]) is None
+    assert fit_exponent([10, 20], [0.0, 0.1]) is None
+
+
+def test_profile_scaling_times_rules_filters_and_conversions():
+    result = profile_scaling(sizes=(5, 10), repeat=1)
+    names = {(scaling.kind, scaling.name) for scaling in result}
+
+    assert ('rules', 'references') in names
+    assert ('rules', 'authors_second') in names
+    assert ('filters', '_clean_record') in names
+    assert ('conversions', 'marcxml2record') in names
+    assert all(scaling.sizes == [5, 10] for scaling in result)
+
+
+@pytest.mark.benchmark
+def test_rules_and_filters_scale_linearly():
+    assert_linear_scaling(profile_scaling(sizes=(50, 100, 200, 400), repeat=5))
+
+
+def test_assert_linear_scaling_fails_on_superlinear_results():
+    results = [
+        ScalingResult('rules', 'quadratic', [10, 20], [0.01, 0.04], 2.0),
+        ScalingResult('rules', 'linear', [10, 20], [0.01, 0.02], 1.0),
+        ScalingResult('filters', 'negligible', [10, 20], [1e-6, 4e-6], 2.0),
+    ]
+
+    with pytest.raises(AssertionError) as excinfo:
+        assert_linear_scaling(results)
+
+    message = str(excinfo.value)
+    assert 'rules "quadratic"' in message
+    assert 'N=20 0.040000s' in message
+    assert 'linear' not in message.replace('Superlinear', '')
+    assert 'negligible' not in message
+
+
+def test_valid_arxiv_categories_does_not_grow():
+    first = valid_arxiv_categories()
+    second = valid_arxiv_categories()
+
+    assert first == second
+    assert first is not second
+    assert len(set(first)) == len(first)
+    assert schemas_utils.valid_arxiv_categories is not valid_arxiv_categories
+
+
+@pytest.mark.parametrize(
+    'value',
+    [
+        'arXiv:1707.05770',
+        'hep-th/9711200',
+        'math.fa/0101001',
+        'https://arXiv.org/abs/1707.05770',
+        'nonsense/9711200',
+        'doi:10.1016/0029-5582(61)90469-2',
+        '',
+    ],
+)
+def test_is_arxiv_eprint_matches_inspire_schemas(value):
+    assert is_arxiv_eprint(value) == schemas_utils.is_arxiv(value)
+
+
+def test_references_do_not_grow_the_arxiv_categories_of_inspire_schemas():
+    marcxml = make_record(5, ['references'])
+    marcxml2record(marcxml)
+    schema = schemas_utils.load_schema('elements/arxiv_categories')
+    before = len(schema['enum'])
+
+    marcxml2record(marcxml)
+
+    assert len(schema['enum']) == before
+
+
+def test_main(capsys):
+    result = main(['--sizes', '5', '10', '--repeat', '1', '--fields', 'keywords'])
+    out, _ = capsys.readouterr()
+
+    assert result == 0
+    assert 'rules "keywords"' in out
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+from __future__ import absolute_import, division, print_function
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from lxml import etree
+
+from inspire_dojson.api import cds_marcxml2record, marcxml2record, record2marcxml
+from inspire_dojson.service import CONVERSIONS, MicroBatcher, create_app
+
+CONFIG = {
+    'SERVER_NAME': 'localhost:5000',
+    'LEGACY_BASE_URL': 'http://inspirehep.net',
+}
+
+RECORD = (  # synthetic data
+    '<record>'
+    '  <controlfield tag="001">{}</controlfield>'
+    '  <datafield tag="245" ind1=" " ind2=" ">'
+    '    <subfield code="a">A title</subfield>'
+    '  </datafield>'
+    '  <datafield tag="980" ind1=" " ind2=" ">'
+    '    <subfield code="a">HEP</subfield>'
+    '  </datafield>'
+    '</record>'
+)
+
+BAD_RECORD = (  # synthetic data
+    '<record>'
+    '  <controlfield tag="001">2</controlfield>'
+    '  <datafield tag="269" ind1=" " ind2=" ">'
+    '    <subfield code="c">Ceci n’est pas une dâte</subfield>'
+    '  </datafield>'
+    '</record>'
+)
+
+
+@pytest.fixture(scope='module')
+def client():
+    app = create_app(CONFIG, max_workers=2, warm=False)
+    yield app.test_client()
+    app.extensions['inspire_dojson'].close()
+
+
+def test_marc2json(client):
+    response = client.post('/marc2json', data=RECORD.format(1))
+
+    assert response.status_code == 200
+    assert response.get_json() == marcxml2record(RECORD.format(1))
+
+
+def test_marc2json_batch(client):
+    collection = '<collection>{}{}</collection>'.format(RECORD.format(1), BAD_RECORD)
+
+    response = client.post('/marc2json', data=collection)
+
+    assert response.status_code == 200
+    first, second = response.get_json()
+    assert first == {'record': marcxml2record(RECORD.format(1))}
+    assert second['error']['error'] == 'DoJsonError'
+    assert second['error']['rule'] == 'preprint_date'
+
+
+def test_marc2json_parses_the_body_once(client, monkeypatch):
+    payloads = []
+
+    def convert(marcxml):
+        payloads.append(marcxml)
+        return marcxml2record(marcxml)
+
+    monkeypatch.setitem(CONVERSIONS, 'marc2json', convert)
+    collection = '<collection>{}{}</collection>'.format(
+        RECORD.format(1), RECORD.format(2)
+    )
+
+    response = client.post('/marc2json', data=collection)
+
+    assert [item['record']['control_number'] for item in response.get_json()] == [1, 2]
+    assert all(isinstance(payload, etree._Element) for payload in payloads)
+
+
+def test_marc2json_error(client):
+    response = client.post('/marc2json', data=BAD_RECORD)
+
+    assert response.status_code == 400
+    assert response.get_json()['rule'] == 'preprint_date'
+
+
+def test_marc2json_invalid_body(client):
+    response = client.post('/marc2json', data='<datafield/>')
+
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'BadRequest'
+
+
+def test_cds2json(client):
+    response = client.post('/cds2json', data=RECORD.format(1))
+
+    assert response.get_json() == cds_marcxml2record(RECORD.format(1))
+
+
+def test_json2marc(client):
+    record = marcxml2record(RECORD.format(1))
+
+    response = client.post('/json2marc', json=record)
+
+    assert response.status_code == 200
+    assert response.mimetype == 'application/xml'
+    assert response.data == record2marcxml(record)
+
+
+def test_json2marc_batch(client):
+    records = [marcxml2record(RECORD.format(recid)) for recid in (1, 2)]
+
+    response = client.post('/json2marc', json=records)
+
+    collection = etree.fromstring(response.data)
+    assert [
+        record.findtext('controlfield[@tag="001"]') for record in collection
+    ] == ['1', '2']
+
+
+def test_json2marc_batch_errors(client):
+    records = [marcxml2record(RECORD.format(1)), {'$schema': 'jobs.json'}]
+
+    response = client.post('/json2marc', json=records)
+
+    assert response.status_code == 400
+    assert response.get_json()['errors'] == [
+        {
+            'index': 1,
+            'error': 'NotSupportedError',
+            'message': 'JSON -> MARC rules missing for "jobs"',
+            'rule': None,
+        }
+    ]
+
+
+def test_metrics(client):
+    client.post('/marc2json', data=RECORD.format(1))
+
+    response = client.get('/metrics')
+
+    assert response.mimetype == 'text/plain'
+    assert b'inspire_dojson_conversion_seconds_count' in response.data
+
+
+def test_micro_batcher_groups_conversions():
+    class RecordingExecutor(ThreadPoolExecutor):
+        batch_sizes = []
+
+        def submit(self, fn, config, conversions, drain_metrics):
+            self.batch_sizes.append(len(conversions))
+            return super(RecordingExecutor, self).submit(
+                fn, config, conversions, drain_metrics
+            )
+
+    executor = RecordingExecutor(1)
+    batcher = MicroBatcher(executor, max_batch_size=4, max_wait=0.2)
+
+    futures = [
+        batcher.submit('marc2json', RECORD.format(recid)) for recid in range(10)
+    ]
+    results = [future.result() for future in futures]
+    batcher.close()
+    executor.shutdown()
+
+    assert [value['control_number'] for _, value in results] == list(range(10))
+    assert executor.batch_sizes == [4, 4, 2]
+
+
+def test_micro_batcher_shuts_down_its_executor_when_closed():
+    executor = ThreadPoolExecutor(1)
+    batcher = MicroBatcher(executor, owns_executor=True)
+    future = batcher.submit('marc2json', RECORD.format(1))
+
+    batcher.close()
+    batcher.close()
+
+    assert future.result()[1]['control_number'] == 1
+    with pytest.raises(RuntimeError):
+        executor.submit(print)
+    with pytest.raises(RuntimeError, match='closed'):
+        batcher.submit('marc2json', RECORD.format(2))
+
+
+def test_create_app_only_owns_the_executors_it_creates():
+    executor = ThreadPoolExecutor(1)
+    app = create_app(CONFIG, executor=executor, warm=False)
+    batcher = app.extensions['inspire_dojson']
+    batcher.close()
+
+    assert not batcher.owns_executor
+    assert executor.submit(sum, [1, 2]).result() == 3
+    executor.shutdown()
+
+    app = create_app(CONFIG, max_workers=1, warm=False)
+    batcher = app.extensions['inspire_dojson']
+    batcher.close()
+
+    assert batcher.owns_executor
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+
+from __future__ import absolute_import, division, print_function
+
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import dojson.overdo
+import pytest
+from flask import current_app
+
+from inspire_dojson.api import marcxml2record, record2marcxml
+from inspire_dojson.model import FilterOverdo
+from inspire_dojson.utils.app import bind_app_context
+
+HEP_RECORD = (  # synthetic data
+    '<record>'
+    '  <controlfield tag="001">{0}</controlfield>'
+    '  <datafield tag="100" ind1=" " ind2=" ">'
+    '    <subfield code="a">Smith, J.</subfield>'
+    '    <subfield code="u">CERN</subfield>'
+    '    <subfield code="z">902725</subfield>'
+    '  </datafield>'
+    '  <datafield tag="242" ind1=" " ind2=" ">'
+    '    <subfield code="a">The redshift of extragalactic nebulae</subfield>'
+    '  </datafield>'
+    '  <datafield tag="245" ind1=" " ind2=" ">'
+    '    <subfield code="a">Title number {0}</subfield>'
+    '  </datafield>'
+    '  <datafield tag="269" ind1=" " ind2=" ">'
+    '    <subfield code="c">2017-0{1}</subfield>'
+    '  </datafield>'
+    '  <datafield tag="700" ind1=" " ind2=" ">'
+    '    <subfield code="a">Doe, J.</subfield>'
+    '    <subfield code="x">{0}</subfield>'
+    '  </datafield>'
+    '  <datafield tag="773" ind1=" " ind2=" ">'
+    '    <subfield code="p">Phys.Rev.</subfield>'
+    '    <subfield code="v">D{0}</subfield>'
+    '    <subfield code="y">2017</subfield>'
+    '  </datafield>'
+    '  <datafield tag="856" ind1="4" ind2=" ">'
+    '    <subfield code="u">http://example.org/{0}</subfield>'
+    '  </datafield>'
+    '  <datafield tag="980" ind1=" " ind2=" ">'
+    '    <subfield code="a">HEP</subfield>'
+    '  </datafield>'
+    '  <datafield tag="999" ind1="C" ind2="5">'
+    '    <subfield code="0">{0}</subfield>'
+    '    <subfield code="h">Roe, R.</subfield>'
+    '    <subfield code="s">Phys.Lett.,B{0},1</subfield>'
+    '  </datafield>'
+    '</record>'
+)
+
+AUTHOR_RECORD = (  # synthetic data
+    '<record>'
+    '  <controlfield tag="001">{0}</controlfield>'
+    '  <datafield tag="100" ind1=" " ind2=" ">'
+    '    <subfield code="a">Doe, John {0}</subfield>'
+    '  </datafield>'
+    '  <datafield tag="371" ind1=" " ind2=" ">'
+    '    <subfield code="a">CERN</subfield>'
+    '    <subfield code="d">Switzerland</subfield>'
+    '  </datafield>'
+    '  <datafield tag="980" ind1=" " ind2=" ">'
+    '    <subfield code="a">HEPNAMES</subfield>'
+    '  </datafield>'
+    '</record>'
+)
+
+CONFERENCE_RECORD = (  # synthetic data
+    '<record>'
+    '  <controlfield tag="001">{0}</controlfield>'
+    '  <datafield tag="111" ind1=" " ind2=" ">'
+    '    <subfield code="a">Conference number {0}</subfield>'
+    '    <subfield code="x">2017-0{1}-01</subfield>'
+    '  </datafield>'
+    '  <datafield tag="980" ind1=" " ind2=" ">'
+    '    <subfield code="a">CONFERENCES</subfield>'
+    '  </datafield>'
+    '</record>'
+)
+
+
+def _convert(marcxml):
+    record = marcxml2record(marcxml)
+    if record['$schema'] in ('hep.json', 'authors.json'):
+        return record, record2marcxml(record)
+    return record, None
+
+
+@pytest.fixture
+def _frequent_switches():
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+
+    yield
+
+    sys.setswitchinterval(interval)
+
+
+@pytest.mark.usefixtures('_stable_langdetect', '_frequent_switches')
+def test_conversions_from_many_threads_match_serial_conversions():
+    marcxmls = [
+        template.format(index, index % 9 + 1)
+        for index in range(1, 31)
+        for template in (HEP_RECORD, AUTHOR_RECORD, CONFERENCE_RECORD)
+    ]
+    expected = [_convert(marcxml) for marcxml in marcxmls]
+
+    with ThreadPoolExecutor(8) as executor:
+        for _ in range(3):
+            result = list(executor.map(bind_app_context(_convert), marcxmls))
+
+            assert expected == result
+
+
+def test_filteroverdo_builds_its_index_once_from_many_threads(monkeypatch):
+    builds = []
+    index_class = dojson.overdo.Index
+
+    def counting_index(*args, **kwargs):
+        builds.append(threading.current_thread().name)
+        return index_class(*args, **kwargs)
+
+    monkeypatch.setattr(dojson.overdo, 'Index', counting_index)
+
+    model = FilterOverdo()
+    model.over('title', '^245')(lambda self, key, value: value['a'])
+    barrier = threading.Barrier(8)
+
+    def _do(title):
+        barrier.wait()
+        return model.do({'245__': {'a': title}})
+
+    with ThreadPoolExecutor(8) as executor:
+        result = list(executor.map(_do, range(8)))
+
+    assert result == [{'title': title} for title in range(8)]
+    assert len(builds) == 1
+
+
+def test_bind_app_context_runs_in_the_context_of_the_caller(app):
+    def _get_app():
+        return current_app._get_current_object()
+
+    with ThreadPoolExecutor(1) as executor:
+        result = executor.submit(bind_app_context(_get_app)).result()
+
+    assert result is app
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2019 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+from __future__ import absolute_import, division, print_function
+
+import idutils
+import pytest
+from inspire_schemas import utils as schemas_utils
+
+from inspire_dojson.utils.cache import (
+    MemoizedFunction,
+    clear_caches,
+    get_cache_stats,
+    memoize,
+)
+from inspire_dojson.utils.identifiers import (
+    normalize_arxiv_category,
+    normalize_collaboration,
+    normalize_doi,
+)
+
+
+@pytest.fixture(autouse=True)
+def _clear_caches():
+    clear_caches()
+    yield
+    clear_caches()
+
+
+def test_memoized_function_counts_hits_and_misses():
+    calls = []
+
+    def double(value):
+        calls.append(value)
+        return value * 2
+
+    memoized = MemoizedFunction(double)
+
+    assert [memoized(1), memoized(1), memoized(2)] == [2, 2, 4]
+    assert calls == [1, 2]
+
+    expected = {
+        'hits': 1,
+        'misses': 2,
+        'failures': 0,
+        'size': 2,
+        'maxsize': 4096,
+        'hit_rate': 1 / 3,
+    }
+    assert expected == memoized.stats()
+
+
+def test_memoized_function_is_bounded():
+    memoized = MemoizedFunction(lambda value: value, maxsize=2)
+
+    memoized(1)
+    memoized(2)
+    memoized(1)
+    memoized(3)
+
+    assert list(memoized._cache) == [(1,), (3,)]
+
+
+def test_memoized_function_copies_list_results():
+    memoized = MemoizedFunction(lambda value: [value])
+
+    first = memoized('a')
+    first.append('b')
+
+    assert memoized('a') == ['a']
+
+
+def test_memoized_function_bypasses_cache_for_unhashable_arguments():
+    memoized = MemoizedFunction(len)
+
+    assert memoized(['a', 'b']) == 2
+    assert memoized.stats()['misses'] == 0
+
+
+def test_memoized_function_does_not_cache_exceptions():
+    memoized = MemoizedFunction(int)
+
+    with pytest.raises(ValueError, match='invalid literal'):
+        memoized('foo')
+
+    assert memoized.stats()['size'] == 0
+
+
+def test_memoized_function_remembers_listed_exceptions():
+    calls = []
+
+    def parse(value):
+        calls.append(value)
+        return int(value)
+
+    memoized = MemoizedFunction(parse, cache_exceptions=(ValueError,))
+
+    for _ in range(2):
+        with pytest.raises(ValueError, match="invalid literal for int.*'foo'"):
+            memoized('foo')
+
+    assert calls == ['foo']
+    assert memoized.stats()['failures'] == 2
+
+
+def test_memoize_registers_and_clears_caches():
+    square = memoize(name='square')(lambda value: value**2)
+
+    square(3)
+    square(3)
+
+    assert get_cache_stats()['square']['hits'] == 1
+
+    clear_caches()
+
+    assert get_cache_stats()['square']['size'] == 0
+
+
+@pytest.mark.parametrize(
+    ('memoized', 'original', 'value'),
+    [
+        (normalize_doi, idutils.normalize_doi, 'doi:10.1016/0029-5582(61)90469-2'),
+        (normalize_arxiv_category, schemas_utils.normalize_arxiv_category, 'HEP-PH'),
+        (
+            normalize_collaboration,
+            schemas_utils.normalize_collaboration,
+            'ATLAS and CMS',
+        ),
+    ],
+)
+def test_memoized_identifiers_match_originals(memoized, original, value):
+    expected = original(value)
+
+    assert memoized(value) == expected
+    assert memoized(value) == expected
+    assert memoized.stats()['hits'] == 1
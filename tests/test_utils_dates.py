@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2019 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+from __future__ import absolute_import, division, print_function
+
+import pytest
+from mock import patch
+
+from inspire_dojson.utils.cache import clear_caches
+from inspire_dojson.utils.dates import (
+    get_date_cache_stats,
+    normalize_date,
+    normalize_date_aggressively,
+    trim_date,
+)
+
+
+@pytest.fixture(autouse=True)
+def _clear_caches():
+    clear_caches()
+    yield
+    clear_caches()
+
+
+def test_normalize_date_is_cached():
+    with patch(
+        'inspire_dojson.utils.dates.inspire_date.normalize_date',
+        return_value='1686-06-30',
+    ) as mock_normalize_date:
+        assert normalize_date('30 Jun 1686') == '1686-06-30'
+        assert normalize_date('30 Jun 1686') == '1686-06-30'
+
+    assert mock_normalize_date.call_count == 1
+
+
+def test_normalize_date_remembers_failures():
+    for _ in range(2):
+        with pytest.raises(ValueError, match='Unknown string format: 2014=12'):
+            normalize_date('2014=12')
+
+    stats = get_date_cache_stats()['normalize_date']
+    assert stats['misses'] == 1
+    assert stats['failures'] == 2
+
+
+def test_normalize_date_aggressively_reuses_cached_parts():
+    normalize_date_aggressively('2015-02-31')
+    normalize_date_aggressively('2015-02-30')
+
+    stats = get_date_cache_stats()
+    assert stats['normalize_date_aggressively']['hits'] == 1
+    assert stats['normalize_date']['misses'] == 3
+
+
+@pytest.mark.parametrize(
+    ('date', 'expected'),
+    [
+        ('20170301', '2017-03-01'),
+        ('2017-03-00', '2017-03'),
+        ('2017-00-00', '2017'),
+        ('2017', '2017'),
+    ],
+)
+def test_trim_date(date, expected):
+    assert trim_date(date) == expected
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2019 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+from __future__ import absolute_import, division, print_function
+
+from inspire_dojson.api import marcxml2record
+from inspire_dojson.batch import marcxml2records
+from inspire_dojson.compact import create_compact_record
+from inspire_dojson.utils.interning import StringInterner
+
+
+def _copy(value):
+    return ''.join(list(value))
+
+
+def test_string_interner_shares_equal_strings():
+    interner = StringInterner()
+    first = interner(_copy('CERN'))
+    second = interner(_copy('CERN'))
+
+    assert first is second
+    assert interner.stats()['hits'] == 1
+
+
+def test_string_interner_skips_long_strings():
+    interner = StringInterner(max_length=3)
+    value = _copy('CERN')
+
+    assert interner(value) is value
+    assert interner(_copy('CERN')) is not value
+
+
+def test_string_interner_is_bounded():
+    interner = StringInterner(maxsize=1)
+    interner('HEP')
+    value = _copy('CORE')
+
+    assert interner(value) is value
+    assert interner(_copy('CORE')) is not value
+    assert interner.stats()['size'] == 1
+
+
+def test_string_interner_intern_values_in_place():
+    interner = StringInterner()
+    record = {
+        'affiliations': [{'value': _copy('CERN')}],
+        'other': [_copy('CERN'), 1, None],
+    }
+
+    result = interner.intern_values(record)
+
+    assert result is record
+    assert record['affiliations'][0]['value'] is record['other'][0]
+
+
+def test_create_compact_record_interns_subfield_values():
+    marcxml = (  # synthetic data
+        '<record>'
+        '  <datafield tag="700" ind1=" " ind2=" ">'
+        '    <subfield code="u">CERN</subfield>'
+        '  </datafield>'
+        '  <datafield tag="700" ind1=" " ind2=" ">'
+        '    <subfield code="u">CERN</subfield>'
+        '  </datafield>'
+        '</record>'
+    )
+
+    first, second = create_compact_record(marcxml, interner=StringInterner())['700__']
+
+    assert first['u'] is second['u']
+
+
+def test_marcxml2records_shares_strings_between_records():
+    marcxmls = [
+        (  # synthetic data
+            '<record>'
+            '  <controlfield tag="001">{}</controlfield>'
+            '  <datafield tag="100" ind1=" " ind2=" ">'
+            '    <subfield code="a">Smith, J.</subfield>'
+            '    <subfield code="u">CERN</subfield>'
+            '  </datafield>'
+            '  <datafield tag="980" ind1=" " ind2=" ">'
+            '    <subfield code="a">HEP</subfield>'
+            '  </datafield>'
+            '</record>'
+        ).format(recid)
+        for recid in (1, 2)
+    ]
+
+    first, second = [
+        result.record
+        for result in marcxml2records(
+            marcxmls, compact=True, interner=StringInterner()
+        )
+    ]
+
+    assert first == marcxml2record(marcxmls[0])
+    assert (
+        first['authors'][0]['affiliations'][0]['value']
+        is second['authors'][0]['affiliations'][0]['value']
+    )
+    assert first['authors'][0]['full_name'] is second['authors'][0]['full_name']
@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of INSPIRE.
+# Copyright (C) 2014-2017 CERN.
+#
+# INSPIRE is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# INSPIRE is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with INSPIRE. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this license, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+from __future__ import absolute_import, division, print_function
+
+import io
+import json
+import threading
+
+from inspire_dojson.api import marcxml2record
+from inspire_dojson.batch import marcxml2records
+from inspire_dojson.verification import (
+    Discrepancy,
+    JsonLinesRoundTripSink,
+    RoundTripVerifier,
+)
+
+RECORD = (  # synthetic data
+    '<record>'
+    '  <controlfield tag="001">1</controlfield>'
+    '  <controlfield tag="005">20170101000000.0</controlfield>'
+    '  <datafield tag="100" ind1=" " ind2=" ">'
+    '    <subfield code="a">Smith, J.</subfield>'
+    '    <subfield code="u">CERN</subfield>'
+    '  </datafield>'
+    '  <datafield tag="245" ind1=" " ind2=" ">'
+    '    <subfield code="a">A title</subfield>'
+    '  </datafield>'
+    '  <datafield tag="980" ind1=" " ind2=" ">'
+    '    <subfield code="a">HEP</subfield>'
+    '  </datafield>'
+    '  <datafield tag="980" ind1=" " ind2=" ">'
+    '    <subfield code="a">Citeable</subfield>'
+    '  </datafield>'
+    '</record>'
+)
+
+LOSSY_RECORD = (  # synthetic data
+    '<record>'
+    '  <controlfield tag="001">2</controlfield>'
+    '  <datafield tag="245" ind1=" " ind2=" ">'
+    '    <subfield code="a">A title</subfield>'
+    '    <subfield code="z">An unknown subfield</subfield>'
+    '  </datafield>'
+    '  <datafield tag="999" ind1=" " ind2=" ">'
+    '    <subfield code="a">An unknown field</subfield>'
+    '  </datafield>'
+    '  <datafield tag="980" ind1=" " ind2=" ">'
+    '    <subfield code="a">HEP</subfield>'
+    '  </datafield>'
+    '</record>'
+)
+
+CONFERENCE_RECORD = (  # synthetic data
+    '<record>'
+    '  <controlfield tag="001">3</controlfield>'
+    '  <datafield tag="980" ind1=" " ind2=" ">'
+    '    <subfield code="a">CONFERENCES</subfield>'
+    '  </datafield>'
+    '</record>'
+)
+
+
+class ListSink(object):
+    def __init__(self):
+        self.reports = []
+
+    def write(self, report):
+        self.reports.append(report)
+
+
+def test_round_trip_verifier_reports_nothing_for_identical_fields():
+    sink = ListSink()
+
+    with RoundTripVerifier(sink, rate=1) as verifier:
+        marcxml2record(RECORD, verifier=verifier)
+
+    assert sink.reports == []
+    assert verifier.stats == {'sampled': 1, 'verified': 1}
+
+
+def test_round_trip_verifier_reports_discrepancies_by_key():
+    sink = ListSink()
+
+    with RoundTripVerifier(sink, rate=1) as verifier:
+        marcxml2record(LOSSY_RECORD, verifier=verifier)
+
+    report = sink.reports[0]
+    assert report.control_number == '2'
+    assert report.discrepancies == [
+        Discrepancy(
+            '245__',
+            [(('a', 'A title'), ('z', 'An unknown subfield'))],
+            [(('a', 'A title'),)],
+        ),
+        Discrepancy('999__', [(('a', 'An unknown field'),)], []),
+    ]
+    assert not report.truncated
+    assert verifier.stats == {'sampled': 1, 'mismatched': 1}
+
+
+def test_round_trip_verifier_caps_reports():
+    sink = ListSink()
+
+    with RoundTripVerifier(sink, rate=1, max_discrepancies=1) as verifier:
+        marcxml2record(LOSSY_RECORD, verifier=verifier)
+
+    assert [discrepancy.key for discrepancy in sink.reports[0].discrepancies] == [
+        '245__'
+    ]
+    assert sink.reports[0].truncated
+
+
+def test_round_trip_verifier_samples_records():
+    sink = ListSink()
+
+    with RoundTripVerifier(sink, rate=0.5, seed=0) as verifier:
+        list(marcxml2records([LOSSY_RECORD] * 100, verifier=verifier))
+
+    assert 30 < len(sink.reports) < 70
+    assert verifier.stats['sampled'] == len(sink.reports)
+
+
+def test_round_trip_verifier_drops_samples_when_full():
+    writing = threading.Event()
+    release = threading.Event()
+
+    class BlockingSink(ListSink):
+        def write(self, report):
+            writing.set()
+            release.wait()
+            super(BlockingSink, self).write(report)
+
+    sink = BlockingSink()
+    verifier = RoundTripVerifier(sink, rate=1, max_pending=1)
+    record = marcxml2record(LOSSY_RECORD)
+
+    verifier.submit(LOSSY_RECORD, record)
+    writing.wait()
+    verifier.submit(LOSSY_RECORD, record)
+    verifier.submit(LOSSY_RECORD, record)
+    release.set()
+    verifier.close()
+
+    assert len(sink.reports) == 2
+    assert verifier.stats == {'sampled': 3, 'mismatched': 2, 'dropped': 1}
+
+
+def test_round_trip_verifier_skips_records_without_reverse_rules():
+    with RoundTripVerifier(ListSink(), rate=1) as verifier:
+        marcxml2record(CONFERENCE_RECORD, verifier=verifier)
+
+    assert verifier.stats == {'unsupported': 1}
+
+
+def test_json_lines_round_trip_sink():
+    stream = io.StringIO()
+
+    with RoundTripVerifier(JsonLinesRoundTripSink(stream), rate=1) as verifier:
+        marcxml2record(LOSSY_RECORD, verifier=verifier)
+
+    line = json.loads(stream.getvalue())
+    assert line['control_number'] == '2'
+    assert line['discrepancies'][1] == {
+        'key': '999__',
+        'missing': [[['a', 'An unknown field']]],
+        'extra': [],
+    }
+    assert line['error'] is None